@@ -0,0 +1,256 @@
+# File: cart/local_store.py
+# Non-Redis cart backends: a bounded LRU+TTL dict and a SQLite file store that
+# is shared by every worker process on the host.
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from django.conf import settings
+
+
+class LRUTTLCache:
+    """Thread-safe dict capped at ``max_entries`` whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries, ttl, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._data[key]
+                self.ttl_evictions += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.lru_evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+
+    def purge_expired(self):
+        now = self.clock()
+        with self._lock:
+            expired = [k for k, (expires_at, _) in self._data.items() if expires_at <= now]
+            for key in expired:
+                del self._data[key]
+            self.ttl_evictions += len(expired)
+        return len(expired)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'lru_evictions': self.lru_evictions,
+            'ttl_evictions': self.ttl_evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+class SQLiteCartStorage:
+    """
+    Carts in a WAL-mode SQLite file so all gunicorn workers see the same data.
+
+    Lines are upserted with ``quantity = quantity + excluded.quantity``, so
+    concurrent adds from different workers never lose updates. Idle carts
+    expire after ``ttl`` and the table is capped at ``max_carts`` (oldest
+    carts evicted first). A small per-process LRU+TTL tier fronts reads; it is
+    flushed whenever ``PRAGMA data_version`` shows another connection wrote.
+    """
+    schema = (
+        'CREATE TABLE IF NOT EXISTS carts ('
+        ' user_id TEXT PRIMARY KEY, expires_at REAL NOT NULL) WITHOUT ROWID',
+        'CREATE INDEX IF NOT EXISTS carts_expires_at ON carts (expires_at)',
+        'CREATE TABLE IF NOT EXISTS cart_items ('
+        ' user_id TEXT NOT NULL, product_id TEXT NOT NULL, quantity INTEGER NOT NULL,'
+        ' PRIMARY KEY (user_id, product_id)) WITHOUT ROWID',
+    )
+
+    def __init__(self, path, ttl=None, max_carts=None, front_size=None, front_ttl=None, purge_interval=60):
+        self.path = str(path)
+        self.ttl = ttl or settings.CART_TTL
+        self.max_carts = max_carts or settings.CART_STORE_MAX_CARTS
+        self.front = LRUTTLCache(
+            front_size or settings.CART_LOCAL_MAX_ENTRIES,
+            front_ttl or settings.CART_LOCAL_TTL,
+        )
+        self.purge_interval = purge_interval
+        self.expired_evictions = 0
+        self.capacity_evictions = 0
+        self._next_purge = 0
+        self._local = threading.local()
+
+    def _conn(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            for statement in self.schema:
+                conn.execute(statement)
+            local.conn, local.pid = conn, os.getpid()
+            local.data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+            # writes made before this connection existed cannot be detected
+            self.front.clear()
+        return local.conn
+
+    def _sync_front(self, conn):
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if version != self._local.data_version:
+            self.front.clear()
+            self._local.data_version = version
+
+    @staticmethod
+    def _read(conn, uid, now):
+        rows = conn.execute(
+            'SELECT i.product_id, i.quantity FROM cart_items i'
+            ' JOIN carts c ON c.user_id = i.user_id'
+            ' WHERE i.user_id = ? AND c.expires_at > ?',
+            (uid, now),
+        )
+        return dict(rows)
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _write(self, user_id, statements):
+        uid, now = str(user_id), time.time()
+        with self._transaction() as conn:
+            # an expired cart starts over instead of resurrecting old lines
+            conn.execute(
+                'DELETE FROM cart_items WHERE user_id = ? AND user_id IN'
+                ' (SELECT user_id FROM carts WHERE user_id = ? AND expires_at <= ?)',
+                (uid, uid, now),
+            )
+            for sql, params in statements:
+                conn.executemany(sql, params)
+            conn.execute(
+                'INSERT INTO carts (user_id, expires_at) VALUES (?, ?)'
+                ' ON CONFLICT (user_id) DO UPDATE SET expires_at = excluded.expires_at',
+                (uid, now + self.ttl),
+            )
+            cart = self._read(conn, uid, now)
+        self.front.set(uid, cart)
+        self._maybe_purge()
+        return dict(cart)
+
+    def get_cart(self, user_id):
+        uid = str(user_id)
+        conn = self._conn()
+        self._sync_front(conn)
+        cart = self.front.get(uid)
+        if cart is None:
+            cart = self._read(conn, uid, time.time())
+            self.front.set(uid, cart)
+        return dict(cart)
+
+    def set_cart(self, user_id, data):
+        uid = str(user_id)
+        return self._write(user_id, [
+            ('DELETE FROM cart_items WHERE user_id = ?', [(uid,)]),
+            ('INSERT INTO cart_items (user_id, product_id, quantity) VALUES (?, ?, ?)',
+             [(uid, str(pid), int(qty)) for pid, qty in data.items()]),
+        ])
+
+    def add_items(self, user_id, items):
+        uid = str(user_id)
+        return self._write(user_id, [(
+            'INSERT INTO cart_items (user_id, product_id, quantity) VALUES (?, ?, ?)'
+            ' ON CONFLICT (user_id, product_id) DO UPDATE SET quantity = quantity + excluded.quantity',
+            [(uid, str(pid), int(qty)) for pid, qty in items],
+        )])
+
+    def add_item(self, user_id, product_id, quantity):
+        return self.add_items(user_id, [(product_id, quantity)])
+
+    def remove_item(self, user_id, product_id):
+        return self._write(user_id, [
+            ('DELETE FROM cart_items WHERE user_id = ? AND product_id = ?', [(str(user_id), str(product_id))]),
+        ])
+
+    def clear(self, user_id):
+        with self._transaction() as conn:
+            self._evict(conn, [(str(user_id),)])
+
+    def _maybe_purge(self):
+        if time.monotonic() >= self._next_purge:
+            self.purge()
+
+    def _evict(self, conn, user_ids):
+        conn.executemany('DELETE FROM cart_items WHERE user_id = ?', user_ids)
+        conn.executemany('DELETE FROM carts WHERE user_id = ?', user_ids)
+        for (uid,) in user_ids:
+            self.front.pop(uid)
+
+    def purge(self):
+        """Drop expired carts, then the oldest ones beyond ``max_carts``."""
+        self._next_purge = time.monotonic() + self.purge_interval
+        self.front.purge_expired()
+        with self._transaction() as conn:
+            expired = conn.execute('SELECT user_id FROM carts WHERE expires_at <= ?', (time.time(),)).fetchall()
+            self._evict(conn, expired)
+            excess = conn.execute('SELECT COUNT(*) FROM carts').fetchone()[0] - self.max_carts
+            overflow = []
+            if excess > 0:
+                overflow = conn.execute('SELECT user_id FROM carts ORDER BY expires_at LIMIT ?', (excess,)).fetchall()
+                self._evict(conn, overflow)
+        self.expired_evictions += len(expired)
+        self.capacity_evictions += len(overflow)
+        return len(expired) + len(overflow)
+
+    def stats(self):
+        carts = self._conn().execute('SELECT COUNT(*) FROM carts').fetchone()[0]
+        return {
+            'backend': 'sqlite',
+            'path': self.path,
+            'carts': carts,
+            'max_carts': self.max_carts,
+            'expired_evictions': self.expired_evictions,
+            'capacity_evictions': self.capacity_evictions,
+            'front': self.front.stats(),
+        }
@@ -0,0 +1,16 @@
+import json
+from django.core.management.base import BaseCommand
+from cart.redis_client import r
+
+
+class Command(BaseCommand):
+    help = 'Print cart store size and eviction counters (optionally purging expired carts first).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--purge', action='store_true', help='Evict expired and over-capacity carts first.')
+
+    def handle(self, *args, **options):
+        if options['purge'] and hasattr(r, 'purge'):
+            evicted = r.purge()
+            self.stdout.write(f'Evicted {evicted} carts')
+        self.stdout.write(json.dumps(r.stats(), indent=2))
@@ -1,25 +1,237 @@
 # File: cart/redis_client.py
-# Minimal Redis wrapper (optional). For demo, we use in-memory dict when redis not configured.
-import os
+# Cart storage backends, selected by CART_BACKEND: Redis, a SQLite file shared
+# by all workers (default without Redis), or a bounded in-process dict.
+# ``ar`` is the same store for async views.
+import asyncio
+import threading
+import weakref
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .local_store import LRUTTLCache, SQLiteCartStorage
 try:
     import redis
+    import redis.asyncio
     REDIS_AVAILABLE = True
 except Exception:
     REDIS_AVAILABLE = False
 
+
 class SimpleCartStorage:
-    _store = {}
+    # per-process only: not shared between gunicorn workers
+    _store = LRUTTLCache(settings.CART_LOCAL_MAX_ENTRIES, settings.CART_TTL)
+    _lock = threading.Lock()
 
     @classmethod
     def get_cart(cls, user_id):
-        return cls._store.get(str(user_id), {})
+        return dict(cls._store.get(str(user_id), {}))
 
     @classmethod
     def set_cart(cls, user_id, data):
-        cls._store[str(user_id)] = data
+        cls._store.set(str(user_id), dict(data))
+
+    @classmethod
+    def add_items(cls, user_id, items):
+        with cls._lock:
+            cart = cls._store.get(str(user_id), {})
+            for product_id, quantity in items:
+                pid = str(product_id)
+                cart[pid] = cart.get(pid, 0) + quantity
+            cls._store.set(str(user_id), cart)
+            return dict(cart)
+
+    @classmethod
+    def add_item(cls, user_id, product_id, quantity):
+        return cls.add_items(user_id, [(product_id, quantity)])
+
+    @classmethod
+    def remove_item(cls, user_id, product_id):
+        with cls._lock:
+            cart = cls._store.get(str(user_id), {})
+            cart.pop(str(product_id), None)
+            cls._store.set(str(user_id), cart)
+            return dict(cart)
+
+    @classmethod
+    def clear(cls, user_id):
+        cls._store.pop(str(user_id))
+
+    @classmethod
+    def stats(cls):
+        return {'backend': 'memory', **cls._store.stats()}
+
+
+class RedisCartStorage:
+    """
+    One Redis hash per user (``cart:<user_id>`` -> {product_id: quantity}).
+
+    Every write is a single MULTI/EXEC pipeline: per-line HINCRBY/HDEL, a TTL
+    refresh so idle carts expire, and an HGETALL so callers get the resulting
+    cart back without a second round trip.
+    """
+    key_prefix = 'cart:'
+
+    def __init__(self, client, ttl=None):
+        self.client = client
+        self.ttl = ttl or settings.CART_TTL
+
+    def _key(self, user_id):
+        return f'{self.key_prefix}{user_id}'
+
+    @staticmethod
+    def _decode(raw):
+        return {
+            (k.decode() if isinstance(k, bytes) else k): int(v)
+            for k, v in raw.items()
+        }
+
+    def get_cart(self, user_id):
+        return self._decode(self.client.hgetall(self._key(user_id)))
+
+    def set_cart(self, user_id, data):
+        key = self._key(user_id)
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        if data:
+            pipe.hset(key, mapping={str(k): int(v) for k, v in data.items()})
+            pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def add_items(self, user_id, items):
+        key = self._key(user_id)
+        pipe = self.client.pipeline()
+        for product_id, quantity in items:
+            pipe.hincrby(key, str(product_id), quantity)
+        pipe.expire(key, self.ttl)
+        pipe.hgetall(key)
+        return self._decode(pipe.execute()[-1])
+
+    def add_item(self, user_id, product_id, quantity):
+        return self.add_items(user_id, [(product_id, quantity)])
+
+    def remove_item(self, user_id, product_id):
+        key = self._key(user_id)
+        pipe = self.client.pipeline()
+        pipe.hdel(key, str(product_id))
+        pipe.expire(key, self.ttl)
+        pipe.hgetall(key)
+        return self._decode(pipe.execute()[-1])
+
+    def clear(self, user_id):
+        self.client.delete(self._key(user_id))
+
+    def stats(self):
+        # Redis evicts idle carts itself via EXPIRE
+        return {'backend': 'redis', 'ttl': self.ttl}
+
+
+class AsyncRedisCartStorage(RedisCartStorage):
+    """
+    RedisCartStorage over redis.asyncio: same keys, same pipelines, awaited.
+    Clients are created per event loop (``client_factory``) since their
+    connections can't move between loops.
+    """
+
+    def __init__(self, client_factory, ttl=None):
+        self.client_factory = client_factory
+        self._clients = weakref.WeakKeyDictionary()
+        self.ttl = ttl or settings.CART_TTL
+
+    @property
+    def client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = self.client_factory()
+        return client
+
+    async def get_cart(self, user_id):
+        return self._decode(await self.client.hgetall(self._key(user_id)))
+
+    async def set_cart(self, user_id, data):
+        key = self._key(user_id)
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        if data:
+            pipe.hset(key, mapping={str(k): int(v) for k, v in data.items()})
+            pipe.expire(key, self.ttl)
+        await pipe.execute()
+
+    async def add_items(self, user_id, items):
+        key = self._key(user_id)
+        pipe = self.client.pipeline()
+        for product_id, quantity in items:
+            pipe.hincrby(key, str(product_id), quantity)
+        pipe.expire(key, self.ttl)
+        pipe.hgetall(key)
+        return self._decode((await pipe.execute())[-1])
+
+    async def add_item(self, user_id, product_id, quantity):
+        return await self.add_items(user_id, [(product_id, quantity)])
+
+    async def remove_item(self, user_id, product_id):
+        key = self._key(user_id)
+        pipe = self.client.pipeline()
+        pipe.hdel(key, str(product_id))
+        pipe.expire(key, self.ttl)
+        pipe.hgetall(key)
+        return self._decode((await pipe.execute())[-1])
+
+    async def clear(self, user_id):
+        await self.client.delete(self._key(user_id))
+
+
+class AsyncCartStorage:
+    """
+    Awaitable facade over a sync store without an async driver. The SQLite
+    store's file I/O runs in the thread pool (its connections are per
+    thread); the in-memory store is called inline.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.inline = store is SimpleCartStorage
+
+    async def _call(self, name, *args):
+        method = getattr(self.store, name)
+        if self.inline:
+            return method(*args)
+        return await sync_to_async(method, thread_sensitive=False)(*args)
+
+    async def get_cart(self, user_id):
+        return await self._call('get_cart', user_id)
+
+    async def set_cart(self, user_id, data):
+        return await self._call('set_cart', user_id, data)
+
+    async def add_items(self, user_id, items):
+        return await self._call('add_items', user_id, items)
+
+    async def add_item(self, user_id, product_id, quantity):
+        return await self._call('add_items', user_id, [(product_id, quantity)])
+
+    async def remove_item(self, user_id, product_id):
+        return await self._call('remove_item', user_id, product_id)
+
+    async def clear(self, user_id):
+        return await self._call('clear', user_id)
+
+
+def build_cart_storage(backend=None):
+    backend = backend or settings.CART_BACKEND
+    if backend == 'redis' and REDIS_AVAILABLE and settings.REDIS_URL:
+        return RedisCartStorage(redis.from_url(settings.REDIS_URL))
+    if backend == 'sqlite':
+        return SQLiteCartStorage(settings.CART_STORE_PATH)
+    return SimpleCartStorage
+
+
+def build_async_cart_storage(backend=None):
+    backend = backend or settings.CART_BACKEND
+    if backend == 'redis' and REDIS_AVAILABLE and settings.REDIS_URL:
+        return AsyncRedisCartStorage(lambda: redis.asyncio.from_url(settings.REDIS_URL))
+    # share the sync store (and its in-process tier) when it's the configured one
+    return AsyncCartStorage(r if backend == settings.CART_BACKEND else build_cart_storage(backend))
+
 
-if REDIS_AVAILABLE and os.environ.get('REDIS_URL'):
-    r = redis.from_url(os.environ['REDIS_URL'])
-    # production usage would implement Redis operations here
-else:
-    r = SimpleCartStorage
+r = build_cart_storage()
+ar = build_async_cart_storage()
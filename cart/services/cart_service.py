@@ -0,0 +1,99 @@
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from products.models import Product
+
+SNAPSHOT_KEY = 'product-snapshot:{}'
+SNAPSHOT_FIELDS = ('id', 'name', 'price', 'stock', 'image')
+
+
+class CartService:
+
+    @staticmethod
+    def snapshot_key(product_id):
+        return SNAPSHOT_KEY.format(product_id)
+
+    @staticmethod
+    def get_product_snapshots(product_ids):
+        """
+        Return {product_id: snapshot} for the products that still exist.
+        Cached snapshots are served from the cache; the rest are loaded with a
+        single ``id__in`` query and cached for CART_PRODUCT_SNAPSHOT_TTL seconds.
+        Missing products are cached as ``{}`` so they are not looked up again.
+        """
+        keys = {pid: CartService.snapshot_key(pid) for pid in product_ids}
+        cached = cache.get_many(keys.values())
+        snapshots = {pid: cached[key] for pid, key in keys.items() if key in cached}
+        missing = [pid for pid in product_ids if pid not in snapshots]
+        if missing:
+            storage = Product._meta.get_field('image').storage
+            fresh = dict.fromkeys(missing, {})
+            for row in Product.objects.filter(id__in=missing).values(*SNAPSHOT_FIELDS):
+                pid = str(row['id'])
+                fresh[pid] = {
+                    'name': row['name'],
+                    'price': str(row['price']),
+                    'stock': row['stock'],
+                    'image': storage.url(row['image']) if row['image'] else None,
+                }
+            cache.set_many(
+                {keys[pid]: snapshot for pid, snapshot in fresh.items()},
+                settings.CART_PRODUCT_SNAPSHOT_TTL,
+            )
+            snapshots.update(fresh)
+        return {pid: snapshot for pid, snapshot in snapshots.items() if snapshot}
+
+    @staticmethod
+    def invalidate_snapshot(product_id):
+        cache.delete(CartService.snapshot_key(product_id))
+
+    @staticmethod
+    def hydrate(cart, request=None):
+        """
+        Expand a raw ``{product_id: quantity}`` cart into priced lines.
+
+        Each line carries a ``status``: ``ok``, ``insufficient_stock``,
+        ``out_of_stock`` or ``unavailable`` (product deleted). Only ``ok``
+        lines count towards ``total``.
+        """
+        product_ids = []
+        for pid in cart:
+            try:
+                product_ids.append(str(uuid.UUID(str(pid))))
+            except ValueError:
+                continue
+        snapshots = CartService.get_product_snapshots(product_ids)
+        lines, total = [], Decimal('0.00')
+        for pid, quantity in cart.items():
+            snapshot = snapshots.get(str(pid))
+            if snapshot is None:
+                lines.append({'product_id': str(pid), 'quantity': quantity, 'status': 'unavailable'})
+                continue
+            price = Decimal(snapshot['price'])
+            line_total = price * quantity
+            if snapshot['stock'] == 0:
+                status = 'out_of_stock'
+            elif snapshot['stock'] < quantity:
+                status = 'insufficient_stock'
+            else:
+                status = 'ok'
+                total += line_total
+            image = snapshot['image']
+            if image and request is not None:
+                image = request.build_absolute_uri(image)
+            lines.append({
+                'product_id': str(pid),
+                'name': snapshot['name'],
+                'price': f'{price:.2f}',
+                'quantity': quantity,
+                'line_total': f'{line_total:.2f}',
+                'stock': snapshot['stock'],
+                'image': image,
+                'status': status,
+            })
+        return {
+            'items': lines,
+            'item_count': sum(line['quantity'] for line in lines if line['status'] == 'ok'),
+            'total': f'{total:.2f}',
+        }
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from products.models import Product
+from .services.cart_service import CartService
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def drop_product_snapshot(sender, instance, **kwargs):
+    CartService.invalidate_snapshot(instance.pk)
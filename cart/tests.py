@@ -1,3 +1,209 @@
-from django.test import TestCase
+import os
+import tempfile
+import uuid
+from unittest import mock
+import fakeredis  # requirements-dev.txt; not optional, so the Redis cart tests can't skip
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core.testing import QueryBudgetMixin
+from products.models import Product
+from users.models import User
+from .local_store import LRUTTLCache, SQLiteCartStorage
+from .redis_client import AsyncCartStorage, AsyncRedisCartStorage, RedisCartStorage, SimpleCartStorage
 
-# Create your tests here.
+
+class RedisCartStorageTests(TestCase):
+    def setUp(self):
+        self.store = RedisCartStorage(fakeredis.FakeRedis(), ttl=60)
+        self.pid = str(uuid.uuid4())
+
+    def test_add_item_increments_line(self):
+        self.store.add_item('u1', self.pid, 2)
+        cart = self.store.add_item('u1', self.pid, 3)
+        self.assertEqual(cart, {self.pid: 5})
+        self.assertEqual(self.store.get_cart('u1'), {self.pid: 5})
+
+    def test_add_items_pipelines_several_lines(self):
+        other = str(uuid.uuid4())
+        cart = self.store.add_items('u1', [(self.pid, 1), (other, 4)])
+        self.assertEqual(cart, {self.pid: 1, other: 4})
+
+    def test_remove_item_and_ttl(self):
+        self.store.add_items('u1', [(self.pid, 1), ('x', 1)])
+        self.assertEqual(self.store.remove_item('u1', 'x'), {self.pid: 1})
+        ttl = self.store.client.ttl('cart:u1')
+        self.assertTrue(0 < ttl <= 60)
+
+    def test_carts_are_per_user(self):
+        self.store.add_item('u1', self.pid, 1)
+        self.assertEqual(self.store.get_cart('u2'), {})
+
+
+class LRUTTLCacheTests(SimpleTestCase):
+    def test_capacity_and_ttl_evictions_are_counted(self):
+        now = [0]
+        cache = LRUTTLCache(max_entries=2, ttl=10, clock=lambda: now[0])
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)  # evicts 'b', the least recently used
+        self.assertIsNone(cache.get('b'))
+        now[0] = 11
+        self.assertIsNone(cache.get('a'))
+        stats = cache.stats()
+        self.assertEqual(stats['lru_evictions'], 1)
+        self.assertEqual(stats['ttl_evictions'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+
+class SQLiteCartStorageTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'carts.sqlite3')
+        self.store = SQLiteCartStorage(self.path, ttl=60, max_carts=2, front_size=10, front_ttl=30)
+
+    def test_writes_from_other_workers_are_visible(self):
+        other_worker = SQLiteCartStorage(self.path, ttl=60, max_carts=2, front_size=10, front_ttl=30)
+        self.store.add_item('u1', 'p1', 1)
+        self.assertEqual(other_worker.get_cart('u1'), {'p1': 1})
+        self.store.add_item('u1', 'p1', 2)
+        self.assertEqual(other_worker.get_cart('u1'), {'p1': 3})
+        other_worker.remove_item('u1', 'p1')
+        self.assertEqual(self.store.get_cart('u1'), {})
+
+    def test_expired_carts_are_purged(self):
+        self.store.add_item('u1', 'p1', 1)
+        with mock.patch('cart.local_store.time.time', return_value=10 ** 12):
+            self.assertEqual(self.store.purge(), 1)
+        self.assertEqual(self.store.get_cart('u1'), {})
+        self.assertEqual(self.store.stats()['expired_evictions'], 1)
+
+    def test_oldest_carts_evicted_over_capacity(self):
+        for uid in ('u1', 'u2', 'u3'):
+            self.store.add_item(uid, 'p1', 1)
+        self.store.purge()
+        stats = self.store.stats()
+        self.assertEqual(stats['carts'], 2)
+        self.assertEqual(stats['capacity_evictions'], 1)
+        self.assertEqual(self.store.get_cart('u1'), {})
+
+    def test_views_store_is_outside_the_repo_during_tests(self):
+        from django.conf import settings
+        from . import redis_client
+        if isinstance(redis_client.r, SQLiteCartStorage):
+            self.assertFalse(os.path.abspath(redis_client.r.path).startswith(str(settings.BASE_DIR)))
+
+
+class AsyncCartViewTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(email='acart@example.com', username='acart', password='pass12345')
+        self.client = APIClient()
+        token = self.client.post('/api/auth/token/', {'email': 'acart@example.com', 'password': 'pass12345'}).data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.url = reverse('async-cart')
+
+    def test_requires_token(self):
+        res = APIClient().get(self.url)
+        self.assertEqual(res.status_code, 401)
+        self.assertIn('Bearer', res['WWW-Authenticate'])
+
+    def test_add_get_delete(self):
+        a, b = str(uuid.uuid4()), str(uuid.uuid4())
+        with mock.patch('cart.views.ar', AsyncCartStorage(SimpleCartStorage)):
+            res = self.client.post(self.url, [{'product_id': a, 'quantity': 1}, {'product_id': b, 'quantity': 3}], format='json')
+            self.assertEqual((res.status_code, res.json()), (201, {a: 1, b: 3}))
+            self.assertEqual(self.client.delete(self.url, {'product_id': a}, format='json').json(), {b: 3})
+            self.assertEqual(self.client.get(self.url).json(), {b: 3})
+            res = self.client.post(self.url, {'product_id': a, 'quantity': 0}, format='json')
+            self.assertEqual(res.status_code, 400)
+            self.assertIn('quantity', res.json())
+
+    def test_async_redis_store_shares_data_with_sync_store(self):
+        server = fakeredis.FakeServer()
+        store = AsyncRedisCartStorage(lambda: fakeredis.aioredis.FakeRedis(server=server), ttl=60)
+        a = str(uuid.uuid4())
+        with mock.patch('cart.views.ar', store):
+            self.client.post(self.url, {'product_id': a, 'quantity': 2}, format='json')
+            self.assertEqual(self.client.get(self.url).json(), {a: 2})
+        sync = RedisCartStorage(fakeredis.FakeRedis(server=server), ttl=60)
+        self.assertEqual(sync.get_cart(User.objects.get().id), {a: 2})
+
+
+class CartViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='cart@example.com', username='cart', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('cart')
+        SimpleCartStorage.clear(self.user.id)
+        patcher = mock.patch('cart.views.r', SimpleCartStorage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_add_single_and_multiple_lines(self):
+        a, b = str(uuid.uuid4()), str(uuid.uuid4())
+        res = self.client.post(self.url, {'product_id': a, 'quantity': 2}, format='json')
+        self.assertEqual(res.status_code, 201)
+        res = self.client.post(self.url, [{'product_id': a, 'quantity': 1}, {'product_id': b, 'quantity': 3}], format='json')
+        self.assertEqual(res.data, {a: 3, b: 3})
+
+    def test_get_runs_no_queries(self):
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_delete_line(self):
+        a = str(uuid.uuid4())
+        self.client.post(self.url, {'product_id': a, 'quantity': 2}, format='json')
+        res = self.client.delete(self.url, {'product_id': a}, format='json')
+        self.assertEqual(res.data, {})
+
+    def test_view_uses_redis_store(self):
+        store = RedisCartStorage(fakeredis.FakeRedis(), ttl=60)
+        a = str(uuid.uuid4())
+        with mock.patch('cart.views.r', store):
+            self.client.post(self.url, {'product_id': a, 'quantity': 2}, format='json')
+            res = self.client.get(self.url)
+        self.assertEqual(res.data, {a: 2})
+
+
+class HydratedCartViewTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='hydrate@example.com', username='hydrate', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('cart-hydrated')
+        self.in_stock = Product.objects.create(name='Mug', price='4.50', stock=10)
+        self.sold_out = Product.objects.create(name='Cap', price='9.99', stock=0)
+        self.gone = str(uuid.uuid4())
+        self.store = SimpleCartStorage
+        self.store.set_cart(self.user.id, {str(self.in_stock.pk): 2, str(self.sold_out.pk): 1, self.gone: 1})
+        patcher = mock.patch('cart.views.r', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lines_are_priced_and_flagged_with_one_query(self):
+        with self.assertMaxQueries(1):
+            res = self.client.get(self.url)
+        lines = {line['product_id']: line for line in res.data['items']}
+        self.assertEqual(lines[str(self.in_stock.pk)]['line_total'], '9.00')
+        self.assertEqual(lines[str(self.in_stock.pk)]['status'], 'ok')
+        self.assertEqual(lines[str(self.sold_out.pk)]['status'], 'out_of_stock')
+        self.assertEqual(lines[self.gone]['status'], 'unavailable')
+        self.assertEqual(res.data['total'], '9.00')
+
+    def test_repeated_views_use_snapshot_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_product_save_invalidates_snapshot(self):
+        self.client.get(self.url)
+        self.in_stock.price = '5.00'
+        self.in_stock.save()
+        res = self.client.get(self.url)
+        line = next(l for l in res.data['items'] if l['product_id'] == str(self.in_stock.pk))
+        self.assertEqual(line['line_total'], '10.00')
@@ -1,7 +1,13 @@
 # File: cart/urls.py
 from django.urls import path
-from .views import CartView
+from .views import AsyncCartView, CartView, HydratedCartView
 
 urlpatterns = [
     path('', CartView.as_view(), name='cart'),
+    path('hydrated/', HydratedCartView.as_view(), name='cart-hydrated'),
+]
+
+# mounted under /api/async/cart/
+async_urlpatterns = [
+    path('', AsyncCartView.as_view(), name='async-cart'),
 ]
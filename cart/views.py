@@ -3,7 +3,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
 from .serializers import CartItemSerializer
-from .redis_client import r
+from core.async_views import AsyncAPIView
+from .redis_client import ar, r
+from .services.cart_service import CartService
 # Create your views here.
 
 class CartView(APIView):
@@ -14,19 +16,52 @@ class CartView(APIView):
         return Response(cart)
 
     def post(self, request):
-        serializer = CartItemSerializer(data=request.data)
+        # accepts a single line or a list of lines, applied in one round trip
+        many = isinstance(request.data, list)
+        serializer = CartItemSerializer(data=request.data, many=many)
         serializer.is_valid(raise_exception=True)
-        cart = r.get_cart(request.user.id) or {}
-        pid = str(serializer.validated_data['product_id'])
-        qty = serializer.validated_data['quantity']
-        cart[pid] = cart.get(pid, 0) + qty
-        r.set_cart(request.user.id, cart)
+        lines = serializer.validated_data if many else [serializer.validated_data]
+        cart = r.add_items(
+            request.user.id,
+            [(line['product_id'], line['quantity']) for line in lines],
+        )
         return Response(cart, status=status.HTTP_201_CREATED)
 
     def delete(self, request):
         item = request.data.get('product_id')
-        cart = r.get_cart(request.user.id) or {}
-        if item and str(item) in cart:
-            cart.pop(str(item))
-            r.set_cart(request.user.id, cart)
+        if not item:
+            return Response(r.get_cart(request.user.id))
+        cart = r.remove_item(request.user.id, item)
         return Response(cart)
+
+
+class HydratedCartView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        cart = r.get_cart(request.user.id)
+        return Response(CartService.hydrate(cart, request))
+
+
+class AsyncCartView(AsyncAPIView):
+    """CartView for ASGI workers, over the async cart store."""
+
+    async def get(self, request):
+        return await ar.get_cart(request.user.id)
+
+    async def post(self, request):
+        many = isinstance(request.data, list)
+        serializer = CartItemSerializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+        lines = serializer.validated_data if many else [serializer.validated_data]
+        cart = await ar.add_items(
+            request.user.id,
+            [(line['product_id'], line['quantity']) for line in lines],
+        )
+        return cart, status.HTTP_201_CREATED
+
+    async def delete(self, request):
+        item = request.data.get('product_id') if isinstance(request.data, dict) else None
+        if not item:
+            return await ar.get_cart(request.user.id)
+        return await ar.remove_item(request.user.id, item)
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from core import metrics
+        connection_created.connect(metrics.instrument_connection)
+        metrics.instrument_serializers()
@@ -0,0 +1,92 @@
+# File: core/async_views.py
+# Base class for the async endpoints under /api/async/ (served by ASGI workers).
+import json
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from users.authentication import check_user
+from users.cache import UserCache
+
+
+class AsyncAPIView(View):
+    """
+    Async counterpart of APIView for hot paths under ASGI. JWT auth resolves
+    the user with the async ORM, bodies are JSON in and JSON out (rendered
+    with DRF's JSONRenderer, so payloads match the sync endpoints), and
+    APIExceptions become the same error responses DRF would send. No
+    browsable API, throttling or content negotiation.
+
+    Handlers are ``async def get/post/...`` receiving ``request.user``,
+    ``request.query_params`` (a DRF Request is attached as ``request.drf``)
+    and ``request.data``; they return plain data or ``(data, status)``.
+    """
+    authentication_required = True
+    renderer = JSONRenderer()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # token auth, not cookies (same as APIView)
+        view.csrf_exempt = True
+        return view
+
+    async def authenticate(self, request):
+        auth = JWTAuthentication()
+        header = auth.get_header(request)
+        raw = auth.get_raw_token(header) if header is not None else None
+        if raw is None:
+            return AnonymousUser()
+        # signature/expiry checks are CPU only; the user comes from UserCache
+        token = auth.get_validated_token(raw)
+        try:
+            user_id = token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise exceptions.AuthenticationFailed('Token contained no recognizable user identification')
+        try:
+            user = await UserCache.aget(user_id)
+        except get_user_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed('User not found')
+        return check_user(user, token)
+
+    @staticmethod
+    def parse(request):
+        if not request.body:
+            return {}
+        try:
+            return json.loads(request.body)
+        except ValueError as exc:
+            raise exceptions.ParseError(f'JSON parse error - {exc}')
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(self.renderer.render(data), status=status_code, content_type='application/json')
+
+    def handle_exception(self, exc):
+        detail = exc.detail
+        data = detail if isinstance(detail, (list, dict)) else {'detail': detail}
+        response = self.render(data, exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response['WWW-Authenticate'] = JWTAuthentication().authenticate_header(None)
+        return response
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await self.authenticate(request)
+            if self.authentication_required and not request.user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+            request.drf = Request(request)
+            request.query_params = request.drf.query_params
+            if request.method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+                request.data = self.parse(request)
+            result = await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+        if isinstance(result, HttpResponse):
+            return result
+        data, status_code = result if isinstance(result, tuple) else (result, status.HTTP_200_OK)
+        return self.render(data, status_code)
@@ -0,0 +1,136 @@
+# File: core/idempotency.py
+# Idempotency-Key handling for POST endpoints that create things (orders, payments).
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+# replayed with the stored body; anything else (5xx, throttling) may be retried for real
+STORED_HEADERS = ('Content-Type', 'Location')
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this Idempotency-Key is still being processed.'
+    default_code = 'idempotency_conflict'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'This Idempotency-Key was already used with a different request.'
+    default_code = 'idempotency_key_reused'
+
+
+class IdempotentReplay(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def cacheable(response):
+    return response.status_code < 500 and response.status_code not in (
+        status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS,
+    )
+
+
+class IdempotencyRecord:
+    """
+    One key in the IDEMPOTENCY_CACHE. ``claim()`` adds an in-flight marker
+    with the request fingerprint (``cache.add`` is atomic, so exactly one of
+    several concurrent duplicates gets it), ``save()`` replaces it with the
+    rendered response for IDEMPOTENCY_KEY_TTL seconds and ``release()``
+    drops it so a failed request can be retried.
+    """
+
+    def __init__(self, request, key, body):
+        user = request.user.pk if request.user and request.user.is_authenticated else 'anon'
+        scope = f'{user}:{request.method}:{request.path}:{key}'
+        self.cache = caches[settings.IDEMPOTENCY_CACHE]
+        self.key = hashlib.sha256(scope.encode()).hexdigest()
+        self.fingerprint = hashlib.sha256(body).hexdigest()
+
+    def claim(self):
+        """Take the key or raise: IdempotentReplay, IdempotencyConflict or IdempotencyKeyReused."""
+        marker = {'fingerprint': self.fingerprint, 'response': None}
+        for _ in range(2):
+            if self.cache.add(self.key, marker, settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                return
+            stored = self.cache.get(self.key)
+            if stored is None:
+                continue  # expired between add() and get()
+            if stored['fingerprint'] != self.fingerprint:
+                raise IdempotencyKeyReused()
+            if stored['response'] is None:
+                raise IdempotencyConflict()
+            raise IdempotentReplay(self.replay(stored['response']))
+        raise IdempotencyConflict()
+
+    def save(self, response):
+        response.render()
+        self.cache.set(self.key, {
+            'fingerprint': self.fingerprint,
+            'response': {
+                'status': response.status_code,
+                'content': response.content,
+                'headers': {name: response[name] for name in STORED_HEADERS if response.has_header(name)},
+            },
+        }, settings.IDEMPOTENCY_KEY_TTL)
+
+    def release(self):
+        self.cache.delete(self.key)
+
+    @staticmethod
+    def replay(stored):
+        response = HttpResponse(stored['content'], status=stored['status'])
+        for name, value in stored['headers'].items():
+            response[name] = value
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+
+class IdempotencyMixin:
+    """
+    For APIViews/ViewSets: a request carrying an ``Idempotency-Key`` header
+    runs once per user, endpoint and key. Duplicates with the same body get
+    the first response back (``Idempotent-Replayed: true``), duplicates that
+    arrive while it is still running get 409, and reusing a key with another
+    body is a 422. 5xx/409/429 responses are not stored, so those can be
+    retried with the same key. Requests without the header are untouched.
+    """
+    idempotent_methods = ('POST',)
+
+    def initial(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if key is None or request.method not in self.idempotent_methods:
+            return super().initial(request, *args, **kwargs)
+        # read before auth/permissions can parse the stream
+        body = request.body
+        super().initial(request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({'Idempotency-Key': f'Must be 1-{MAX_KEY_LENGTH} characters.'})
+        record = IdempotencyRecord(request, key, body)
+        record.claim()
+        self.idempotency = record
+
+    def handle_exception(self, exc):
+        if isinstance(exc, IdempotentReplay):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def dispatch(self, request, *args, **kwargs):
+        self.idempotency = None
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        except BaseException:
+            if self.idempotency:
+                self.idempotency.release()
+            raise
+        if self.idempotency:
+            if cacheable(response):
+                self.idempotency.save(response)
+            else:
+                self.idempotency.release()
+        return response
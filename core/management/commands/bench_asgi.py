@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.utils import percentiles
+from users.models import User
+
+# endpoint -> (WSGI path, ASGI path)
+ENDPOINTS = {
+    'cart': ('/api/cart/', '/api/async/cart/'),
+    'products': ('/api/products/?count=false', '/api/async/products/?count=false'),
+    'me': ('/api/auth/me/', '/api/async/auth/me/'),
+}
+
+
+def server_command(mode, address, workers):
+    if mode == 'wsgi':
+        return [sys.executable, '-m', 'gunicorn', 'ecommerce.wsgi:application',
+                '--workers', str(workers), '--bind', address, '--log-level', 'warning']
+    host, port = address.split(':')
+    return [sys.executable, '-m', 'uvicorn', 'ecommerce.asgi:application',
+            '--workers', str(workers), '--host', host, '--port', port, '--log-level', 'warning', '--no-access-log']
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+    headers = {key.lower(): value for key, value in headers.items()}
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    # gunicorn's sync workers don't keep connections alive
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def load(host, port, path, token, total, concurrency):
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+        f'Authorization: Bearer {token}\r\nConnection: keep-alive\r\n\r\n'
+    ).encode()
+    latencies, errors, remaining = [], 0, [total]
+
+    async def client():
+        nonlocal errors
+        writer = None
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                started = time.perf_counter()
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                writer.write(request)
+                status, keep_alive = await read_response(reader)
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors += status != 200
+                if not keep_alive:
+                    writer.close()
+                    writer = None
+        finally:
+            if writer is not None:
+                writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'per_second': round(len(latencies) / elapsed, 1),
+        **{f'{key}_ms': round(value, 2) for key, value in percentiles(latencies, (50, 95, 99)).items()},
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Throughput of the same endpoint served by gunicorn sync workers (WSGI) and by '
+        'uvicorn (ASGI, /api/async/ views) at high concurrency. Run with the production '
+        'settings you want to compare (e.g. CART_BACKEND=redis + REDIS_URL).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='cart')
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--port', type=int, default=8801)
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(email='bench-asgi@example.com', defaults={'username': 'bench-asgi'})
+        token = str(RefreshToken.for_user(user).access_token)
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)}
+        results = {'endpoint': options['endpoint'], 'concurrency': options['concurrency'], 'workers': options['workers']}
+        for mode, path in zip(('wsgi', 'asgi'), ENDPOINTS[options['endpoint']]):
+            host, port = '127.0.0.1', options['port']
+            server = subprocess.Popen(
+                server_command(mode, f'{host}:{port}', options['workers']), env=env, cwd=settings.BASE_DIR,
+            )
+            try:
+                self.wait_for(host, port, server)
+                # warm up every worker before measuring
+                asyncio.run(load(host, port, path, token, options['workers'] * 50, options['workers'] * 4))
+                results[mode] = asyncio.run(
+                    load(host, port, path, token, options['requests'], options['concurrency'])
+                )
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+        results['speedup'] = round(results['asgi']['per_second'] / max(results['wsgi']['per_second'], 1e-9), 2)
+        self.stdout.write(json.dumps(results, indent=2))
+
+    @staticmethod
+    def wait_for(host, port, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'server exited with {server.returncode}')
+            try:
+                socket.create_connection((host, port), timeout=0.5).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'server did not start on {host}:{port}')
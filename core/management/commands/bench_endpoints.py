@@ -0,0 +1,222 @@
+import http.client
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from rest_framework_simplejwt.tokens import AccessToken
+from core.utils import percentiles
+from products.models import Product
+from .seed_bench import seeded_categories, seeded_users
+
+
+class InProcess:
+    """Requests through Django's test client: no network, one DB connection per thread."""
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        response = self.client.generic(
+            method, path, json.dumps(body) if body is not None else '', content_type='application/json', **headers,
+        )
+        return response.status_code
+
+    def close(self):
+        connections.close_all()  # this thread's connections
+
+
+class LocalServer:
+    """Requests over one keep-alive HTTP connection to a running server."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.prefix = parts.path.rstrip('/')
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        payload = json.dumps(body) if body is not None else None
+        try:
+            self.connection.request(method, self.prefix + path, payload, headers)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()  # reconnects on the next request
+            return 599
+
+    def close(self):
+        self.connection.close()
+
+
+class Scenarios:
+    """
+    One request per call, drawn from the seeded data: ``name(rng)`` returns
+    ``(method, path, body, token)``.
+    """
+
+    def __init__(self, rng, pool):
+        categories = list(seeded_categories().values_list('id', flat=True))
+        users = list(seeded_users().order_by('?')[:pool])
+        if not categories or not users:
+            raise CommandError('No seeded data; run `manage.py seed_bench` first.')
+        self.categories = categories
+        self.tokens = [str(AccessToken.for_user(user)) for user in users]
+        products = Product.objects.filter(category__in=categories)
+        self.products = [str(pk) for pk in products.order_by('?').values_list('id', flat=True)[:pool * 10]]
+        # checkouts need stock; the product list may run dry on long runs
+        self.in_stock = [str(pk) for pk in products.filter(stock__gte=100).order_by('?').values_list('id', flat=True)[:pool * 10]]
+        names = products.order_by('?').values_list('name', flat=True)[:pool]
+        self.terms = sorted({word.lower() for name in names for word in name.split()})
+
+    def browse(self, rng):
+        query = 'count=false&page_size=20'
+        if rng.random() < 0.5:
+            query += f'&category={rng.choice(self.categories)}'
+        if rng.random() < 0.3:
+            query += '&ordering=price'
+        return 'GET', f'/api/products/?{query}', None, None
+
+    def detail(self, rng):
+        return 'GET', f'/api/products/{rng.choice(self.products)}/', None, None
+
+    def search(self, rng):
+        term = rng.choice(self.terms)
+        if rng.random() < 0.3:
+            term = term[:3]  # typing a prefix
+        return 'GET', f'/api/products/?q={term}&count=false', None, None
+
+    def cart(self, rng):
+        body = {'product_id': rng.choice(self.products), 'quantity': rng.randint(1, 3)}
+        return 'POST', '/api/cart/', body, rng.choice(self.tokens)
+
+    def checkout(self, rng):
+        # unit_price is required but ignored: the order is priced from the products
+        lines = rng.sample(self.in_stock, rng.randint(1, 3))
+        items = [{'product_id': pk, 'quantity': 1, 'unit_price': '0'} for pk in lines]
+        return 'POST', '/api/orders/', {'items': items}, rng.choice(self.tokens)
+
+    def history(self, rng):
+        return 'GET', '/api/orders/?count=false', None, rng.choice(self.tokens)
+
+
+SCENARIOS = ('browse', 'detail', 'search', 'cart', 'checkout', 'history')
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors.values()),
+        'error_statuses': {str(status): count for status, count in sorted(errors.items())},
+        'per_second': round(len(latencies) / elapsed, 1),
+        **{f'{key}_ms': value and round(value, 2) for key, value in percentiles(latencies).items()},
+    }
+
+
+def compare(results, baseline):
+    """``new / old`` for each timing: < 1 is faster latency, > 1 more requests/sec."""
+    changes = {}
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous:
+            changes[name] = {
+                key: round(current[key] / previous[key], 2) if previous[key] and current[key] is not None else None
+                for key in ('per_second', 'p50_ms', 'p95_ms', 'p99_ms')
+            }
+    return changes
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay endpoint scenarios (browse, detail, search, cart, checkout, history) against the data '
+        'from seed_bench with --concurrency threads, in process or against --url, and print '
+        'requests/sec and p50/p95/p99 per scenario as JSON. --output saves the run; --compare '
+        'adds new/old ratios against a saved one.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated subset.')
+        parser.add_argument('--requests', type=int, default=500, help='Measured requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=50, help='Unmeasured requests per scenario first.')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--url', default='', help='Base URL of a running server (default: in process).')
+        parser.add_argument('--users', type=int, default=200, help='Seeded users to authenticate as.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default='', help='Also write the JSON to this file.')
+        parser.add_argument('--compare', default='', help='JSON of an earlier run to compare with.')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+        if not options['url']:
+            # errors are counted per status; one log line per 4xx would bury the results
+            logging.getLogger('django.request').setLevel(logging.ERROR)
+        rng = random.Random(options['seed'])
+        scenarios = Scenarios(rng, options['users'])
+        results = {
+            'target': options['url'] or 'in-process',
+            'concurrency': options['concurrency'],
+            'dataset': {
+                'products': Product.objects.count(),
+                'seeded_users': seeded_users().count(),
+            },
+            'scenarios': {},
+        }
+        for name in names:
+            build = getattr(scenarios, name)
+            if options['warmup']:
+                self.run(build, options['warmup'], options, rng.random())
+            results['scenarios'][name] = self.run(build, options['requests'], options, rng.random())
+            self.stderr.write(f'{name}: {json.dumps(results["scenarios"][name])}')
+        if options['compare']:
+            with open(options['compare']) as previous:
+                results['compare'] = compare(results, json.load(previous))
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as out:
+                out.write(output + '\n')
+        self.stdout.write(output)
+
+    def run(self, build, total, options, seed):
+        """``total`` requests of one scenario spread over --concurrency threads."""
+        latencies, errors = [], Counter()
+        remaining = iter(range(total))
+        lock = threading.Lock()
+
+        def worker(index):
+            rng = random.Random(f'{seed}-{index}')
+            transport = LocalServer(options['url']) if options['url'] else InProcess()
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    method, path, body, token = build(rng)
+                    started = time.perf_counter()
+                    status = transport.request(method, path, body, token)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        if status >= 400:
+                            errors[status] += 1
+            finally:
+                transport.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['concurrency'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return summarize(latencies, errors, time.perf_counter() - started)
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from core.query_plans import capture_statements, plan_problems
+from orders.models import Order
+from products.models import Product
+
+# (label, path, query params) with {product}/{category}/{order} filled from existing rows
+ENDPOINTS = [
+    ('product list', '/api/products/', {'count': 'false'}),
+    ('product list by category', '/api/products/', {'count': 'false', 'category': '{category}', 'ordering': 'price'}),
+    ('product detail', '/api/products/{product}/', {}),
+    ('order list', '/api/orders/', {'count': 'false'}),
+    ('order detail', '/api/orders/{order}/', {}),
+]
+
+DUMMY_CACHE = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN every query behind the main API endpoints and fail on full table scans "
+        "of tables with at least --min-rows rows. Sorts not covered by an index are reported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-rows', type=int, default=1000, help='Ignore scans of smaller tables.')
+
+    def samples(self):
+        samples = {}
+        product = Product.objects.exclude(category=None).order_by().first() or Product.objects.order_by().first()
+        if product:
+            samples['product'] = product.pk
+            if product.category_id:
+                samples['category'] = product.category_id
+        order = Order.objects.select_related('user').order_by().first()
+        if order:
+            samples['order'] = order.pk
+            samples['user'] = order.user
+        return samples
+
+    def handle(self, *args, **options):
+        samples = self.samples()
+        client = APIClient()
+        if 'user' in samples:
+            client.force_authenticate(samples['user'])
+        caches = {alias: DUMMY_CACHE for alias in settings.CACHES}
+        scans = 0
+        # read-only GETs through the real views, with response caching off so every query runs
+        with override_settings(CACHES=caches, ALLOWED_HOSTS=['testserver']):
+            for label, path, params in ENDPOINTS:
+                try:
+                    path = path.format(**samples)
+                    params = {key: value.format(**samples) for key, value in params.items()}
+                except KeyError:
+                    self.stdout.write(f'{label}: skipped (no sample rows)')
+                    continue
+                with capture_statements() as statements:
+                    response = client.get(path, params)
+                if response.status_code != 200:
+                    self.stdout.write(f'{label}: skipped (HTTP {response.status_code})')
+                    continue
+                problems = plan_problems(statements, min_rows=options['min_rows'])
+                self.stdout.write(f'{label}: {len(statements)} queries, {len(problems)} plan issue(s)')
+                for sql, kind, table in problems:
+                    scans += kind == 'full scan'
+                    where = f' on {table}' if table else ''
+                    self.stdout.write(f'  {kind}{where}: {sql[:200]}')
+        if scans:
+            raise CommandError(f"{scans} full scan(s) on tables with >= {options['min_rows']} rows")
@@ -0,0 +1,84 @@
+import io
+import os
+import pstats
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.profiling import FOLDED, PSTATS, split_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge the request profiles in PROFILE_DIR per endpoint (ProductViewSet.list, CartView.post, ...). "
+        "Sampler profiles become one collapsed-stack file per endpoint (flamegraph.pl / speedscope), "
+        "cProfile ones one pstats file (snakeviz); the hottest functions are printed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None, help='Profile directory (default PROFILE_DIR).')
+        parser.add_argument('--view', default='', help='Only endpoints whose tag contains this.')
+        parser.add_argument('--top', type=int, default=15, help='Functions listed per endpoint.')
+        parser.add_argument('--sort', default='cumulative', help='pstats sort key for cProfile profiles.')
+        parser.add_argument('--output', default=None, help='Write merged <endpoint>.folded/.prof files here.')
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or settings.PROFILE_DIR
+        if not os.path.isdir(directory):
+            raise CommandError(f'No profiles in {directory} (is PROFILE_SAMPLE_RATE or PROFILE_TOKEN set?)')
+        groups = defaultdict(lambda: defaultdict(list))
+        for name in sorted(os.listdir(directory)):
+            parsed = split_name(name)
+            if parsed and options['view'] in parsed[0]:
+                groups[parsed[0]][parsed[1]].append(os.path.join(directory, name))
+        if not groups:
+            self.stdout.write('No matching profiles.')
+            return
+        if options['output']:
+            os.makedirs(options['output'], exist_ok=True)
+
+        for tag in sorted(groups):
+            if groups[tag][FOLDED]:
+                self.report_folded(tag, groups[tag][FOLDED], options)
+            if groups[tag][PSTATS]:
+                self.report_pstats(tag, groups[tag][PSTATS], options)
+
+    def report_folded(self, tag, paths, options):
+        stacks = Counter()
+        for path in paths:
+            with open(path) as profile:
+                for line in profile:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if stack:
+                        stacks[stack] += int(count)
+        total = sum(stacks.values())
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{tag}: {len(paths)} requests, {total} samples'))
+        if options['output']:
+            merged = os.path.join(options['output'], f'{tag}{FOLDED}')
+            with open(merged, 'w') as out:
+                for stack, count in stacks.most_common():
+                    out.write(f'{stack} {count}\n')
+            self.stdout.write(f'  flamegraph input: {merged}')
+        if not total:
+            return
+        own, inclusive = Counter(), Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        self.stdout.write(f"  {'self %':>7} {'total %':>8}  function")
+        for frame, count in own.most_common(options['top']):
+            self.stdout.write(f'  {100 * count / total:6.1f}% {100 * inclusive[frame] / total:7.1f}%  {frame}')
+
+    def report_pstats(self, tag, paths, options):
+        # pstats print()s in fragments, which self.stdout would put on separate lines
+        report = io.StringIO()
+        stats = pstats.Stats(*paths, stream=report)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{tag}: {len(paths)} requests (cProfile)'))
+        if options['output']:
+            merged = os.path.join(options['output'], f'{tag}{PSTATS}')
+            stats.dump_stats(merged)
+            self.stdout.write(f'  pstats: {merged}')
+        stats.files = []  # don't list every merged file
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(options['top'])
+        self.stdout.write(report.getvalue())
@@ -0,0 +1,240 @@
+import itertools
+import json
+import math
+import random
+import time
+import uuid
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.utils import timezone
+from orders.models import Order, OrderItem
+from products.cache import CatalogCache
+from products.management.commands.bench_search import vocabulary
+from products.models import Category, Product, StockReservation
+from users.models import User
+
+# seeded categories are named 'seed-bench-0001', users 'seed-bench-1@example.com', ...
+MARKER = 'seed-bench'
+PASSWORD = 'seed-bench'
+
+
+def seeded_categories():
+    return Category.objects.filter(name__startswith=f'{MARKER}-')
+
+
+def seeded_users():
+    return User.objects.filter(email__startswith=f'{MARKER}-', email__endswith='@example.com')
+
+
+def zipf(n, skew):
+    """Cumulative weights for ``rng.choices``: rank r drawn with p ~ 1 / r**skew (0 = uniform)."""
+    return list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(n)))
+
+
+def parse_weights(value):
+    try:
+        pairs = [item.split('=') for item in value.split(',')]
+        return {key.strip().upper(): float(weight) for key, weight in pairs}
+    except ValueError:
+        raise CommandError(f'Expected STATUS=weight,... got {value!r}')
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Keep the generated created_at/updated_at values (auto_now(_add) would overwrite them)."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def delete_rows(queryset):
+    """
+    One DELETE ... WHERE pk IN (subquery), without loading rows or sending
+    signals: restoring stock for orders whose products go too is wasted work.
+    """
+    model = queryset.model
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    sql, params = queryset.values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {qn(model._meta.db_table)} WHERE {qn(model._meta.pk.column)} IN ({sql})', params)
+        return cursor.rowcount
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-generate a synthetic dataset for load tests (see bench_endpoints): categories, '
+        'products, users, orders and order items with Zipf-skewed category sizes, product '
+        'popularity and orders per user, log-normal prices and timestamps spread over --days. '
+        f'Seeded users can log in with password "{PASSWORD}".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=500)
+        parser.add_argument('--products', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--orders', type=int, default=300_000)
+        parser.add_argument('--items-per-order', type=int, default=3, help='Mean; each order gets 1..2*mean-1.')
+        parser.add_argument('--category-skew', type=float, default=1.0, help='Zipf exponent of products per category.')
+        parser.add_argument('--popularity-skew', type=float, default=1.1, help='Zipf exponent of product sales.')
+        parser.add_argument('--user-skew', type=float, default=0.8, help='Zipf exponent of orders per user.')
+        parser.add_argument('--price-median', type=float, default=30.0)
+        parser.add_argument('--price-spread', type=float, default=1.0, help='Sigma of the log-normal price.')
+        parser.add_argument('--days', type=int, default=365, help='Spread created_at over this many days.')
+        parser.add_argument('--statuses', default='PENDING=10,PAID=60,SHIPPED=25,CANCELLED=5')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help='Delete the seeded data first.')
+        parser.add_argument('--clear-only', action='store_true', help='Delete the seeded data and stop.')
+
+    def handle(self, *args, **options):
+        if options['clear'] or options['clear_only']:
+            self.clear()
+            if options['clear_only']:
+                return
+        if seeded_categories().exists():
+            raise CommandError('Seeded data already exists; pass --clear to rebuild it.')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.span = options['days'] * 86400
+        statuses = parse_weights(options['statuses'])
+
+        started, counts = time.perf_counter(), {}
+        with explicit_timestamps(Product._meta.get_field('created_at'), Product._meta.get_field('updated_at'),
+                                 Order._meta.get_field('created_at')):
+            category_ids = self.seed_categories(options['categories'])
+            product_ids, prices = self.seed_products(category_ids, options)
+            user_ids = self.seed_users(options['users'])
+            counts['orders'], counts['order_items'] = self.seed_orders(product_ids, prices, user_ids, statuses, options)
+        # bulk_create sends no post_save, so the catalog cache has to be told
+        CatalogCache.bump()
+        counts.update(categories=len(category_ids), products=len(product_ids), users=len(user_ids))
+        counts['seconds'] = round(time.perf_counter() - started, 1)
+        self.stdout.write(json.dumps(counts, indent=2))
+
+    def created_at(self):
+        return self.now - timedelta(seconds=self.rng.random() * self.span)
+
+    def progress(self, label, done, total):
+        self.stderr.write(f'{label}: {done}/{total}', ending='\n' if done >= total else '\r')
+
+    def batches(self, label, total):
+        for start in range(0, total, self.batch_size):
+            size = min(self.batch_size, total - start)
+            yield size
+            self.progress(label, start + size, total)
+
+    @transaction.atomic
+    def seed_categories(self, count):
+        Category.objects.bulk_create(
+            [Category(name=f'{MARKER}-{i:04d}') for i in range(1, count + 1)], batch_size=self.batch_size,
+        )
+        return list(seeded_categories().order_by('name').values_list('id', flat=True))
+
+    @transaction.atomic
+    def seed_products(self, category_ids, options):
+        rng = self.rng
+        words = vocabulary(5000, rng)
+        word_weights = zipf(len(words), 1.0)
+        category_weights = zipf(len(category_ids), options['category_skew'])
+        mu, sigma = math.log(options['price_median']), options['price_spread']
+        ids, prices = [], array('l')
+        for size in self.batches('products', options['products']):
+            batch = []
+            for _ in range(size):
+                created_at = self.created_at()
+                cents = max(50, min(99_999_999, round(rng.lognormvariate(mu, sigma) * 100)))
+                product = Product(
+                    id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                    name=' '.join(rng.choices(words, cum_weights=word_weights, k=3)).title(),
+                    description=' '.join(rng.choices(words, cum_weights=word_weights, k=12)),
+                    price=Decimal(cents) / 100,
+                    stock=rng.randint(0, 500),
+                    category_id=rng.choices(category_ids, cum_weights=category_weights)[0],
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+                batch.append(product)
+                ids.append(product.id)
+                prices.append(cents)
+            Product.objects.bulk_create(batch, batch_size=self.batch_size)
+        return ids, prices
+
+    @transaction.atomic
+    def seed_users(self, count):
+        password = make_password(PASSWORD)  # hashing is slow; every seeded user shares the hash
+        ids = []
+        for size in self.batches('users', count):
+            batch = []
+            for _ in range(size):
+                number = len(ids) + len(batch) + 1
+                batch.append(User(
+                    id=uuid.UUID(int=self.rng.getrandbits(128), version=4),
+                    email=f'{MARKER}-{number}@example.com', username=f'{MARKER}-{number}', password=password,
+                ))
+            User.objects.bulk_create(batch, batch_size=self.batch_size)
+            ids.extend(user.id for user in batch)
+        return ids
+
+    @transaction.atomic
+    def seed_orders(self, product_ids, prices, user_ids, statuses, options):
+        rng = self.rng
+        # ranks are shuffled so the best sellers are not simply the first products inserted
+        popular = list(range(len(product_ids)))
+        rng.shuffle(popular)
+        popularity = zipf(len(popular), options['popularity_skew'])
+        buyers = zipf(len(user_ids), options['user_skew'])
+        status_names, status_weights = list(statuses), list(statuses.values())
+        most_items = max(1, 2 * options['items_per_order'] - 1)
+        items_total = 0
+        for size in self.batches('orders', options['orders']):
+            orders, items = [], []
+            for _ in range(size):
+                order = Order(
+                    id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                    user_id=rng.choices(user_ids, cum_weights=buyers)[0],
+                    status=rng.choices(status_names, status_weights)[0],
+                    created_at=self.created_at(),
+                )
+                total = 0
+                picked = set(rng.choices(popular, cum_weights=popularity, k=rng.randint(1, most_items)))
+                for index in picked:
+                    quantity = rng.choice((1, 1, 1, 2, 2, 3))
+                    total += prices[index] * quantity
+                    items.append(OrderItem(
+                        order=order, product_id=product_ids[index], quantity=quantity,
+                        unit_price=Decimal(prices[index]) / 100,
+                    ))
+                order.total_price = Decimal(total) / 100
+                orders.append(order)
+            Order.objects.bulk_create(orders, batch_size=self.batch_size)
+            OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+            items_total += len(items)
+        return options['orders'], items_total
+
+    @transaction.atomic
+    def clear(self):
+        products = Product.objects.filter(category__in=seeded_categories())
+        orders = Order.objects.filter(user__in=seeded_users())
+        deleted = {
+            'order_items': delete_rows(OrderItem.objects.filter(order__in=orders)),
+            'orders': delete_rows(orders),
+            'reservations': delete_rows(StockReservation.objects.filter(product__in=products)),
+            'products': delete_rows(products),
+        }
+        # users and categories are few enough for the ORM (and its cascades)
+        deleted['users'] = seeded_users().delete()[1].get(User._meta.label, 0)
+        deleted['categories'] = seeded_categories().delete()[1].get(Category._meta.label, 0)
+        CatalogCache.bump()
+        self.stderr.write(f'cleared {json.dumps(deleted)}')
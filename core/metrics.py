@@ -0,0 +1,168 @@
+# File: core/metrics.py
+# Per-view request metrics (core.middleware.MetricsMiddleware) and their Prometheus text exposition.
+import contextvars
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from rest_framework.serializers import BaseSerializer
+
+# the RequestMetrics of the request being handled; copied into sync_to_async threads
+current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'db_queries', 'db_time', 'serialize_time', 'serialize_depth', 'render_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = self.serialize_time = self.render_time = 0.0
+        self.serialize_depth = 0
+
+    def server_timing(self, total):
+        app = max(0.0, total - self.db_time - self.serialize_time - self.render_time)
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.db_queries} queries"',
+            f'serialize;dur={self.serialize_time * 1000:.2f}',
+            f'render;dur={self.render_time * 1000:.2f}',
+            f'app;dur={app * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+
+
+def _label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _bound(value):
+    return '+Inf' if value == math.inf else repr(float(value))
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram keyed by a tuple of label values. Kept per
+    process: each worker reports what it served (like gateway_stats).
+    """
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * len(self.buckets), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def expose(self):
+        with self.lock:
+            snapshot = sorted((labels, list(counts), total) for labels, (counts, total) in self.series.items())
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, counts, total in snapshot:
+            pairs = ','.join(f'{name}="{_label(value)}"' for name, value in zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{pairs},le="{_bound(bound)}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{pairs}}} {total}')
+            lines.append(f'{self.name}_count{{{pairs}}} {cumulative}')
+        return lines
+
+    def reset(self):
+        with self.lock:
+            self.series.clear()
+
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Request latency by view, method and status.',
+    ('view', 'method', 'status'), SECONDS,
+)
+DB_DURATION = Histogram('http_db_duration_seconds', 'Time spent in SQL per request.', ('view', 'method'), SECONDS)
+DB_QUERIES = Histogram(
+    'http_db_queries', 'SQL statements per request.', ('view', 'method'), (0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+SERIALIZE_DURATION = Histogram(
+    'http_serialize_duration_seconds', 'Time spent serializing responses per request.', ('view', 'method'), SECONDS,
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Response body size as sent (after compression).', ('view', 'method'),
+    (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+HISTOGRAMS = (REQUEST_DURATION, DB_DURATION, DB_QUERIES, SERIALIZE_DURATION, RESPONSE_SIZE)
+
+
+def record(view, method, status, metrics, total, size):
+    REQUEST_DURATION.observe((view, method, str(status)), total)
+    DB_DURATION.observe((view, method), metrics.db_time)
+    DB_QUERIES.observe((view, method), metrics.db_queries)
+    SERIALIZE_DURATION.observe((view, method), metrics.serialize_time)
+    if size is not None:
+        RESPONSE_SIZE.observe((view, method), size)
+
+
+def expose():
+    return '\n'.join(line for histogram in HISTOGRAMS for line in histogram.expose()) + '\n'
+
+
+def reset():
+    for histogram in HISTOGRAMS:
+        histogram.reset()
+
+
+def time_queries(execute, sql, params, many, context):
+    """connection.execute_wrapper hook; a no-op outside a measured request."""
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.db_queries += 1
+
+
+def instrument_connection(sender, connection, **kwargs):
+    # connection_created fires again on every reconnect of the same wrapper
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+@contextmanager
+def serializing():
+    """Count the block as serializer time, unless an enclosing block already does."""
+    metrics = current.get()
+    if metrics is None or metrics.serialize_depth:
+        yield
+        return
+    metrics.serialize_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serialize_depth -= 1
+        metrics.serialize_time += time.perf_counter() - started
+
+
+def instrument_serializers():
+    """Time the outermost ``.data`` of each serializer (nested ones are part of it)."""
+    data = BaseSerializer.data.fget
+    if getattr(data, 'instrumented', False):
+        return
+
+    def timed_data(self):
+        with serializing():
+            return data(self)
+
+    timed_data.instrumented = True
+    BaseSerializer.data = property(timed_data)
@@ -0,0 +1,168 @@
+# File: core/middleware.py
+import os
+import random
+import re
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from core import metrics, profiling
+from core.nplusone import QueryShapeDetector
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+re_accepts_br = re.compile(r'\bbr\b')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress JSON responses of at least COMPRESSION_MIN_SIZE bytes: brotli
+    when the client accepts ``br`` and the ``brotli`` package is installed,
+    gzip (Django's GZipMiddleware, with its BREACH length padding) otherwise.
+    """
+
+    def process_response(self, request, response):
+        if not response.get('Content-Type', '').startswith('application/json'):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        accepts_br = re_accepts_br.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is None or not accepts_br or response.streaming or response.has_header('Content-Encoding'):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Records latency, SQL count/time, serializer time and response size per
+    resolved view into core.metrics (served at /metrics) and reports the
+    same split in a ``Server-Timing`` header. Goes first in MIDDLEWARE so it
+    sees the whole stack and the compressed size. Works under WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        measured = metrics.RequestMetrics()
+        token = metrics.current.set(measured)
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self.finish(request, response, measured)
+
+    async def __acall__(self, request):
+        measured = metrics.RequestMetrics()
+        token = metrics.current.set(measured)
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self.finish(request, response, measured)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns
+        measured = metrics.current.get()
+        if measured is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                measured.render_time += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, measured):
+        total = time.perf_counter() - measured.started
+        match = request.resolver_match
+        view = (match.view_name or match._func_path) if match else 'unresolved'
+        size = None if response.streaming else len(response.content)
+        metrics.record(view, request.method, response.status_code, measured, total, size)
+        if settings.METRICS_SERVER_TIMING:
+            response.headers['Server-Timing'] = measured.server_timing(total)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profiles PROFILE_SAMPLE_RATE of requests, plus any request sending
+    ``X-Profile: <PROFILE_TOKEN>``, with PROFILER ('sampler' or 'cprofile')
+    and saves the result in PROFILE_DIR tagged by view (see core.profiling
+    and ``manage.py profile_report``). The response names the file in
+    ``X-Profile-Id``. Removed from the stack when neither is configured.
+    Profiles cover the request thread, so async views under ASGI are not
+    traced past the middleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILE_SAMPLE_RATE and not settings.PROFILE_TOKEN:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.profiler_class, self.suffix = profiling.PROFILERS[settings.PROFILER]
+
+    def wanted(self, request):
+        token = request.headers.get('X-Profile')
+        if token is not None and settings.PROFILE_TOKEN:
+            return constant_time_compare(token, settings.PROFILE_TOKEN)
+        return random.random() < settings.PROFILE_SAMPLE_RATE
+
+    def __call__(self, request):
+        if not self.wanted(request):
+            return self.get_response(request)
+        profiler = self.profiler_class(settings.PROFILE_SAMPLE_INTERVAL)
+        try:
+            profiler.start()
+        except ValueError:  # another profiler owns the interpreter
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        finally:
+            profiler.stop()
+        path = profiling.save(profiler, profiling.view_tag(request), self.suffix)
+        response.headers['X-Profile-Id'] = os.path.basename(path)
+        return response
+
+
+class NPlusOneMiddleware:
+    """
+    Runs each request, rendering included, under a QueryShapeDetector
+    (core.nplusone) in NPLUSONE_MODE: 'warn' logs repeated query shapes,
+    'raise' turns them into errors. Removed from the stack when it is off.
+    """
+
+    def __init__(self, get_response):
+        if not settings.NPLUSONE_MODE:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryShapeDetector(f'{request.method} {request.path}'):
+            response = self.get_response(request)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        return response
@@ -0,0 +1,136 @@
+# File: core/nplusone.py
+# Development-time N+1 detection: the same SELECT shape repeated within one request or test.
+import contextvars
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# the innermost active detector; outer ones ignore queries while it runs
+current = contextvars.ContextVar('nplusone_detector', default=None)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN \((?:\?, )*\?\)', re.IGNORECASE)
+SPACE_RE = re.compile(r'\s+')
+
+# frames that wrap every query and never explain one
+INTERNAL = (
+    os.path.join('django', 'db') + os.sep,
+    os.path.join('core', 'nplusone.py'),
+    os.path.join('core', 'metrics.py'),
+    os.path.join('core', 'middleware.py'),
+)
+
+
+class NPlusOneError(AssertionError):
+    """A query shape ran NPLUSONE_THRESHOLD times within one detector scope."""
+
+
+def shape(sql):
+    """SQL with literals and placeholders as ``?`` and ``IN`` lists collapsed."""
+    sql = STRING_RE.sub('?', sql).replace('%s', '?')
+    sql = IN_LIST_RE.sub('IN (...)', NUMBER_RE.sub('?', sql))
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def _relative(path):
+    for root in (str(settings.BASE_DIR),) + tuple(p for p in sys.path if p.endswith('-packages')):
+        if path.startswith(root + os.sep):
+            return path[len(root) + 1:]
+    return path
+
+
+def origin():
+    """
+    ``(caller, app frame)``: the innermost frame outside the database layer
+    (the attribute access or loop that ran the query) and the innermost one
+    in this project, as ``path:line in function``.
+    """
+    base = str(settings.BASE_DIR) + os.sep
+    caller = app = None
+    frame = sys._getframe(1)
+    while frame is not None and app is None:
+        path = frame.f_code.co_filename
+        if not any(part in path for part in INTERNAL):
+            where = f'{_relative(path)}:{frame.f_lineno} in {frame.f_code.co_name}'
+            caller = caller or where
+            if path.startswith(base) and '-packages' not in path:
+                app = where
+        frame = frame.f_back
+    return caller, app
+
+
+class QueryShapeDetector:
+    """
+    Counts the SELECT shapes run on this thread inside the block and flags
+    any shape run ``threshold`` times: the mark of a relation loaded once
+    per row instead of with select_related()/prefetch_related(). In 'raise'
+    mode the query that reaches the threshold raises NPlusOneError, so the
+    traceback points at the loop; in 'warn' mode each shape is logged when
+    the block ends; any other mode only records them (``problems``). Use
+    ``ignore()`` for repetition that is intended.
+    """
+
+    def __init__(self, label='', mode=None, threshold=None):
+        self.label = label
+        self.mode = mode or settings.NPLUSONE_MODE or 'warn'
+        self.threshold = threshold or settings.NPLUSONE_THRESHOLD
+        self.counts = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and current.get() is self and sql.lstrip()[:6].upper() == 'SELECT':
+            self.seen(sql)
+        return execute(sql, params, many, context)
+
+    def seen(self, sql):
+        key = shape(sql)
+        self.counts[key] += 1
+        if self.counts[key] == self.threshold:
+            self.origins[key] = origin()
+            if self.mode == 'raise':
+                raise NPlusOneError(self.describe(key))
+
+    def describe(self, key):
+        caller, app = self.origins[key]
+        where = f'{self.label}: ' if self.label else ''
+        lines = [f'{where}{self.counts[key]}x {key}', f'  from {caller}']
+        if app and app != caller:
+            lines.append(f'  in {app}')
+        return '\n'.join(lines)
+
+    @property
+    def problems(self):
+        """Shapes that reached the threshold, most repeated first."""
+        return [key for key, count in self.counts.most_common() if count >= self.threshold]
+
+    def __enter__(self):
+        self.token = current.set(self)
+        self.wrappers = ExitStack()
+        for connection in connections.all():
+            self.wrappers.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wrappers.close()
+        current.reset(self.token)
+        if self.mode == 'warn':
+            for key in self.problems:
+                logger.warning('Possible N+1 query: %s', self.describe(key))
+
+
+@contextmanager
+def ignore():
+    """Don't count the queries run inside the block (bulk jobs, intended loops)."""
+    token = current.set(None)
+    try:
+        yield
+    finally:
+        current.reset(token)
@@ -0,0 +1,188 @@
+# File: core/pagination.py
+# Keyset (cursor) pagination for the large, append-mostly listings.
+import datetime
+import decimal
+import json
+import uuid
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.response import Response
+
+
+def _cursor_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        # full precision: DjangoJSONEncoder would cut microseconds and skip rows
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def _ordering_field(queryset, name):
+    """The model field (or annotation output field) behind an ordering name."""
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    opts = queryset.model._meta
+    *relations, name = name.split('__')
+    for relation in relations:
+        opts = opts.get_field(relation).related_model._meta
+    return opts.pk if name == 'pk' else opts.get_field(name)
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Seeks on the queryset's own ordering (``-created_at`` by default, or
+    whatever OrderingFilter/search applied) plus ``pk`` as tiebreaker, so
+    every page is ``WHERE (key) < (last key) ORDER BY key LIMIT n`` instead of
+    an OFFSET scan. Ordering fields must be non-null.
+
+    ``count`` is included unless the client passes ``?count=false``
+    (infinite scroll doesn't need the extra COUNT(*)).
+    """
+    ordering = ('-created_at',)
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str) and field != '?']
+        ordering = ordering or list(self.ordering)
+        self.pk_name = pk_name = queryset.model._meta.pk.name
+        if not {'pk', pk_name} & {field.lstrip('-') for field in ordering}:
+            ordering.append(('-' if ordering[0].startswith('-') else '') + 'pk')
+        return tuple(ordering)
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() not in ('0', 'false', 'no')
+
+    def decode_position(self, request, queryset):
+        """
+        The cursor's key values as Python values; 404 for a cursor minted for
+        another ordering (``?ordering=``, search) or holding bad values.
+        """
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            return None, False
+        try:
+            position = json.loads(cursor.position)
+            if position['ordering'] != list(self.ordering) or len(position['values']) != len(self.ordering):
+                raise ValueError
+            values = [
+                _ordering_field(queryset, field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position['values'])
+            ]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return values, cursor.reverse
+
+    def seek(self, values, reverse):
+        """Rows strictly after ``values`` in ordering (before them when ``reverse``)."""
+        condition, equal = Q(), Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            condition |= equal & Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def page_queryset(self, queryset, request, view=None):
+        """The queryset fetching this page plus one row (None when pagination is off); no DB access."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        values, self.reverse = self.decode_position(request, queryset)
+        self.seeking = values is not None
+
+        if self.seeking:
+            queryset = queryset.filter(self.seek(values, self.reverse))
+        if self.reverse:
+            ordering = [field[1:] if field.startswith('-') else '-' + field for field in self.ordering]
+        else:
+            ordering = self.ordering
+        return queryset.order_by(*ordering)[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.seeking
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.page_queryset(queryset, request, view)
+        if page is None:
+            return None
+        self.count = queryset.count() if self.wants_count(request) else None
+        return self.set_page(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views, through the async ORM."""
+        page = self.page_queryset(queryset, request, view)
+        if page is None:
+            return None
+        self.count = await queryset.acount() if self.wants_count(request) else None
+        return self.set_page([row async for row in page])
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            if isinstance(instance, dict):
+                # .values() rows
+                value = instance[self.pk_name if name == 'pk' else name]
+            else:
+                value = instance
+                for attr in name.split('__'):
+                    value = getattr(value, attr)
+            values.append(_cursor_value(value))
+        return json.dumps({'ordering': list(ordering), 'values': values})
+
+    def _link(self, instance, reverse):
+        position = self._get_position_from_instance(instance, self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=reverse, position=position))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverse=True)
+
+    def get_paginated_data(self, data):
+        payload = {'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data}
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return payload
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'] = {
+            'count': {'type': 'integer', 'example': 123},
+            **response_schema['properties'],
+        }
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [{
+            'name': self.count_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Pass false to skip the total count.',
+            'schema': {'type': 'boolean'},
+        }]
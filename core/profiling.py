@@ -0,0 +1,152 @@
+# File: core/profiling.py
+# Opt-in per-request profiling (core.middleware.ProfilingMiddleware) and the files it writes.
+import cProfile
+import functools
+import os
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import Counter
+from django.conf import settings
+
+PSTATS, FOLDED = '.prof', '.folded'
+
+
+def view_tag(request):
+    """``ProductViewSet.list``, ``CartView.post``, ``metrics_view`` ... for the resolved view."""
+    match = request.resolver_match
+    if match is None:
+        return 'unresolved'
+    cls = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+    if cls is None:
+        return getattr(match.func, '__name__', 'view')
+    method = request.method.lower()
+    actions = getattr(match.func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+@functools.lru_cache(maxsize=8192)
+def frame_label(code):
+    path = code.co_filename
+    roots = (str(settings.BASE_DIR), sysconfig.get_paths()['stdlib'])
+    for root in roots + tuple(p for p in sys.path if p.endswith('-packages')):
+        if path.startswith(root):
+            path = path[len(root):].lstrip(os.sep)
+            break
+    return f'{code.co_name} ({path})'
+
+
+class StackSampler:
+    """
+    Statistical profiler for one thread: every ``interval`` seconds a
+    helper thread records the target thread's stack, and the result is the
+    collapsed-stack format (``root;caller;callee count``) flamegraph.pl and
+    speedscope read. Cost is paid by the sampling thread, not per call.
+
+    The helper needs the GIL to take a sample, so while any sampler runs the
+    interpreter's switch interval (5 ms by default) is lowered to
+    ``interval``; otherwise short requests would hardly be sampled at all.
+    """
+    _lock = threading.Lock()
+    _running = 0
+    _switch_interval = None
+
+    def __init__(self, interval, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.counts = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='profile-sampler', daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            # a sample taken after stop() only shows the request thread joining us
+            if stack and not self.stopped.is_set():
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        with StackSampler._lock:
+            if not StackSampler._running:
+                StackSampler._switch_interval = sys.getswitchinterval()
+            StackSampler._running += 1
+            sys.setswitchinterval(min(sys.getswitchinterval(), self.interval))
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        with StackSampler._lock:
+            StackSampler._running -= 1
+            if not StackSampler._running:
+                sys.setswitchinterval(StackSampler._switch_interval)
+
+    def dump(self, path):
+        with open(path, 'w') as out:
+            for stack, count in self.counts.most_common():
+                out.write(f'{stack} {count}\n')
+
+
+class CProfiler:
+    """cProfile for the request thread; pstats output (snakeviz, ``python -m pstats``)."""
+
+    def __init__(self, interval=None):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+PROFILERS = {'sampler': (StackSampler, FOLDED), 'cprofile': (CProfiler, PSTATS)}
+
+
+def profile_path(tag, suffix):
+    """``<PROFILE_DIR>/<view tag>.<unix ms>.<random>.<suffix>``, creating the directory."""
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    name = f'{tag}.{int(time.time() * 1000)}.{uuid.uuid4().hex[:8]}{suffix}'
+    return os.path.join(settings.PROFILE_DIR, name)
+
+
+def save(profiler, tag, suffix):
+    path = profile_path(tag, suffix)
+    partial = path + '.part'
+    profiler.dump(partial)
+    os.replace(partial, path)  # profile_report never sees half-written files
+    rotate()
+    return path
+
+
+def rotate():
+    """Keep the newest PROFILE_MAX_FILES profiles."""
+    directory = settings.PROFILE_DIR
+    files = [name for name in os.listdir(directory) if split_name(name)]
+    if len(files) <= settings.PROFILE_MAX_FILES:
+        return
+    files.sort(key=lambda name: int(name.rsplit('.', 3)[1]))
+    for name in files[:len(files) - settings.PROFILE_MAX_FILES]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass  # another worker rotated it first
+
+
+def split_name(filename):
+    """(view tag, suffix) of a profile file name, or None for anything else."""
+    for suffix in (PSTATS, FOLDED):
+        if filename.endswith(suffix):
+            parts = filename[:-len(suffix)].rsplit('.', 2)
+            if len(parts) == 3 and parts[1].isdigit():
+                return parts[0], suffix
+    return None
@@ -0,0 +1,98 @@
+# File: core/query_plans.py
+# EXPLAIN helpers used by check_query_plans and the test suites.
+import json
+import re
+from contextlib import contextmanager
+from django.db import connections
+
+SQLITE_SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+SQLITE_SORT_RE = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)')
+
+
+@contextmanager
+def capture_statements(using='default'):
+    """Collect ``(sql, params)`` of every statement run on ``using`` inside the block."""
+    statements = []
+
+    def wrapper(execute, sql, params, many, context):
+        if not many:
+            statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connections[using].execute_wrapper(wrapper):
+        yield statements
+
+
+def _sqlite_plan(cursor, sql, params):
+    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+    problems = []
+    for row in cursor.fetchall():
+        detail = row[-1]
+        scan = SQLITE_SCAN_RE.match(detail)
+        if scan:
+            problems.append(('full scan', scan.group(1)))
+        elif SQLITE_SORT_RE.search(detail):
+            problems.append(('sort', None))
+    return problems
+
+
+def _postgres_plan(cursor, sql, params):
+    cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    problems, nodes = [], [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan':
+            problems.append(('full scan', node['Relation Name']))
+        elif node['Node Type'] in ('Sort', 'Incremental Sort'):
+            problems.append(('sort', None))
+        nodes.extend(node.get('Plans', []))
+    return problems
+
+
+def explain(sql, params, using='default'):
+    """
+    ``[(kind, table)]`` for the plan of one SELECT: ``('full scan', table)``
+    for unindexed table scans and ``('sort', None)`` for sorts the index
+    order didn't cover. Other backends report nothing.
+    """
+    connection = connections[using]
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            return _sqlite_plan(cursor, sql, params)
+        if connection.vendor == 'postgresql':
+            return _postgres_plan(cursor, sql, params)
+    return []
+
+
+def table_rows(table, using='default'):
+    """Row count of ``table`` (the planner's estimate on PostgreSQL)."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+            row = cursor.fetchone()
+            return max(row[0], 0) if row else 0
+        cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+        return cursor.fetchone()[0]
+
+
+def plan_problems(statements, min_rows=0, using='default'):
+    """
+    Explain each captured statement; returns ``[(sql, kind, table)]`` for
+    full scans of tables with at least ``min_rows`` rows, and for sorts.
+    """
+    found, sizes = [], {}
+    for sql, params in statements:
+        for kind, table in explain(sql, params, using):
+            if table is not None:
+                if table not in sizes:
+                    sizes[table] = table_rows(table, using)
+                if sizes[table] < min_rows:
+                    continue
+            found.append((sql, kind, table))
+    return found
@@ -0,0 +1,89 @@
+# File: core/serializers.py
+# Sparse fieldsets: ?fields= / ?expand= on read endpoints.
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+class SparseSpec:
+    """
+    Parsed ``?fields=id,name,items.quantity`` and ``?expand=category,items.product``.
+
+    Dotted paths address nested serializers. A level with no paths listed
+    under it keeps all its fields. While either parameter is present,
+    expandable relations render as their pk unless named in ``expand``
+    (expanding ``a.b`` expands ``a`` too); without them responses are unchanged.
+    """
+
+    def __init__(self, fields=None, expand=()):
+        self.fields = set(fields) if fields is not None else None
+        self.expand = set()
+        for path in expand:
+            parts = path.split('.')
+            self.expand.update('.'.join(parts[:i]) for i in range(1, len(parts) + 1))
+
+    @staticmethod
+    def _split(value):
+        return [part.strip() for part in value.split(',') if part.strip()]
+
+    @classmethod
+    def from_request(cls, request):
+        """None unless this is a read request carrying ``fields`` or ``expand``."""
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = getattr(request, 'query_params', request.GET)
+        if 'fields' not in params and 'expand' not in params:
+            return None
+        fields = cls._split(params['fields']) if 'fields' in params else None
+        return cls(fields or None, cls._split(params.get('expand', '')))
+
+    def selected(self, prefix, available):
+        """Names from ``available`` to render at ``prefix`` (e.g. ``'items.'``)."""
+        if self.fields is None:
+            return list(available)
+        names = {path[len(prefix):].split('.')[0] for path in self.fields if path.startswith(prefix)}
+        if not names:
+            return list(available)
+        return [name for name in available if name in names]
+
+    def wants(self, path):
+        """Is ``path`` (dotted, e.g. ``'items.product'``) part of the response?"""
+        prefix = ''
+        for name in path.split('.'):
+            if name not in self.selected(prefix, [name]):
+                return False
+            prefix += name + '.'
+        return True
+
+    def expanded(self, path):
+        return path in self.expand
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin applying the request's SparseSpec to its fields,
+    nested serializers included. ``Meta.expandable_fields`` render as their
+    pk in sparse mode unless expanded.
+    """
+
+    def _sparse_path(self):
+        parts, node = [], self
+        while node.parent is not None:
+            if node.field_name:
+                parts.append(node.field_name)
+            node = node.parent
+        return ''.join(f'{part}.' for part in reversed(parts))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        spec = SparseSpec.from_request(self.context.get('request'))
+        if spec is None:
+            return fields
+        prefix = self._sparse_path()
+        expandable = getattr(self.Meta, 'expandable_fields', ())
+        keep = spec.selected(prefix, fields)
+        for name in list(fields):
+            if name not in keep:
+                del fields[name]
+            elif name in expandable and not spec.expanded(prefix + name):
+                fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+        return fields
@@ -0,0 +1,70 @@
+# File: core/testing.py
+# Test helpers shared by the app test suites.
+import os
+import tempfile
+from contextlib import contextmanager
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+from core.nplusone import QueryShapeDetector
+
+
+class QueryBudgetMixin:
+    """assertMaxQueries: fail when a block runs more than ``limit`` queries."""
+
+    @contextmanager
+    def assertMaxQueries(self, limit, using='default'):
+        with CaptureQueriesContext(connections[using]) as ctx:
+            yield ctx
+        executed = len(ctx.captured_queries)
+        if executed > limit:
+            queries = '\n'.join(
+                f"{i}. {query['sql']}" for i, query in enumerate(ctx.captured_queries, start=1)
+            )
+            self.fail(f'{executed} queries executed, at most {limit} allowed\n{queries}')
+
+    @contextmanager
+    def assertNoRepeatedQueries(self, threshold=None):
+        """Fail when a SELECT shape runs ``threshold`` (NPLUSONE_THRESHOLD) times in the block."""
+        with QueryShapeDetector(self.id(), mode='record', threshold=threshold) as detector:
+            yield detector
+        if detector.problems:
+            self.fail('\n'.join(detector.describe(key) for key in detector.problems))
+
+
+class TestRunner(DiscoverRunner):
+    """
+    DiscoverRunner with ``--nplusone warn|raise``: every request the tests
+    make then runs under NPlusOneMiddleware in that mode. Without the flag
+    the detector stays off, whatever NPLUSONE_MODE says. The SQLite cart
+    store lives in a temporary directory for the run.
+    """
+
+    def __init__(self, nplusone='', **kwargs):
+        super().__init__(**kwargs)
+        self.nplusone = nplusone
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--nplusone', choices=['warn', 'raise'], default='',
+            help='Detect N+1 queries in every request the tests make.',
+        )
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # the SQLite cart store gets a scratch file instead of the repo's cart.sqlite3
+        # (set before the test modules import cart.redis_client and build the store)
+        self.cart_store_dir = tempfile.TemporaryDirectory(prefix='cart-store-')
+        cart_store_path = os.path.join(self.cart_store_dir.name, 'cart.sqlite3')
+        # the environment too, for parallel workers that re-read settings
+        os.environ['NPLUSONE_MODE'] = self.nplusone
+        os.environ['CART_STORE_PATH'] = cart_store_path
+        self.test_settings = override_settings(NPLUSONE_MODE=self.nplusone, CART_STORE_PATH=cart_store_path)
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        self.cart_store_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
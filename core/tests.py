@@ -1,3 +1,252 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+import brotli
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from orders.models import Order, OrderItem
+from products.admin import ProductAdmin
+from products.models import Category, Product, StockReservation
+from users.models import User
+from . import metrics
+from .nplusone import NPlusOneError, QueryShapeDetector, ignore, shape
+from .profiling import StackSampler
+from .query_plans import capture_statements, plan_problems
+from .testing import QueryBudgetMixin
 
-# Create your tests here.
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Mugs')
+        for i in range(5):
+            Product.objects.create(name=f'Mug {i}', price=f'{i}.00', category=category)
+        user = User.objects.create_user(email='plans@example.com', username='plans', password='pass12345')
+        Order.objects.create(user=user, total_price='1.00')
+
+    def test_endpoints_are_index_backed(self):
+        out = io.StringIO()
+        call_command('check_query_plans', min_rows=0, stdout=out)
+        self.assertNotIn('full scan', out.getvalue())
+        self.assertNotIn('skipped', out.getvalue())
+
+    def test_unindexed_filter_is_flagged(self):
+        with capture_statements() as statements:
+            list(Product.objects.filter(description='x'))
+        self.assertEqual([(kind, table) for _, kind, table in plan_problems(statements)], [('full scan', 'products_product')])
+        self.assertEqual(plan_problems(statements, min_rows=100), [])
+
+
+class CompressionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.bulk_create([Product(name=f'Mug {i}', description='Stoneware ' * 20, price='5.00') for i in range(12)])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_gzip_and_brotli(self):
+        plain = self.client.get('/api/products/')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        res = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(res.content)), plain.json())
+        res = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(brotli.decompress(res.content)), plain.json())
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_bodies_are_left_alone(self):
+        res = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='m@example.com', username='m', password='pass12345')
+        for _ in range(3):
+            Order.objects.create(user=cls.user, total_price='5.00')
+
+    def setUp(self):
+        metrics.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_splits_request_time(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get('/api/orders/')
+        timing = dict(re.findall(r'(\w+);dur=([\d.]+)', res['Server-Timing']))
+        self.assertEqual(set(timing), {'db', 'serialize', 'render', 'app', 'total'})
+        self.assertIn(f'desc="{len(queries)} queries"', res['Server-Timing'])
+        self.assertGreater(float(timing['serialize']), 0)
+        self.assertGreaterEqual(float(timing['total']), float(timing['db']) + float(timing['serialize']))
+
+    def test_row_serializer_time_is_counted(self):
+        category = Category.objects.create(name='Metrics')
+        Product.objects.bulk_create(
+            Product(name=f'P{i}', description='d' * 200, price='9.99', stock=5, category=category) for i in range(50)
+        )
+        res = self.client.get('/api/products/')
+        timing = dict(re.findall(r'(\w+);dur=([\d.]+)', res['Server-Timing']))
+        self.assertGreater(float(timing['serialize']), 0)
+
+    def test_metrics_endpoint_exports_histograms(self):
+        self.client.get('/api/orders/')
+        self.client.get('/api/async/products/')
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="order-list",method="GET",status="200",le="+Inf"} 1', body)
+        self.assertIn('http_response_size_bytes_count{view="order-list",method="GET"} 1', body)
+        # queries made by async views in sync_to_async threads are attributed too
+        async_queries = re.search(r'http_db_queries_sum\{view="async-product-list",method="GET"\} (\S+)', body)
+        self.assertGreater(float(async_queries.group(1)), 0)
+
+    def test_metrics_access(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.9').status_code, 403)
+        with self.settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='p@example.com', username='p', password='pass12345')
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        overrides = self.settings(PROFILE_DIR=self.dir, PROFILE_TOKEN='tok', PROFILER='cprofile')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_authorized_header_profiles_request(self):
+        self.assertFalse(self.client.get('/api/orders/', HTTP_X_PROFILE='wrong').has_header('X-Profile-Id'))
+        res = self.client.get('/api/orders/', HTTP_X_PROFILE='tok')
+        self.assertRegex(res['X-Profile-Id'], r'^OrderViewSet\.list\.\d+\.\w+\.prof$')
+        self.assertEqual(os.listdir(self.dir), [res['X-Profile-Id']])
+
+    @override_settings(PROFILE_SAMPLE_RATE=1.0, PROFILER='sampler', PROFILE_MAX_FILES=2)
+    def test_sampled_requests_rotate(self):
+        for _ in range(3):
+            self.client.post('/api/orders/', {'items': []}, format='json')
+            time.sleep(0.002)
+        names = sorted(os.listdir(self.dir))
+        self.assertEqual(len(names), 2)
+        self.assertTrue(all(name.startswith('OrderViewSet.create.') and name.endswith('.folded') for name in names))
+
+    def test_sampler_collects_stacks(self):
+        sampler = StackSampler(0.001)
+        sampler.start()
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        sampler.stop()
+        self.assertTrue(any('test_sampler_collects_stacks' in stack for stack in sampler.counts))
+
+    def test_profile_report_merges_per_endpoint(self):
+        self.client.get('/api/orders/', HTTP_X_PROFILE='tok')
+        self.client.get('/api/orders/', HTTP_X_PROFILE='tok')
+        with self.settings(PROFILER='sampler', PROFILE_SAMPLE_INTERVAL=0.0005):
+            self.client = APIClient()
+            self.client.force_authenticate(self.user)
+            self.client.get('/api/auth/me/', HTTP_X_PROFILE='tok')
+        output = os.path.join(self.dir, 'report')
+        out = io.StringIO()
+        call_command('profile_report', '--output', output, stdout=out)
+        self.assertIn('OrderViewSet.list: 2 requests (cProfile)', out.getvalue())
+        self.assertIn('MeView.get: 1 requests', out.getvalue())
+        self.assertEqual(sorted(os.listdir(output)), ['MeView.get.folded', 'OrderViewSet.list.prof'])
+
+
+class NPlusOneTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='admin@example.com', username='admin', password='pass12345')
+        for i in range(3):
+            product = Product.objects.create(
+                name=f'Lamp {i}', price='5.00', category=Category.objects.create(name=f'Lighting {i}'),
+            )
+            user = User.objects.create_user(email=f'n{i}@example.com', username=f'n{i}', password='pass12345')
+            order = Order.objects.create(user=user, total_price='5.00')
+            OrderItem.objects.create(order=order, product=product, unit_price='5.00')
+            StockReservation.objects.create(
+                order_id=order.id, product=product, quantity=1, expires_at=timezone.now() + timedelta(minutes=5),
+            )
+
+    def test_shape_normalizes_literals(self):
+        self.assertEqual(
+            shape("SELECT *  FROM t WHERE a = 'it''s' AND b IN (%s, %s, %s) AND c = 7 LIMIT 21"),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ? LIMIT ?',
+        )
+
+    def test_raise_mode_points_at_the_loop(self):
+        with self.assertRaises(NPlusOneError) as ctx:
+            with QueryShapeDetector(mode='raise'):
+                for product in Product.objects.all():
+                    product.category.name
+        self.assertIn('3x SELECT', str(ctx.exception))
+        self.assertIn('core/tests.py', str(ctx.exception))
+        self.assertIn('test_raise_mode_points_at_the_loop', str(ctx.exception))
+
+    def test_warn_mode_logs_each_shape(self):
+        with self.assertLogs('core.nplusone', 'WARNING') as logs:
+            with QueryShapeDetector('loop', mode='warn'):
+                [product.category.name for product in Product.objects.all()]
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Possible N+1 query: loop: 3x SELECT', logs.output[0])
+
+    def test_select_related_and_ignored_blocks_pass(self):
+        with self.assertNoRepeatedQueries():
+            [product.category.name for product in Product.objects.select_related('category')]
+            with ignore():
+                [product.category.name for product in Product.objects.all()]
+
+    @override_settings(NPLUSONE_MODE='raise')
+    def test_admin_changelists_select_related(self):
+        self.client.force_login(self.admin)
+        for url in ('products/product', 'products/stockreservation', 'orders/order', 'orders/orderitem'):
+            self.assertEqual(self.client.get(f'/admin/{url}/').status_code, 200)
+        with mock.patch.object(ProductAdmin, 'list_select_related', False):
+            with self.assertRaisesMessage(NPlusOneError, 'GET /admin/products/product/: 3x SELECT'):
+                self.client.get('/admin/products/product/')
+
+
+class BenchDataTests(TransactionTestCase):
+    def test_seed_bench_and_endpoint_run(self):
+        kept = Product.objects.create(name='Not seeded', price='1.00')
+        out = io.StringIO()
+        call_command(
+            'seed_bench', categories=3, products=40, users=4, orders=10, batch_size=16, stdout=out, stderr=io.StringIO(),
+        )
+        counts = json.loads(out.getvalue())
+        self.assertEqual((counts['products'], counts['users'], counts['orders']), (40, 4, 10))
+        self.assertEqual(OrderItem.objects.count(), counts['order_items'])
+        self.assertEqual(Product.objects.count(), 41)
+        self.assertEqual(len({order.created_at for order in Order.objects.all()}), 10)  # spread, not now()
+
+        out = io.StringIO()
+        call_command('bench_endpoints', requests=4, warmup=0, concurrency=1, stdout=out, stderr=io.StringIO())
+        results = json.loads(out.getvalue())
+        self.assertEqual(set(results['scenarios']), {'browse', 'detail', 'search', 'cart', 'checkout', 'history'})
+        for name, result in results['scenarios'].items():
+            self.assertEqual((name, result['requests'], result['errors']), (name, 4, 0))
+
+        call_command('seed_bench', clear_only=True, stderr=io.StringIO())
+        self.assertEqual(list(Product.objects.all()), [kept])
+        self.assertFalse(User.objects.exists() or Order.objects.exists())
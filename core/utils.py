@@ -1,6 +1,24 @@
 # File: core/utils.py
 from rest_framework.response import Response
 from rest_framework import status
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
 
 def simple_response(data=None, message='', code=status.HTTP_200_OK):
     return Response({'message': message, 'data': data}, status=code)
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    """Nearest-rank percentiles of ``samples`` as {'p50': ..., ...}."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {f'p{p}': None for p in points}
+    return {
+        f'p{p}': ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+        for p in points
+    }
+
+
+def process_local(cache):
+    """True for caches each worker process has its own copy of (LocMem, dummy)."""
+    return isinstance(cache, (LocMemCache, DummyCache))
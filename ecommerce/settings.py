@@ -39,11 +39,16 @@ INSTALLED_APPS = [
     'orders',
     'payments',
     'products',
+    'taskqueue',
     'users',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -139,7 +144,8 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 REST_FRAMEWORK = {
     # Authentication
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication with the user served from users.cache
+        'users.authentication.CachedJWTAuthentication',
     ],
 
     # Filters
@@ -163,8 +169,155 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.CachedTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.CachedTokenRefreshSerializer',
 }
 
+# Cart storage: 'redis', 'sqlite' (file shared by all workers) or 'memory'
+REDIS_URL = os.getenv('REDIS_URL')
+CART_BACKEND = os.getenv('CART_BACKEND') or ('redis' if REDIS_URL else 'sqlite')
+CART_TTL = int(os.getenv('CART_TTL', 60 * 60 * 24 * 30))
+CART_STORE_PATH = os.getenv('CART_STORE_PATH', os.path.join(BASE_DIR, 'cart.sqlite3'))
+CART_STORE_MAX_CARTS = int(os.getenv('CART_STORE_MAX_CARTS', 100000))
+# in-process LRU tier in front of the sqlite store / cap of the memory store
+CART_LOCAL_MAX_ENTRIES = int(os.getenv('CART_LOCAL_MAX_ENTRIES', 10000))
+CART_LOCAL_TTL = int(os.getenv('CART_LOCAL_TTL', 30))
+# product snapshots used by the hydrated cart view
+CART_PRODUCT_SNAPSHOT_TTL = int(os.getenv('CART_PRODUCT_SNAPSHOT_TTL', 30))
+
+# Caches: Redis when REDIS_URL is set, per-process LocMem otherwise (dev/tests)
+def _cache(location, max_entries=300, **options):
+    if REDIS_URL:
+        return {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL, **options}
+    return {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': location,
+            'OPTIONS': {'MAX_ENTRIES': max_entries}, **options}
+
+CATALOG_CACHE = 'catalog'
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 60))
+# Cache-Control max-age for the public product endpoints (clients revalidate with ETags)
+CATALOG_HTTP_MAX_AGE = int(os.getenv('CATALOG_HTTP_MAX_AGE', 60))
+# Idempotency-Key records (core.idempotency): stored responses are replayed for this long,
+# an in-flight marker blocks concurrent duplicates for at most IDEMPOTENCY_LOCK_TIMEOUT.
+# Needs a shared cache (REDIS_URL) to dedupe across worker processes.
+IDEMPOTENCY_CACHE = 'idempotency'
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 60 * 60 * 24))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+# Token users (users.cache.UserCache) are re-read at most this often; saves invalidate at once,
+# but without a shared cache (REDIS_URL) only in the saving process: other workers keep
+# serving the old user, deactivated or not, for up to AUTH_USER_CACHE_TTL.
+AUTH_CACHE = 'auth'
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 60))
+# Blacklist misses are checked in the database; on a shared cache the "not blacklisted"
+# answer is then reused for this many seconds (0: query every refresh)
+AUTH_BLACKLIST_MISS_TTL = int(os.getenv('AUTH_BLACKLIST_MISS_TTL', 5))
+CACHES = {
+    'default': _cache('default'),
+    CATALOG_CACHE: _cache('catalog', KEY_PREFIX='catalog', TIMEOUT=CATALOG_CACHE_TIMEOUT),
+    IDEMPOTENCY_CACHE: _cache('idempotency', max_entries=100000, KEY_PREFIX='idempotency'),
+    AUTH_CACHE: _cache('auth', max_entries=100000, KEY_PREFIX='auth'),
+    'hotstock': _cache('hotstock', max_entries=100000, KEY_PREFIX='hotstock'),
+}
+
+# /metrics (Prometheus): scrapers send 'Authorization: Bearer <METRICS_TOKEN>' when it is
+# set, otherwise only METRICS_ALLOWED_IPS may read it
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+# per-request db/serialize/render/app split in a Server-Timing response header
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'true').lower() == 'true'
+
+# Opt-in request profiling (core.middleware.ProfilingMiddleware): this fraction of requests,
+# plus any sending 'X-Profile: <PROFILE_TOKEN>'. 'sampler' records collapsed stacks every
+# PROFILE_SAMPLE_INTERVAL s (cheap, but only sees requests longer than a few ms);
+# 'cprofile' traces every call (exact, ~5x slower).
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+PROFILER = os.getenv('PROFILER', 'sampler')
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.001))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 500))
+
+# N+1 detection (core.middleware.NPlusOneMiddleware): a SELECT shape repeated
+# NPLUSONE_THRESHOLD times in one request is logged ('warn') or raised ('raise');
+# '' turns it off. `manage.py test --nplusone raise` enables it for the test suite.
+NPLUSONE_MODE = os.getenv('NPLUSONE_MODE', 'warn' if DEBUG else '')
+NPLUSONE_THRESHOLD = int(os.getenv('NPLUSONE_THRESHOLD', 3))
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# JSON responses at least this large are gzip/brotli compressed (core.middleware)
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+# brotli's default (11) is meant for static assets; 4-5 is the usual choice for dynamic responses
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+
+# Upper bound on ranked full-text matches returned by ?q= product search
+PRODUCT_SEARCH_MAX_RESULTS = int(os.getenv('PRODUCT_SEARCH_MAX_RESULTS', 1000))
+
+# Product feeds (products.services.feed_service): rows per import transaction, per-row
+# errors returned by the import endpoint, rows fetched per query while exporting
+PRODUCT_IMPORT_BATCH_SIZE = int(os.getenv('PRODUCT_IMPORT_BATCH_SIZE', 1000))
+PRODUCT_IMPORT_MAX_ERRORS = int(os.getenv('PRODUCT_IMPORT_MAX_ERRORS', 1000))
+PRODUCT_EXPORT_CHUNK_SIZE = int(os.getenv('PRODUCT_EXPORT_CHUNK_SIZE', 2000))
+
+# Background tasks (taskqueue app, `manage.py runworker`)
+TASK_WORKER_CONCURRENCY = int(os.getenv('TASK_WORKER_CONCURRENCY', 4))
+TASK_MAX_ATTEMPTS = int(os.getenv('TASK_MAX_ATTEMPTS', 3))
+# retry n waits about TASK_RETRY_BACKOFF * 2^(n-1) seconds, at most TASK_RETRY_BACKOFF_MAX
+TASK_RETRY_BACKOFF = float(os.getenv('TASK_RETRY_BACKOFF', 5))
+TASK_RETRY_BACKOFF_MAX = float(os.getenv('TASK_RETRY_BACKOFF_MAX', 300))
+# a task running longer than this is assumed to have lost its worker and is run again
+TASK_LOCK_TIMEOUT = int(os.getenv('TASK_LOCK_TIMEOUT', 10 * 60))
+# finished tasks are deleted after this many seconds (failed ones are kept)
+TASK_RESULT_TTL = int(os.getenv('TASK_RESULT_TTL', 24 * 60 * 60))
+# periodic tasks: task name -> every N seconds
+TASK_SCHEDULE = {
+    'products.tasks.expire_reservations': 60,
+    'users.tasks.purge_expired_tokens': 60 * 60,
+}
+
+# Outgoing mail (order confirmations are sent by the task worker)
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'orders@example.com')
+
+# Catalog pages re-rendered into CatalogCache (for this Host) shortly after a catalog change
+CATALOG_WARM_PATHS = ['/api/products/', '/api/products/categories/']
+CATALOG_WARM_HOST = os.getenv('CATALOG_WARM_HOST', 'localhost')
+
+# Seconds checkout holds stock for an unpaid order (see expire_reservations)
+STOCK_RESERVATION_TTL = int(os.getenv('STOCK_RESERVATION_TTL', 15 * 60))
+# Hot-SKU stock shards live in this cache alias. It must be shared by every process
+# (enabling hot mode refuses LocMem) and must not evict the shards, which have no TTL:
+# on Redis use noeviction or a volatile-* maxmemory policy. Evicted shards undersell.
+HOT_STOCK_CACHE = os.getenv('HOT_STOCK_CACHE', 'hotstock')
+HOT_STOCK_DEFAULT_SHARDS = int(os.getenv('HOT_STOCK_DEFAULT_SHARDS', 8))
+
 # Stripe
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
-STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
\ No newline at end of file
+STRIPE_PUBLISHABLE_KEY = os.getenv('STRIPE_PUBLISHABLE_KEY', '')
+# Checkout sessions expire after this many seconds (Stripe's minimum is 30 min); creating one
+# extends the order's stock holds to outlast it (STOCK_RESERVATION_TTL is shorter)
+STRIPE_CHECKOUT_TTL = max(30 * 60, int(os.getenv('STRIPE_CHECKOUT_TTL', 30 * 60)))
+STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
+
+# SSLCommerz
+SSLCOMMERZ_STORE_ID = os.getenv('SSLCOMMERZ_STORE_ID')
+SSLCOMMERZ_STORE_PASS = os.getenv('SSLCOMMERZ_STORE_PASS')
+SSL_SUCCESS_URL = os.getenv('SSL_SUCCESS_URL', 'http://localhost:8000/payments/success/')
+SSL_FAIL_URL = os.getenv('SSL_FAIL_URL', 'http://localhost:8000/payments/fail/')
+SSL_CANCEL_URL = os.getenv('SSL_CANCEL_URL', 'http://localhost:8000/payments/cancel/')
+
+# Outbound gateway calls (payments.services.gateway_client): pooled sessions with
+# timeouts, retries and a circuit breaker. Point the base URLs at
+# `manage.py run_stub_gateway` to work offline.
+PAYMENT_GATEWAYS = {
+    'stripe': {
+        'base_url': os.getenv('STRIPE_API_BASE', 'https://api.stripe.com'),
+        'connect_timeout': float(os.getenv('STRIPE_CONNECT_TIMEOUT', 3.05)),
+        'read_timeout': float(os.getenv('STRIPE_READ_TIMEOUT', 20)),
+        'retries': int(os.getenv('STRIPE_RETRIES', 2)),
+    },
+    'sslcommerz': {
+        'base_url': os.getenv('SSLCOMMERZ_API_BASE', 'https://sandbox.sslcommerz.com'),
+        'connect_timeout': float(os.getenv('SSLCOMMERZ_CONNECT_TIMEOUT', 3.05)),
+        'read_timeout': float(os.getenv('SSLCOMMERZ_READ_TIMEOUT', 15)),
+        'retries': int(os.getenv('SSLCOMMERZ_RETRIES', 2)),
+    },
+}
\ No newline at end of file
@@ -6,6 +6,10 @@ from drf_yasg import openapi
 from django.urls import re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from cart.urls import async_urlpatterns as cart_async_urls
+from products.urls import async_urlpatterns as product_async_urls
+from users.urls import async_urlpatterns as user_async_urls
+from core.views import metrics_view
 
 schema_view = get_schema_view(
    openapi.Info(title="E-Commerce Django REST Framework (DRF) API", default_version='v1'),
@@ -21,6 +25,12 @@ urlpatterns = [
     path('api/products/', include('products.urls')),
     path('api/orders/', include('orders.urls')),
     path('api/cart/', include('cart.urls')),
+    path('api/payments/', include('payments.urls')),
+    # async views for ASGI deployments (see README, "ASGI mode")
+    path('api/async/auth/', include(user_async_urls)),
+    path('api/async/products/', include(product_async_urls)),
+    path('api/async/cart/', include(cart_async_urls)),
+    path('metrics', metrics_view, name='metrics'),
     re_path(r'^api/docs(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
     path('', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
 ]
@@ -8,6 +8,7 @@ class OrderItemInline(admin.TabularInline):
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'total_price', 'status', 'created_at')
+    list_select_related = ('user',)
     list_filter = ('status',)
     search_fields = ('id', 'user__email')
     ordering = ('-created_at',)
@@ -16,4 +17,5 @@ class OrderAdmin(admin.ModelAdmin):
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('id', 'order', 'product', 'quantity', 'unit_price')
+    list_select_related = ('order', 'product')
     search_fields = ('product__name',)
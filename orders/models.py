@@ -17,6 +17,10 @@ class Order(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # order history: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+        indexes = [models.Index(fields=['user', '-created_at', '-id'])]
+
     def __str__(self):
         return str(self.id)
 
@@ -1,38 +1,70 @@
+import uuid
+from collections import Counter
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
+from core.serializers import SparseFieldsMixin
 from .models import Order, OrderItem
 from products.serializers import ProductSerializer
 from products.models import Product
+from products.services.inventory_service import InventoryService, InsufficientStock
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
-    product_id = serializers.PrimaryKeyRelatedField(write_only=True, source='product', queryset=Product.objects.all())
+    # resolved for all lines at once in OrderSerializer.validate_items
+    product_id = serializers.UUIDField(write_only=True)
 
     class Meta:
         model = OrderItem
         fields = ['id','product','product_id','quantity','unit_price']
+        expandable_fields = ['product']
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
     class Meta:
         model = Order
         fields = ['id','user','total_price','status','items','created_at']
         read_only_fields = ['user','total_price','status','created_at']
 
+    def validate_items(self, items):
+        products = Product.objects.select_related('category').in_bulk([item['product_id'] for item in items])
+        errors = []
+        for item in items:
+            product = products.get(item['product_id'])
+            if product is None:
+                errors.append({'product_id': [f'Invalid pk "{item["product_id"]}" - object does not exist.']})
+            else:
+                errors.append({})
+                item['product'] = product
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
     def create(self, validated_data):
         items_data = validated_data.pop('items')
         user = self.context['request'].user
-        order = Order.objects.create(user=user)
-        total = 0
+        demand = Counter()
         for item in items_data:
-            product = item['product']
-            qty = item['quantity']
-            unit_price = product.price
-            OrderItem.objects.create(order=order, product=product, quantity=qty, unit_price=unit_price)
-            total += unit_price * qty
-            # simple stock decrease
-            if product.stock >= qty:
-                product.stock -= qty
-                product.save()
-        order.total_price = total
-        order.save()
+            demand[item['product'].pk] += item['quantity']
+
+        order_id = uuid.uuid4()
+        try:
+            with InventoryService.reserving(order_id, demand, hot={
+                item['product'].pk: item['product'].hot_stock_shards for item in items_data
+            }):
+                order = Order.objects.create(
+                    id=order_id,
+                    user=user,
+                    total_price=sum(item['product'].price * item['quantity'] for item in items_data),
+                )
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, product=item['product'], quantity=item['quantity'], unit_price=item['product'].price)
+                    for item in items_data
+                ])
+        except InsufficientStock as exc:
+            raise serializers.ValidationError({'items': [
+                {'quantity': [f"Insufficient stock for {item['product'].name} (available: {exc.shortages[item['product'].pk]})."]}
+                if item['product'].pk in exc.shortages else {}
+                for item in items_data
+            ]})
+        prefetch_related_objects([order], Prefetch('items', queryset=OrderItem.objects.select_related('product__category')))
         return order
@@ -1,7 +1,10 @@
+from collections import Counter
 from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 from .models import Order, OrderItem
-from products.models import Product
+from products.models import Product, StockReservation
+from products.signals import reservations_expired
+from products.services.inventory_service import InventoryService
 
 @receiver(post_save, sender=Order)
 def reduce_stock_on_order(sender, instance, created, **kwargs):
@@ -14,7 +17,20 @@ def reduce_stock_on_order(sender, instance, created, **kwargs):
 
 @receiver(pre_delete, sender=Order)
 def restore_stock_on_order_delete(sender, instance, **kwargs):
-    for item in instance.items.all():
-        product = item.product
-        product.stock += item.quantity
-        product.save()
+    # cancelled orders have already given their stock back
+    if instance.status == 'CANCELLED':
+        return
+    if StockReservation.objects.filter(order_id=instance.pk).exists():
+        # only HELD/COMMITTED units; RELEASED/EXPIRED ones are back already
+        InventoryService.return_order([instance.pk])
+        return
+    # orders placed before the reservation ledger: restock the items
+    supply = Counter()
+    for product_id, quantity in instance.items.values_list('product_id', 'quantity'):
+        supply[product_id] += quantity
+    InventoryService.restock(supply)
+
+
+@receiver(reservations_expired)
+def cancel_orders_with_expired_holds(sender, order_ids, **kwargs):
+    Order.objects.filter(id__in=order_ids, status='PENDING').update(status='CANCELLED')
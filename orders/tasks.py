@@ -0,0 +1,18 @@
+from django.core.mail import send_mail
+from taskqueue.registry import task
+from .models import Order
+
+
+@task
+def send_order_confirmation_email(order_id):
+    order = Order.objects.select_related('user').get(pk=order_id)
+    lines = [
+        f'{item.quantity} x {item.product.name}: {item.get_line_total()}'
+        for item in order.items.select_related('product')
+    ]
+    send_mail(
+        subject=f'Order {order.id} confirmed',
+        message='\n'.join(['Thanks for your order!', '', *lines, '', f'Total: {order.total_price}']),
+        from_email=None,
+        recipient_list=[order.user.email],
+    )
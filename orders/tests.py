@@ -1,3 +1,233 @@
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from django.core.cache import caches
+from django.core import mail
+from django.db import IntegrityError
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.testing import QueryBudgetMixin
+from products.models import Category, Product, StockReservation
+from products.services.hot_stock_service import HotStockService
+from products.services.inventory_service import InventoryService
+from users.models import User
+from .models import Order, OrderItem
+from .tasks import send_order_confirmation_email
+from .views import OrderViewSet
 
-# Create your tests here.
+
+class OrderCreateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='buyer@example.com', username='buyer', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Kitchen')
+        self.products = [
+            Product.objects.create(name=f'Item {i}', price='2.50', stock=5, category=category)
+            for i in range(10)
+        ]
+
+    def line(self, product, quantity):
+        return {'product_id': str(product.pk), 'quantity': quantity, 'unit_price': '0'}
+
+    def test_order_is_created_in_constant_queries(self):
+        payload = {'items': [self.line(p, 2) for p in self.products]}
+        # product lookup, stock UPDATE, reservations + order + items INSERTs,
+        # response prefetch, plus savepoint pairs (BEGIN/COMMIT outside tests)
+        with self.assertNumQueries(12):
+            res = self.client.post('/api/orders/', payload, format='json')
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual(res.data['total_price'], '50.00')
+        self.assertEqual(len(res.data['items']), 10)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock, 3)
+
+    def test_duplicate_lines_are_combined_for_stock(self):
+        product = self.products[0]
+        payload = {'items': [self.line(product, 3), self.line(product, 3)]}
+        res = self.client.post('/api/orders/', payload, format='json')
+        self.assertEqual(res.status_code, 400)
+        self.assertIn('available: 5', str(res.data['items'][0]['quantity'][0]))
+
+    def test_insufficient_stock_rolls_back_everything(self):
+        payload = {'items': [self.line(self.products[0], 1), self.line(self.products[1], 6)]}
+        res = self.client.post('/api/orders/', payload, format='json')
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.data['items'][0], {})
+        self.assertIn('Item 1', str(res.data['items'][1]['quantity'][0]))
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock, 5)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_failed_order_insert_gives_hot_units_back(self):
+        caches[settings.HOT_STOCK_CACHE].clear()
+        product = self.products[0]
+        with mock.patch('products.services.hot_stock_service.process_local', return_value=False):
+            HotStockService.enable(product, shards=2)
+        with mock.patch.object(OrderItem.objects, 'bulk_create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.client.post('/api/orders/', {'items': [self.line(product, 3)]}, format='json')
+        self.assertEqual(HotStockService.available(product.pk, 2), 5)
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertFalse(Order.objects.exists())
+
+    def test_unknown_product_is_reported_per_line(self):
+        payload = {'items': [self.line(self.products[0], 1), {'product_id': '00000000-0000-0000-0000-000000000000', 'quantity': 1, 'unit_price': '0'}]}
+        res = self.client.post('/api/orders/', payload, format='json')
+        self.assertEqual(res.status_code, 400)
+        self.assertIn('product_id', res.data['items'][1])
+
+    def test_confirmation_email_task(self):
+        res = self.client.post('/api/orders/', {'items': [self.line(self.products[0], 2)]}, format='json')
+        send_order_confirmation_email(res.data['id'])
+        self.assertEqual(mail.outbox[0].to, ['buyer@example.com'])
+        self.assertIn('2 x Item 0: 5.00', mail.outbox[0].body)
+
+
+class OrderReservationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='hold@example.com', username='hold', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(name='Lamp', price='10.00', stock=4)
+
+    def place_order(self, quantity):
+        payload = {'items': [{'product_id': str(self.product.pk), 'quantity': quantity, 'unit_price': '0'}]}
+        return self.client.post('/api/orders/', payload, format='json')
+
+    def test_expired_hold_cancels_order_and_returns_stock(self):
+        order_id = self.place_order(3).data['id']
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        InventoryService.expire_stale()
+        self.assertEqual(Order.objects.get(pk=order_id).status, 'CANCELLED')
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 4)
+
+    def stock(self):
+        return Product.objects.get(pk=self.product.pk).stock
+
+    def test_deleting_order_releases_hold(self):
+        order_id = self.place_order(3).data['id']
+        self.client.delete(f'/api/orders/{order_id}/')
+        self.assertEqual(self.stock(), 4)
+
+    def test_deleting_paid_order_returns_sold_units_once(self):
+        order_id = self.place_order(3).data['id']
+        InventoryService.commit([order_id])
+        Order.objects.get(pk=order_id).delete()
+        self.assertEqual(self.stock(), 4)
+        self.assertEqual(StockReservation.objects.get(order_id=order_id).status, 'RELEASED')
+
+    def test_deleting_order_with_expired_hold_does_not_restock_again(self):
+        # marked paid without commit(): the sweeper returns the units but leaves the order alone
+        order_id = self.place_order(3).data['id']
+        Order.objects.filter(pk=order_id).update(status='PAID')
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        InventoryService.expire_stale()
+        self.assertEqual(self.stock(), 4)
+        Order.objects.get(pk=order_id).delete()
+        self.assertEqual(self.stock(), 4)
+
+    def test_deleting_order_without_reservations_restocks_items(self):
+        order = Order.objects.create(user=self.user, total_price='20.00', status='PAID')
+        OrderItem.objects.create(order=order, product=self.product, quantity=2, unit_price='10.00')
+        order.delete()
+        self.assertEqual(self.stock(), 6)
+
+
+class OrderIdempotencyTests(TestCase):
+    def setUp(self):
+        caches[settings.IDEMPOTENCY_CACHE].clear()
+        self.user = User.objects.create_user(email='retry@example.com', username='retry', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(name='Lamp', price='10.00', stock=10)
+
+    def place_order(self, quantity, key='key-1'):
+        payload = {'items': [{'product_id': str(self.product.pk), 'quantity': quantity, 'unit_price': '0'}]}
+        return self.client.post('/api/orders/', payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_first_response(self):
+        first = self.place_order(2)
+        with self.assertNumQueries(0):
+            retry = self.place_order(2)
+        self.assertEqual((first.status_code, retry.status_code), (201, 201))
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 8)
+
+        self.assertEqual(self.place_order(2, key='key-2').status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_key_reused_with_another_body(self):
+        self.place_order(2)
+        res = self.place_order(3)
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(res.data['detail'].code, 'idempotency_key_reused')
+
+    def test_concurrent_duplicate_is_rejected(self):
+        duplicate = []
+        create = OrderViewSet.perform_create
+
+        def perform_create(view, serializer):
+            duplicate.append(self.place_order(2))  # arrives while the first is still running
+            create(view, serializer)
+
+        with mock.patch.object(OrderViewSet, 'perform_create', perform_create):
+            self.assertEqual(self.place_order(2).status_code, 201)
+        self.assertEqual(duplicate[0].status_code, 409)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class OrderQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='history@example.com', username='history', password='pass12345')
+        categories = [Category.objects.create(name=f'C{i}') for i in range(3)]
+        products = [Product.objects.create(name=f'P{i}', price='1.00', stock=100, category=categories[i % 3]) for i in range(6)]
+        for _ in range(12):
+            order = Order.objects.create(user=cls.user, total_price='6.00')
+            OrderItem.objects.bulk_create([OrderItem(order=order, product=p, quantity=1, unit_price='1.00') for p in products])
+        cls.order = order
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_order_list(self):
+        with self.assertMaxQueries(3):  # COUNT + page + items/products/categories
+            res = self.client.get('/api/orders/')
+        self.assertEqual(len(res.data['results']), 12)
+
+    def test_order_list_without_count(self):
+        with self.assertMaxQueries(2):
+            res = self.client.get('/api/orders/', {'count': 'false', 'page_size': 5})
+        self.assertEqual(len(res.data['results']), 5)
+        self.assertNotIn('count', res.data)
+        with self.assertMaxQueries(2):
+            res = self.client.get(res.data['next'])
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_sparse_order_history_skips_product_rows(self):
+        with self.assertMaxQueries(2) as ctx:
+            res = self.client.get('/api/orders/', {'count': 'false', 'fields': 'id,status,items.product,items.quantity'})
+        order = res.data['results'][0]
+        self.assertEqual(list(order), ['id', 'status', 'items'])
+        self.assertEqual(dict(order['items'][0]), {'product': self.order.items.first().product_id, 'quantity': 1})
+        self.assertNotIn('products_product', ctx.captured_queries[-1]['sql'])
+
+    def test_expanded_product_fields(self):
+        params = {'fields': 'items.product.name,items.product.category', 'expand': 'items.product'}
+        with self.assertMaxQueries(2) as ctx:
+            res = self.client.get(f'/api/orders/{self.order.pk}/', params)
+        item = res.data['items'][0]
+        self.assertEqual(set(item), {'product'})
+        self.assertEqual(set(item['product']), {'name', 'category'})
+        self.assertIsInstance(item['product']['category'], int)
+        self.assertNotIn('products_category', ctx.captured_queries[-1]['sql'])
+        self.assertNotIn('description', ctx.captured_queries[-1]['sql'])
+
+    def test_order_detail(self):
+        with self.assertMaxQueries(2):
+            res = self.client.get(f'/api/orders/{self.order.pk}/')
+        self.assertEqual(len(res.data['items']), 6)
@@ -1,16 +1,47 @@
 from django.shortcuts import render
+from django.db.models import Prefetch
 from rest_framework import viewsets, permissions
-from .models import Order
+from core.idempotency import IdempotencyMixin
+from core.pagination import KeysetPagination
+from core.serializers import SparseSpec
+from .models import Order, OrderItem
 from .serializers import OrderSerializer
+from products.serializers import ProductRowSerializer
 from products.services.inventory_service import InventoryService
 # Create your views here.
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(IdempotencyMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).order_by('-created_at')
+        orders = Order.objects.filter(user=self.request.user).order_by('-created_at')
+        spec = SparseSpec.from_request(self.request)
+        if spec is None:
+            items = OrderItem.objects.select_related('product__category')
+            return orders.prefetch_related(Prefetch('items', queryset=items))
+        return self.sparse_queryset(orders, spec)
+
+    @staticmethod
+    def sparse_queryset(orders, spec):
+        """Load only the columns and relations ?fields=/?expand= will render."""
+        order_fields = spec.selected('', ['id', 'user', 'total_price', 'status', 'created_at'])
+        orders = orders.only('id', 'created_at', *order_fields)
+        if not spec.wants('items'):
+            return orders
+        item_fields = spec.selected('items.', ['id', 'product', 'quantity', 'unit_price'])
+        items = OrderItem.objects.only('order', *item_fields)
+        if 'product' in item_fields and spec.expanded('items.product'):
+            product_fields = spec.selected('items.product.', ProductRowSerializer.field_names)
+            columns = [f'product__{name}' for name in product_fields]
+            if 'category' in product_fields and spec.expanded('items.product.category'):
+                items = items.select_related('product__category')
+                columns += ['product__category__id', 'product__category__name']
+            else:
+                items = items.select_related('product')
+            items = items.only('order', 'product__id', *item_fields, *columns)
+        return orders.prefetch_related(Prefetch('items', queryset=items))
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
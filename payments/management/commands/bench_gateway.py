@@ -0,0 +1,70 @@
+import json
+import time
+import requests
+from django.core.management.base import BaseCommand
+from core.utils import percentiles
+from payments.services.gateway_client import GatewayError, GatewaySession
+from payments.stub_gateway import StubGateway
+
+INIT_PATH = '/gwprocess/v4/api.php'
+
+
+class Command(BaseCommand):
+    help = (
+        'Gateway calls against the local stub: bare requests.post (new connection, no timeout) vs '
+        'the pooled GatewaySession, on a healthy gateway and on a stalled one.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=500, help='Calls per client on the healthy gateway.')
+        parser.add_argument('--delay', type=float, default=0.002, help='Healthy gateway response time (s).')
+        parser.add_argument('--stall', type=float, default=1.0, help='Stalled gateway response time (s).')
+        parser.add_argument('--stall-calls', type=int, default=10)
+        parser.add_argument('--read-timeout', type=float, default=0.25)
+
+    def handle(self, *args, **options):
+        results = {}
+        with StubGateway(delay=options['delay']) as stub:
+            session = GatewaySession('bench', {'base_url': stub.url})
+            clients = {
+                'bare': lambda: requests.post(stub.url + INIT_PATH, data={'tran_id': 'bench'}),
+                'pooled': lambda: session.post(INIT_PATH, data={'tran_id': 'bench'}),
+            }
+            for name, call in clients.items():
+                before = stub.counts['connections']
+                results[f'healthy_{name}'] = {
+                    **self.timed(call, options['calls']),
+                    'connections': stub.counts['connections'] - before,
+                }
+            session.close()
+
+        with StubGateway(delay=options['stall']) as stub:
+            session = GatewaySession('bench', {
+                'base_url': stub.url, 'read_timeout': options['read_timeout'], 'retries': 0, 'failure_threshold': 3,
+            })
+            clients = {
+                'bare': lambda: requests.post(stub.url + INIT_PATH, data={'tran_id': 'bench'}),
+                'pooled': lambda: session.post(INIT_PATH, data={'tran_id': 'bench'}),
+            }
+            for name, call in clients.items():
+                results[f'stalled_{name}'] = self.timed(call, options['stall_calls'])
+            results['stalled_pooled']['breaker'] = session.breaker.state
+            session.close()
+        self.stdout.write(json.dumps(results, indent=2))
+
+    @staticmethod
+    def timed(call, calls):
+        latencies, failures = [], 0
+        started = time.perf_counter()
+        for _ in range(calls):
+            call_started = time.perf_counter()
+            try:
+                call().close()
+            except GatewayError:
+                failures += 1
+            latencies.append((time.perf_counter() - call_started) * 1000)
+        return {
+            'total_s': round(time.perf_counter() - started, 3),
+            'failures': failures,
+            **{f'{key}_ms': round(value, 2) for key, value in percentiles(latencies).items()},
+        }
@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from payments.services.webhook_service import WebhookInbox
+
+
+class Command(BaseCommand):
+    help = 'Apply pending webhook inbox events (Stripe, SSLCommerz IPN) in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting once drained.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls of an empty inbox.')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            handled = WebhookInbox.process_batch(options['batch_size'])
+            total += handled
+            if handled:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'Processed {total} webhook events')
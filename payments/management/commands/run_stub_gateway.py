@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from payments.stub_gateway import StubGateway
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve a local stub of the Stripe and SSLCommerz APIs. Point STRIPE_API_BASE and '
+        'SSLCOMMERZ_API_BASE at it to exercise checkout offline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8900)
+        parser.add_argument('--delay', type=float, default=0, help='Seconds to wait before each response.')
+        parser.add_argument('--error-rate', type=float, default=0, help='Share of requests answered with 503.')
+
+    def handle(self, *args, **options):
+        stub = StubGateway(options['host'], options['port'], options['delay'], options['error_rate'])
+        self.stdout.write(f'Stub gateway on {stub.url} (Ctrl+C to stop)')
+        try:
+            stub.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stub.server.server_close()
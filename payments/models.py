@@ -10,4 +10,35 @@ class PaymentTransaction(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     transaction_id = models.CharField(max_length=255, blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['order_id'])]
+
+
+class WebhookEvent(models.Model):
+    """
+    Inbox row for a verified gateway callback (Stripe event, SSLCommerz IPN).
+    Webhook views only store these; process_webhooks applies them in batches.
+    """
+    STATUS_CHOICES = [('pending','pending'),('processed','processed'),('ignored','ignored'),('failed','failed')]
+    id = models.BigAutoField(primary_key=True)
+    gateway = models.CharField(max_length=50)
+    event_id = models.CharField(max_length=255)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            # gateways redeliver; one row per event
+            models.UniqueConstraint(fields=['gateway', 'event_id'], name='unique_webhook_event'),
+        ]
+        # the worker drains WHERE status = 'pending' ORDER BY id
+        indexes = [models.Index(fields=['status', 'id'])]
+
+    def __str__(self):
+        return f'{self.gateway}:{self.event_id} ({self.status})'
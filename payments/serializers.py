@@ -3,6 +3,6 @@ from .models import PaymentTransaction
 
 
 class PaymentTransactionSerializer(serializers.ModelSerializer):
-class Meta:
-    model = PaymentTransaction
-    fields = '__all__'
\ No newline at end of file
+    class Meta:
+        model = PaymentTransaction
+        fields = '__all__'
@@ -0,0 +1,228 @@
+import random
+import threading
+import time
+from collections import deque
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+from core.utils import percentiles
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# per-gateway overrides come from settings.PAYMENT_GATEWAYS
+DEFAULTS = {
+    'base_url': '',
+    'connect_timeout': 3.05,
+    'read_timeout': 15,
+    'retries': 2,
+    'backoff': 0.2,
+    'backoff_max': 2.0,
+    'failure_threshold': 5,
+    'reset_timeout': 30,
+    'pool_size': 10,
+}
+
+
+class GatewayError(Exception):
+    def __init__(self, gateway, message):
+        self.gateway = gateway
+        super().__init__(f'{gateway}: {message}')
+
+
+class GatewayTimeout(GatewayError):
+    pass
+
+
+class GatewayUnavailable(GatewayError):
+    """The gateway's circuit is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures and rejects calls
+    for ``reset_timeout`` seconds; then lets a single trial call through
+    (half-open) and closes again if it succeeds.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures, self.opened_at, self.trial_running = 0, None, False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self.trial_running = False
+
+
+class GatewayMetrics:
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(('requests', 'errors', 'timeouts', 'retries', 'rejected'), 0)
+        self.latencies = deque(maxlen=window)
+
+    def incr(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def observe(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds * 1000)
+
+    def snapshot(self):
+        with self.lock:
+            latencies = list(self.latencies)
+            counts = dict(self.counts)
+        return {**counts, **{f'{key}_ms': value and round(value, 2) for key, value in percentiles(latencies).items()}}
+
+
+class GatewaySession(requests.Session):
+    """
+    requests.Session for one payment gateway: a keep-alive connection pool,
+    a (connect, read) timeout on every call, up to ``retries`` retries with
+    full-jitter backoff, a circuit breaker and latency metrics.
+
+    Connection failures, timeouts and 429/502/503/504 are retried when that
+    can't double-submit: idempotent methods, requests carrying an
+    ``Idempotency-Key`` header or passed ``idempotent=True``, and connect
+    timeouts (nothing was sent).
+    Exhausted retries raise GatewayTimeout/GatewayError; other responses,
+    4xx/5xx included, are returned to the caller.
+    """
+
+    def __init__(self, name, config=None):
+        super().__init__()
+        config = {**DEFAULTS, **(config or {})}
+        self.name = name
+        self.base_url = config['base_url'].rstrip('/')
+        self.timeout = (config['connect_timeout'], config['read_timeout'])
+        self.retries = config['retries']
+        self.backoff, self.backoff_max = config['backoff'], config['backoff_max']
+        self.breaker = CircuitBreaker(config['failure_threshold'], config['reset_timeout'])
+        self.metrics = GatewayMetrics()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config['pool_size'])
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def url(self, path):
+        return f'{self.base_url}/{path.lstrip("/")}'
+
+    def sleep_before_retry(self, attempt):
+        time.sleep(random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt)))
+
+    def request(self, method, url, *args, idempotent=None, **kwargs):
+        if not url.startswith(('http://', 'https://')):
+            url = self.url(url)
+        kwargs.setdefault('timeout', self.timeout)
+        if idempotent is None:
+            headers = {**self.headers, **(kwargs.get('headers') or {})}
+            idempotent = method.upper() in IDEMPOTENT_METHODS or 'Idempotency-Key' in headers
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.metrics.incr('rejected')
+                raise GatewayUnavailable(self.name, 'circuit open')
+            self.metrics.incr('requests')
+            started = time.perf_counter()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except requests.Timeout as exc:
+                self.metrics.observe(time.perf_counter() - started)
+                self.metrics.incr('timeouts')
+                self.breaker.record_failure()
+                retry = idempotent or isinstance(exc, requests.ConnectTimeout)
+                if retry and attempt < self.retries:
+                    attempt = self.retry(attempt)
+                    continue
+                raise GatewayTimeout(self.name, str(exc)) from exc
+            except requests.ConnectionError as exc:
+                self.metrics.observe(time.perf_counter() - started)
+                self.metrics.incr('errors')
+                self.breaker.record_failure()
+                if idempotent and attempt < self.retries:
+                    attempt = self.retry(attempt)
+                    continue
+                raise GatewayError(self.name, str(exc)) from exc
+            self.metrics.observe(time.perf_counter() - started)
+            if response.status_code >= 500:
+                self.metrics.incr('errors')
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            if response.status_code in RETRY_STATUSES and idempotent and attempt < self.retries:
+                response.close()
+                attempt = self.retry(attempt)
+                continue
+            return response
+
+    def retry(self, attempt):
+        self.metrics.incr('retries')
+        self.sleep_before_retry(attempt)
+        return attempt + 1
+
+    def stats(self):
+        return {'breaker': self.breaker.state, **self.metrics.snapshot()}
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(name):
+    """The process-wide GatewaySession for ``name`` (a key of settings.PAYMENT_GATEWAYS)."""
+    session = _sessions.get(name)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = _sessions[name] = GatewaySession(name, settings.PAYMENT_GATEWAYS.get(name))
+    return session
+
+
+def gateway_stats():
+    return {name: session.stats() for name, session in sorted(_sessions.items())}
+
+
+def reset_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+@receiver(setting_changed)
+def _reset_on_settings_change(setting, **kwargs):
+    if setting == 'PAYMENT_GATEWAYS':
+        reset_sessions()
@@ -1,12 +1,16 @@
-import requests
+import hashlib
+import hmac
 from django.conf import settings
 from payments.models import PaymentTransaction
+from payments.services.gateway_client import GatewayError, get_session
 
 class SSLCommerzService:
+    init_path = "/gwprocess/v4/api.php"
+
     def __init__(self):
         self.store_id = settings.SSLCOMMERZ_STORE_ID
         self.store_pass = settings.SSLCOMMERZ_STORE_PASS
-        self.init_url = "https://sandbox.sslcommerz.com/gwprocess/v4/api.php"
+        self.session = get_session("sslcommerz")
 
     def create_payment(self, order):
         payload = {
@@ -20,6 +24,22 @@ class SSLCommerzService:
             "cancel_url": settings.SSL_CANCEL_URL,
             "cus_email": order.user.email,
         }
-        r = requests.post(self.init_url, data=payload)
+        # init only opens a hosted payment page (nothing is charged), so it is safe to replay
+        r = self.session.post(self.init_path, data=payload, idempotent=True)
+        if r.status_code >= 500:
+            raise GatewayError("sslcommerz", f"HTTP {r.status_code}")
         data = r.json()
-        return data.get("GatewayPageURL")
\ No newline at end of file
+        return data.get("GatewayPageURL")
+
+    def verify_ipn(self, data):
+        """
+        Check an IPN's ``verify_sign``: md5 over the fields named in
+        ``verify_key`` plus md5(store password), sorted as ``k=v&...``.
+        """
+        keys = [key for key in data.get("verify_key", "").split(",") if key]
+        if not keys or not data.get("verify_sign") or not self.store_pass:
+            return False
+        signed = {key: data.get(key, "") for key in keys}
+        signed["store_passwd"] = hashlib.md5(self.store_pass.encode()).hexdigest()
+        message = "&".join(f"{key}={value}" for key, value in sorted(signed.items()))
+        return hmac.compare_digest(hashlib.md5(message.encode()).hexdigest(), data["verify_sign"])
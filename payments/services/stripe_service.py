@@ -1,20 +1,71 @@
+from decimal import Decimal
 import stripe
 from django.conf import settings
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
-def create_checkout_session(order_id, amount, success_url, cancel_url):
-    session = stripe.checkout.Session.create(
-        payment_method_types=['card'],
-        mode='payment',
-        line_items=[{
-            'price_data':{
-            'currency':'usd',
-            'product_data':{'name':f'Order {order_id}'},
-            'unit_amount': int(float(amount)*100),
+from payments.services.gateway_client import GatewayError, get_session
+
+
+class GatewayRequestsClient(stripe.RequestsClient):
+    """Stripe HTTP client on the pooled 'stripe' GatewaySession; breaker/timeout errors pass through as is."""
+
+    def _handle_request_error(self, e):
+        if isinstance(e, GatewayError):
+            raise e
+        super()._handle_request_error(e)
+
+
+def get_client():
+    session = get_session('stripe')
+    clients = session.__dict__.setdefault('stripe_clients', {})
+    api_key = settings.STRIPE_SECRET_KEY
+    if api_key not in clients:
+        clients[api_key] = stripe.StripeClient(
+            api_key,
+            base_addresses={'api': session.base_url},
+            http_client=GatewayRequestsClient(session=session, timeout=session.timeout),
+            # GatewaySession retries (POSTs are sent with an Idempotency-Key)
+            max_network_retries=0,
+        )
+    return clients[api_key]
+
+
+def to_cents(amount):
+    """Integer minor units of a decimal amount (19.99 -> 1999; float math would give 1998)."""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal('1')))
+
+
+def create_checkout_session(order_id, amount, success_url, cancel_url, expires_at=None):
+    expires = {'expires_at': int(expires_at.timestamp())} if expires_at else {}
+    return get_client().v1.checkout.sessions.create(
+        params={
+            'payment_method_types': ['card'],
+            'mode': 'payment',
+            'line_items': [{
+                'price_data': {
+                    'currency': 'usd',
+                    'product_data': {'name': f'Order {order_id}'},
+                    'unit_amount': to_cents(amount),
+                },
+                'quantity': 1,
+            }],
+            'success_url': success_url,
+            'cancel_url': cancel_url,
+            'metadata': {'order_id': str(order_id)},
+            **expires,
+        },
+        # the same key with other params is refused by Stripe, so the expiry is part of it
+        options={'idempotency_key': f'checkout-session-{order_id}-{amount}-{expires.get("expires_at", "")}'},
+    )
+
+
+def create_payment_intent(amount, metadata, description, idempotency_key):
+    return get_client().v1.payment_intents.create(
+        params={
+            'amount': to_cents(amount),
+            'currency': 'usd',
+            'metadata': metadata,
+            'description': description,
+            'automatic_payment_methods': {'enabled': True},
         },
-         'quantity':1,
-        }],
-        success_url=success_url,
-        cancel_url=cancel_url,
-        metadata={'order_id': str(order_id)})
-    return session
\ No newline at end of file
+        options={'idempotency_key': idempotency_key},
+    )
+
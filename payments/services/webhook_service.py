@@ -0,0 +1,173 @@
+import uuid
+from collections import namedtuple
+from decimal import InvalidOperation
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from orders.models import Order
+from orders.tasks import send_order_confirmation_email
+from payments.models import PaymentTransaction, WebhookEvent
+from payments.services.stripe_service import to_cents
+from products.services.inventory_service import InventoryService
+from taskqueue.services.queue_service import TaskQueue
+
+PAID, FAILED = 'paid', 'failed'
+LATE_PAYMENT = 'paid after the order was cancelled; refund needed'
+
+# event type -> outcome; anything else is stored and ignored
+STRIPE_OUTCOMES = {
+    'checkout.session.completed': PAID,
+    'checkout.session.async_payment_succeeded': PAID,
+    'payment_intent.succeeded': PAID,
+    'checkout.session.async_payment_failed': FAILED,
+    'checkout.session.expired': FAILED,
+    'payment_intent.payment_failed': FAILED,
+}
+SSLCOMMERZ_OUTCOMES = {
+    'VALID': PAID,
+    'VALIDATED': PAID,
+    'FAILED': FAILED,
+    'CANCELLED': FAILED,
+    'EXPIRED': FAILED,
+}
+
+# amount: integer cents, or None when the gateway didn't send one
+Outcome = namedtuple('Outcome', 'event order_id result amount transaction_id')
+
+
+def _order_id(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _cents(value, minor=False):
+    """Amount in integer cents; gateways send minor units (Stripe) or a decimal string (SSLCommerz)."""
+    try:
+        return int(value) if minor else to_cents(value)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+def stripe_outcome(event):
+    result = STRIPE_OUTCOMES.get(event.event_type)
+    obj = event.payload.get('data', {}).get('object', {})
+    # completed checkouts paid with delayed methods (bank debits) settle later
+    if event.event_type == 'checkout.session.completed' and obj.get('payment_status') != 'paid':
+        result = None
+    if result is None:
+        return None
+    amount = obj.get('amount_total', obj.get('amount_received', obj.get('amount')))
+    return Outcome(
+        event, _order_id((obj.get('metadata') or {}).get('order_id')), result,
+        _cents(amount, minor=True) if amount is not None else None,
+        obj.get('payment_intent') or obj.get('id'),
+    )
+
+
+def sslcommerz_outcome(event):
+    result = SSLCOMMERZ_OUTCOMES.get(event.event_type)
+    if result is None:
+        return None
+    data = event.payload
+    return Outcome(
+        event, _order_id(data.get('tran_id')), result, _cents(data.get('amount')),
+        data.get('bank_tran_id') or data.get('val_id'),
+    )
+
+
+OUTCOME_PARSERS = {'stripe': stripe_outcome, 'sslcommerz': sslcommerz_outcome}
+
+
+class WebhookInbox:
+    @staticmethod
+    def store(gateway, event_id, event_type, payload):
+        """Persist a verified callback. Returns False for a redelivered event."""
+        try:
+            with transaction.atomic():
+                WebhookEvent.objects.create(
+                    gateway=gateway, event_id=event_id, event_type=event_type, payload=payload,
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    @staticmethod
+    def process_batch(batch_size=100):
+        """
+        Apply up to ``batch_size`` pending events in one transaction with a
+        fixed number of queries: paid orders -> PAID, their stock reservations
+        committed and confirmation emails queued; failed ones -> CANCELLED and
+        stock released; one PaymentTransaction per applied outcome. Orders
+        that already left PENDING are left alone, so replays and late
+        duplicates are no-ops, except a payment for a cancelled or missing
+        order: its event is marked failed (LATE_PAYMENT) to be refunded.
+        Returns the number of events handled.
+        """
+        with transaction.atomic():
+            pending = WebhookEvent.objects.filter(status='pending').order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                pending = pending.select_for_update(skip_locked=True)
+            events = list(pending[:batch_size])
+            if not events:
+                return 0
+
+            ignored, outcomes = [], {}
+            for event in events:
+                parse = OUTCOME_PARSERS.get(event.gateway)
+                outcome = parse(event) if parse else None
+                if outcome is None or outcome.order_id is None:
+                    ignored.append(event.pk)
+                    continue
+                # a success anywhere in the batch wins over failed attempts
+                current = outcomes.get(outcome.order_id)
+                if current is None or (current.result == FAILED and outcome.result == PAID):
+                    outcomes[outcome.order_id] = outcome
+
+            orders = {
+                pk: (order_status, total)
+                for pk, order_status, total in Order.objects.filter(id__in=outcomes).values_list('id', 'status', 'total_price')
+            }
+            paid, failed, errors = [], [], {}
+            for order_id, outcome in outcomes.items():
+                order_status, total = orders.get(order_id, (None, None))
+                if order_status != 'PENDING':
+                    # money taken for an order that won't ship (hold expired, cancelled, deleted):
+                    # leave the event failed so it shows up for a refund
+                    if outcome.result == PAID and order_status in (None, 'CANCELLED'):
+                        errors[outcome.event.pk] = LATE_PAYMENT
+                    continue
+                if outcome.result == FAILED:
+                    failed.append(outcome)
+                elif outcome.amount is not None and outcome.amount != to_cents(total):
+                    errors[outcome.event.pk] = 'amount does not match order total'
+                else:
+                    paid.append(outcome)
+
+            if paid:
+                paid_ids = [outcome.order_id for outcome in paid]
+                Order.objects.filter(id__in=paid_ids, status='PENDING').update(status='PAID')
+                InventoryService.commit(paid_ids)
+                TaskQueue.enqueue_many([send_order_confirmation_email.build([order_id]) for order_id in paid_ids])
+            if failed:
+                failed_ids = [outcome.order_id for outcome in failed]
+                Order.objects.filter(id__in=failed_ids, status='PENDING').update(status='CANCELLED')
+                InventoryService.release(failed_ids)
+            PaymentTransaction.objects.bulk_create([
+                PaymentTransaction(
+                    order_id=outcome.order_id, payment_gateway=outcome.event.gateway,
+                    amount=orders[outcome.order_id][1], transaction_id=outcome.transaction_id,
+                    status='success' if outcome.result == PAID else 'failed',
+                )
+                for outcome in paid + failed
+            ])
+
+            now = timezone.now()
+            WebhookEvent.objects.filter(pk__in=ignored).update(status='ignored', processed_at=now)
+            for error in set(errors.values()):
+                WebhookEvent.objects.filter(pk__in=[pk for pk in errors if errors[pk] == error]).update(
+                    status='failed', error=error, processed_at=now,
+                )
+            done = {event.pk for event in events} - set(ignored) - set(errors)
+            WebhookEvent.objects.filter(pk__in=done).update(status='processed', processed_at=now)
+        return len(events)
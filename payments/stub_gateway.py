@@ -0,0 +1,160 @@
+# File: payments/stub_gateway.py
+# Local stand-in for the Stripe and SSLCommerz HTTP APIs (tests, offline dev, benchmarks).
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+def _form(body):
+    """Flatten Stripe-style ``metadata[order_id]=..`` form fields into nested dicts."""
+    data = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        node, parts = data, key.replace(']', '').split('[')
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return data
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connection pooling is observable
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def setup(self):
+        super().setup()
+        self.server.stub.count('connections')
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond()
+
+    def respond(self):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode() if length else ''
+        path = urlsplit(self.path).path
+        stub.count('requests')
+        stub.calls.append((self.command, path))
+        if stub.delay:
+            time.sleep(stub.delay)
+        status = stub.next_failure()
+        if status:
+            return self.send_json(status, {'error': {'type': 'api_error', 'message': 'stub failure'}})
+        key = self.headers.get('Idempotency-Key')
+        if key and key in stub.replies:
+            return self.send_json(*stub.replies[key])
+        reply = self.route(self.command, path, _form(body))
+        if key:
+            stub.replies[key] = reply
+        self.send_json(*reply)
+
+    def route(self, method, path, form):
+        base = self.server.stub.url
+        token = uuid.uuid4().hex[:24]
+        if method == 'POST' and path == '/gwprocess/v4/api.php':
+            return 200, {
+                'status': 'SUCCESS', 'sessionkey': token, 'tran_id': form.get('tran_id'),
+                'GatewayPageURL': f'{base}/gwprocess/v4/gw.php?Q=pay&SESSIONKEY={token}',
+            }
+        if method == 'POST' and path == '/v1/checkout/sessions':
+            items = form.get('line_items', {}).values()
+            return 200, {
+                'id': f'cs_test_{token}', 'object': 'checkout.session', 'mode': form.get('mode'),
+                'payment_status': 'unpaid', 'url': f'{base}/c/pay/cs_test_{token}',
+                'amount_total': sum(int(i['price_data']['unit_amount']) * int(i.get('quantity', 1)) for i in items),
+                'expires_at': int(form['expires_at']) if 'expires_at' in form else None,
+                'metadata': form.get('metadata', {}),
+            }
+        if method == 'POST' and path == '/v1/payment_intents':
+            return 200, {
+                'id': f'pi_{token}', 'object': 'payment_intent', 'status': 'requires_payment_method',
+                'amount': int(form.get('amount', 0)), 'currency': form.get('currency'),
+                'client_secret': f'pi_{token}_secret_stub', 'metadata': form.get('metadata', {}),
+            }
+        if method == 'GET' and path.startswith('/v1/payment_intents/'):
+            return 200, {'id': path.rsplit('/', 1)[-1], 'object': 'payment_intent', 'status': 'succeeded'}
+        return 404, {'error': {'type': 'invalid_request_error', 'message': f'No such route: {method} {path}'}}
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubGatewayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients that timed out hang up before a delayed reply is written
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubGateway:
+    """
+    Threaded HTTP server answering the gateway calls this project makes:
+    SSLCommerz session init, Stripe checkout sessions and payment intents
+    (Idempotency-Key replays return the first response, like Stripe).
+
+    ``delay`` (seconds) slows every response, ``error_rate`` fails a random
+    share with 503 and ``fail_next(n, status)`` queues failures. ``port=0``
+    picks a free port; use as a context manager or start()/stop().
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0, error_rate=0):
+        self.server = StubGatewayServer((host, port), StubGatewayHandler)
+        self.server.stub = self
+        self.delay, self.error_rate = delay, error_rate
+        self.failures = deque()
+        self.replies = {}
+        self.calls = deque(maxlen=1000)
+        self.counts = {'connections': 0, 'requests': 0}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def fail_next(self, count=1, status=503):
+        self.failures.extend([status] * count)
+
+    def next_failure(self):
+        try:
+            return self.failures.popleft()
+        except IndexError:
+            return 503 if self.error_rate and random.random() < self.error_rate else None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,9 @@
+from taskqueue.registry import task
+from .services.webhook_service import WebhookInbox
+
+
+@task
+def process_webhooks(batch_size=100):
+    """Drain the webhook inbox; queued (deduplicated) by the webhook views."""
+    while WebhookInbox.process_batch(batch_size) == batch_size:
+        pass
@@ -1,3 +1,338 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.testing import QueryBudgetMixin
+from orders.models import Order
+from products.models import Product, StockReservation
+from products.services.inventory_service import InventoryService
+from taskqueue.models import Task
+from users.models import User
+from .models import PaymentTransaction, WebhookEvent
+from .services import stripe_service
+from .services.gateway_client import (
+    CircuitBreaker, GatewaySession, GatewayTimeout, GatewayUnavailable, get_session,
+)
+from .services.sslcommerz_service import SSLCommerzService
+from .services.webhook_service import LATE_PAYMENT, WebhookInbox
+from .stub_gateway import StubGateway
 
-# Create your tests here.
+INIT_PATH = '/gwprocess/v4/api.php'
+
+
+class StubGatewayMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = StubGateway().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.stub.failures.clear()
+        self.stub.delay = 0
+
+    def session(self, **config):
+        session = GatewaySession('stub', {'base_url': self.stub.url, 'backoff': 0, **config})
+        self.addCleanup(session.close)
+        return session
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_threshold_and_half_opens_after_timeout(self):
+        now = [0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+
+        now[0] = 11
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # one trial call at a time
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+
+        now[0] = 22
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+
+class GatewaySessionTests(StubGatewayMixin, SimpleTestCase):
+    def test_reuses_pooled_connection(self):
+        session = self.session()
+        before = self.stub.counts['connections']
+        for _ in range(5):
+            self.assertEqual(session.post(INIT_PATH, data={'tran_id': 't'}).status_code, 200)
+        self.assertEqual(self.stub.counts['connections'] - before, 1)
+
+    def test_retries_replayable_calls(self):
+        session = self.session(retries=2)
+        self.stub.fail_next(2)
+        response = session.post(INIT_PATH, data={'tran_id': 't'}, idempotent=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(session.stats()['retries'], 2)
+
+    def test_does_not_replay_plain_posts(self):
+        session = self.session(retries=2)
+        self.stub.fail_next(1)
+        before = self.stub.counts['requests']
+        self.assertEqual(session.post(INIT_PATH, data={'tran_id': 't'}).status_code, 503)
+        self.assertEqual(self.stub.counts['requests'] - before, 1)
+
+    def test_read_timeout(self):
+        session = self.session(read_timeout=0.05, retries=0)
+        self.stub.delay = 0.3
+        with self.assertRaises(GatewayTimeout):
+            session.post(INIT_PATH, data={'tran_id': 't'})
+        self.assertEqual(session.stats()['timeouts'], 1)
+
+    def test_open_circuit_fails_fast(self):
+        session = self.session(retries=0, failure_threshold=2)
+        self.stub.fail_next(2)
+        for _ in range(2):
+            session.post(INIT_PATH, data={'tran_id': 't'})
+        before = self.stub.counts['requests']
+        with self.assertRaises(GatewayUnavailable):
+            session.post(INIT_PATH, data={'tran_id': 't'})
+        self.assertEqual(self.stub.counts['requests'], before)
+        self.assertEqual(session.stats()['breaker'], 'open')
+
+
+class GatewayServiceTests(StubGatewayMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        gateway = {'base_url': self.stub.url, 'backoff': 0, 'retries': 1, 'failure_threshold': 2}
+        overrides = self.settings(
+            PAYMENT_GATEWAYS={'stripe': gateway, 'sslcommerz': gateway},
+            STRIPE_SECRET_KEY='sk_test_stub', SSLCOMMERZ_STORE_ID='store', SSLCOMMERZ_STORE_PASS='pass',
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = User.objects.create_user(username='payer', email='payer@example.com', password='pass')
+        self.order = Order.objects.create(user=self.user, total_price=Decimal('12.50'))
+        product = Product.objects.create(name='Lamp', price='12.50', stock=5)
+        InventoryService.reserve(self.order.id, {product.pk: 1})
+
+    def test_sslcommerz_create_payment(self):
+        self.stub.fail_next(1)
+        url = SSLCommerzService().create_payment(self.order)
+        self.assertTrue(url.startswith(self.stub.url))
+
+    def test_stripe_checkout_session_replays_with_idempotency_key(self):
+        self.stub.fail_next(1)
+        session = stripe_service.create_checkout_session(self.order.id, self.order.total_price, 'http://s', 'http://c')
+        self.assertTrue(session.id.startswith('cs_test_'))
+        self.assertEqual(session.metadata['order_id'], str(self.order.id))
+        self.assertEqual(get_session('stripe').stats()['retries'], 1)
+
+    def test_checkout_session_amount_matches_order_total_in_cents(self):
+        # float(19.99) * 100 truncates to 1998: the paid webhook would then be rejected
+        order = Order.objects.create(user=self.user, total_price=Decimal('19.99'))
+        session = stripe_service.create_checkout_session(order.id, order.total_price, 'http://s', 'http://c')
+        self.assertEqual(session.amount_total, 1999)
+        obj = {**session.to_dict(), 'payment_status': 'paid'}
+        event = {'id': 'evt_1999', 'type': 'checkout.session.completed', 'data': {'object': obj}}
+        WebhookInbox.store('stripe', event['id'], event['type'], event)
+        WebhookInbox.process_batch()
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'PAID')
+        self.assertEqual(WebhookEvent.objects.get().status, 'processed')
+
+    def test_session_expires_before_the_stock_hold(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('stripe_create_session')
+        before = int(time.time())
+        response = client.post(url, {'order_id': str(self.order.id)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        session = self.stub.replies[next(reversed(self.stub.replies))][1]
+        self.assertGreaterEqual(session['expires_at'], before + 30 * 60)
+        hold = StockReservation.objects.get(order_id=self.order.id)
+        self.assertGreater(hold.expires_at.timestamp(), session['expires_at'])
+
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = client.post(url, {'order_id': str(self.order.id)}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_create_session_view_returns_503_when_circuit_open(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('stripe_create_session')
+        response = client.post(url, {'order_id': str(self.order.id)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('url', response.data)
+
+        breaker = get_session('stripe').breaker
+        breaker.record_failure()
+        breaker.record_failure()
+        response = client.post(url, {'order_id': str(self.order.id)}, format='json', HTTP_IDEMPOTENCY_KEY='k')
+        self.assertEqual(response.status_code, 503)
+
+        # the 503 was not stored: a retry with the same key reaches the gateway
+        breaker.record_success()
+        response = client.post(url, {'order_id': str(self.order.id)}, format='json', HTTP_IDEMPOTENCY_KEY='k')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_create_intent_view(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('stripe_create_intent')
+        response = client.post(url, {'order_id': str(self.order.id)}, format='json', HTTP_IDEMPOTENCY_KEY='pi')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['client_secret'].startswith('pi_'))
+        self.assertEqual((response.data['order_id'], response.data['amount']), (str(self.order.id), '12.50'))
+        before = self.stub.counts['requests']
+        replay = client.post(url, {'order_id': str(self.order.id)}, format='json', HTTP_IDEMPOTENCY_KEY='pi')
+        self.assertEqual((replay.json(), replay['Idempotent-Replayed']), (response.json(), 'true'))
+        self.assertEqual(self.stub.counts['requests'], before)
+
+        Order.objects.filter(pk=self.order.pk).update(status='PAID')
+        self.assertEqual(client.post(url, {'order_id': str(self.order.id)}, format='json').status_code, 400)
+
+
+def stripe_signature(payload, secret, timestamp=None):
+    timestamp = timestamp or int(time.time())
+    digest = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={digest}'
+
+
+def sslcommerz_ipn(store_pass, **fields):
+    data = {'verify_key': ','.join(sorted(fields)), **fields}
+    signed = {**fields, 'store_passwd': hashlib.md5(store_pass.encode()).hexdigest()}
+    message = '&'.join(f'{key}={value}' for key, value in sorted(signed.items()))
+    data['verify_sign'] = hashlib.md5(message.encode()).hexdigest()
+    return data
+
+
+class WebhookInboxTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        overrides = self.settings(STRIPE_WEBHOOK_SECRET='whsec_test', SSLCOMMERZ_STORE_PASS='pass')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='payer', email='payer@example.com', password='pass')
+        self.product = Product.objects.create(name='Lamp', price='10.00', stock=100)
+
+    def order(self, quantity=1):
+        order = Order.objects.create(user=self.user, total_price=Decimal('10.00') * quantity)
+        InventoryService.reserve(order.id, {self.product.pk: quantity})
+        return order
+
+    def stripe_event(self, event_id, event_type, order, **obj):
+        obj = {'id': f'cs_{event_id}', 'payment_status': 'paid', 'amount_total': int(order.total_price * 100),
+               'metadata': {'order_id': str(order.id)}, **obj}
+        return {'id': event_id, 'object': 'event', 'type': event_type, 'data': {'object': obj}}
+
+    def post_stripe(self, event):
+        payload = json.dumps(event)
+        return self.client.post(
+            reverse('stripe_webhook'), payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=stripe_signature(payload, 'whsec_test'),
+        )
+
+    def test_stripe_webhook_stores_and_acks_once(self):
+        order = self.order()
+        event = self.stripe_event('evt_1', 'checkout.session.completed', order)
+        for _ in range(2):
+            response = self.post_stripe(event)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(WebhookEvent.objects.filter(gateway='stripe', event_id='evt_1').count(), 1)
+        self.assertEqual(Task.objects.filter(name='payments.tasks.process_webhooks').count(), 1)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'PENDING')  # applied by the worker, not the request
+
+    def test_stripe_webhook_rejects_bad_signature(self):
+        response = self.client.post(
+            reverse('stripe_webhook'), '{}', content_type='application/json', HTTP_STRIPE_SIGNATURE='t=1,v1=bad',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_batch_applies_outcomes_with_fixed_query_count(self):
+        paid = [self.order() for _ in range(10)]
+        failed = [self.order() for _ in range(5)]
+        for i, order in enumerate(paid):
+            WebhookInbox.store('stripe', f'evt_p{i}', 'checkout.session.completed',
+                               self.stripe_event(f'evt_p{i}', 'checkout.session.completed', order))
+        for i, order in enumerate(failed):
+            WebhookInbox.store('stripe', f'evt_f{i}', 'checkout.session.expired',
+                               self.stripe_event(f'evt_f{i}', 'checkout.session.expired', order))
+        WebhookInbox.store('stripe', 'evt_other', 'customer.created', {'data': {'object': {}}})
+
+        # independent of the batch size: one statement per kind of state change
+        with self.assertMaxQueries(16):
+            self.assertEqual(WebhookInbox.process_batch(), 16)
+
+        self.assertEqual(Order.objects.filter(status='PAID').count(), 10)
+        self.assertEqual(Order.objects.filter(status='CANCELLED').count(), 5)
+        self.assertEqual(StockReservation.objects.filter(status='COMMITTED').count(), 10)
+        self.assertEqual(StockReservation.objects.filter(status='RELEASED').count(), 5)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 90)
+        self.assertEqual(PaymentTransaction.objects.filter(status='success').count(), 10)
+        self.assertEqual(Task.objects.filter(name='orders.tasks.send_order_confirmation_email').count(), 10)
+        self.assertEqual(WebhookEvent.objects.get(event_id='evt_other').status, 'ignored')
+        self.assertEqual(WebhookInbox.process_batch(), 0)
+
+    def test_late_failure_after_payment_is_a_no_op(self):
+        order = self.order()
+        WebhookInbox.store('stripe', 'evt_ok', 'payment_intent.succeeded',
+                           self.stripe_event('evt_ok', 'payment_intent.succeeded', order, amount_total=None, amount=1000))
+        WebhookInbox.process_batch()
+        WebhookInbox.store('stripe', 'evt_late', 'payment_intent.payment_failed',
+                           self.stripe_event('evt_late', 'payment_intent.payment_failed', order))
+        WebhookInbox.process_batch()
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'PAID')
+        self.assertEqual(PaymentTransaction.objects.count(), 1)
+
+    def test_amount_mismatch_is_not_applied(self):
+        order = self.order()
+        WebhookInbox.store('stripe', 'evt_1', 'checkout.session.completed',
+                           self.stripe_event('evt_1', 'checkout.session.completed', order, amount_total=1))
+        WebhookInbox.process_batch()
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'PENDING')
+        self.assertEqual(WebhookEvent.objects.get().status, 'failed')
+
+    def test_payment_after_cancellation_is_flagged_for_refund(self):
+        order = self.order()
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        InventoryService.expire_stale()
+        WebhookInbox.store('stripe', 'evt_late', 'checkout.session.completed',
+                           self.stripe_event('evt_late', 'checkout.session.completed', order))
+        WebhookInbox.process_batch()
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'CANCELLED')
+        event = WebhookEvent.objects.get()
+        self.assertEqual((event.status, event.error), ('failed', LATE_PAYMENT))
+        self.assertFalse(PaymentTransaction.objects.exists())
+
+    def test_sslcommerz_ipn_goes_through_the_inbox(self):
+        order = self.order(quantity=2)
+        data = sslcommerz_ipn('pass', tran_id=str(order.id), val_id='val_1', status='VALID',
+                              amount='20.00', bank_tran_id='bank_1')
+        response = self.client.post(reverse('sslcommerz_ipn'), data)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(reverse('sslcommerz_ipn'), {**data, 'amount': '1.00'})
+        self.assertEqual(response.status_code, 400)
+
+        WebhookInbox.process_batch()
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'PAID')
+        transaction = PaymentTransaction.objects.get()
+        self.assertEqual((transaction.payment_gateway, transaction.transaction_id), ('sslcommerz', 'bank_1'))
@@ -1,7 +1,12 @@
 from django.urls import path
-from .views import CreateStripeSessionView, StripeWebhookView
+from .views import (
+    CreatePaymentIntentView, CreateStripeSessionView, GatewayStatsView, SSLCommerzIPNView, StripeWebhookView,
+)
 
 urlpatterns = [
     path('stripe/create-session/', CreateStripeSessionView.as_view(), name='stripe_create_session'),
+    path('stripe/create-intent/', CreatePaymentIntentView.as_view(), name='stripe_create_intent'),
     path('stripe/webhook/', StripeWebhookView.as_view(), name='stripe_webhook'),
-]
\ No newline at end of file
+    path('sslcommerz/ipn/', SSLCommerzIPNView.as_view(), name='sslcommerz_ipn'),
+    path('gateways/', GatewayStatsView.as_view(), name='gateway_stats'),
+]
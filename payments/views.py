@@ -1,133 +1,122 @@
+import json
+from datetime import timedelta
 import stripe
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from core.idempotency import IdempotencyMixin
 from orders.models import Order
+from payments.services import stripe_service
+from payments.services.gateway_client import GatewayError, gateway_stats
+from payments.services.sslcommerz_service import SSLCommerzService
+from payments.services.webhook_service import WebhookInbox
+from payments.tasks import process_webhooks
+from products.services.inventory_service import InventoryService
 
-# Configure Stripe
-stripe.api_key = settings.STRIPE_SECRET_KEY
 
-class CreatePaymentIntentView(APIView):
+def queue_webhook_processing():
+    # one queued drain at a time however many events arrive
+    process_webhooks.enqueue(dedupe_key='payments.process_webhooks')
+
+
+def gateway_unavailable(exc):
+    return Response({'error': 'Payment gateway unavailable, please retry', 'detail': str(exc)},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class CreateStripeSessionView(IdempotencyMixin, APIView):
     permission_classes = [IsAuthenticated]
-    
+
     @swagger_auto_schema(
-        operation_description="Create Stripe payment intent",
+        operation_description="Create a Stripe Checkout session for an order",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
-                'order_number': openapi.Schema(type=openapi.TYPE_STRING),
+                'order_id': openapi.Schema(type=openapi.TYPE_STRING),
+                'success_url': openapi.Schema(type=openapi.TYPE_STRING),
+                'cancel_url': openapi.Schema(type=openapi.TYPE_STRING),
             }
         ),
-        responses={200: 'Payment intent created', 400: 'Bad Request'}
+        responses={200: 'Checkout session created', 400: 'Bad Request', 503: 'Gateway unavailable'}
     )
     def post(self, request):
-        order_number = request.data.get('order_number')
-        
-        if not order_number:
-            return Response(
-                {'error': 'order_number is required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Get order
-        order = get_object_or_404(Order, order_number=order_number, user=request.user)
-        
-        # Check if order can be paid
-        if order.payment_status != 'pending':
-            return Response(
-                {'error': 'Order payment is not pending'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
+        order_id = request.data.get('order_id')
+        if not order_id:
+            return Response({'error': 'order_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        order = get_object_or_404(Order, id=order_id, user=request.user)
+        if order.status != 'PENDING':
+            return Response({'error': 'Order is not pending payment'}, status=status.HTTP_400_BAD_REQUEST)
+        # the session can't be paid after it expires; the stock hold lasts until just after that
+        expires_at = timezone.now() + timedelta(seconds=settings.STRIPE_CHECKOUT_TTL)
+        if not InventoryService.extend([order.id], expires_at + timedelta(minutes=1)):
+            return Response({'error': 'Stock hold has expired; place the order again'},
+                            status=status.HTTP_400_BAD_REQUEST)
         try:
-            # Create PaymentIntent
-            intent = stripe.PaymentIntent.create(
-                amount=int(order.total * 100),  # Convert to cents
-                currency='usd',
-                metadata={
-                    'order_number': order.order_number,
-                    'user_id': str(request.user.id)
-                },
-                description=f"Payment for order {order.order_number}",
-                automatic_payment_methods={
-                    'enabled': True,
-                },
+            session = stripe_service.create_checkout_session(
+                order.id, order.total_price,
+                request.data.get('success_url') or request.build_absolute_uri('/'),
+                request.data.get('cancel_url') or request.build_absolute_uri('/'),
+                expires_at=expires_at,
             )
-            
-            return Response({
-                'client_secret': intent.client_secret,
-                'publishable_key': settings.STRIPE_PUBLISHABLE_KEY,
-                'order_number': order.order_number,
-                'amount': order.total
-            })
-            
+        except GatewayError as e:
+            return gateway_unavailable(e)
         except stripe.error.StripeError as e:
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'session_id': session.id, 'url': session.url})
+
+
+class GatewayStatsView(APIView):
+    """Breaker state and call latency per payment gateway (this worker process)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(gateway_stats())
 
-class PaymentSuccessView(APIView):
+
+class CreatePaymentIntentView(IdempotencyMixin, APIView):
+    """Stripe PaymentIntent for an order; payment is confirmed by the payment_intent.succeeded webhook."""
     permission_classes = [IsAuthenticated]
-    
+
     @swagger_auto_schema(
-        operation_description="Handle successful payment",
-        responses={200: 'Payment successful', 400: 'Bad Request'}
+        operation_description="Create a Stripe PaymentIntent for an order",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'order_id': openapi.Schema(type=openapi.TYPE_STRING),
+            }
+        ),
+        responses={200: 'Payment intent created', 400: 'Bad Request', 503: 'Gateway unavailable'}
     )
     def post(self, request):
-        payment_intent_id = request.data.get('payment_intent_id')
-        order_number = request.data.get('order_number')
-        
-        if not payment_intent_id or not order_number:
-            return Response(
-                {'error': 'payment_intent_id and order_number are required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
+        order_id = request.data.get('order_id')
+        if not order_id:
+            return Response({'error': 'order_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        order = get_object_or_404(Order, id=order_id, user=request.user)
+        if order.status != 'PENDING':
+            return Response({'error': 'Order is not pending payment'}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            # Retrieve payment intent
-            intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-            
-            # Verify payment status
-            if intent.status != 'succeeded':
-                return Response(
-                    {'error': 'Payment not successful'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Get order
-            order = get_object_or_404(Order, order_number=order_number, user=request.user)
-            
-            # Update order payment status
-            order.payment_status = 'paid'
-            order.payment_method = 'stripe'
-            order.transaction_id = payment_intent_id
-            order.paid_at = timezone.now()
-            order.save()
-            
-            # Update order status to confirmed
-            order.status = 'confirmed'
-            order.save()
-            
-            # Trigger order confirmation email (async)
-            # send_order_confirmation_email.delay(order.id)
-            
-            return Response({
-                'message': 'Payment successful',
-                'order_number': order.order_number,
-                'transaction_id': payment_intent_id
-            })
-            
-        except stripe.error.StripeError as e:
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_400_BAD_REQUEST
+            intent = stripe_service.create_payment_intent(
+                amount=order.total_price,
+                metadata={'order_id': str(order.id), 'user_id': str(request.user.id)},
+                description=f'Payment for order {order.id}',
+                idempotency_key=f'payment-intent-{order.id}-{order.total_price}',
             )
+        except GatewayError as e:
+            return gateway_unavailable(e)
+        except stripe.error.StripeError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'client_secret': intent.client_secret,
+            'publishable_key': settings.STRIPE_PUBLISHABLE_KEY,
+            'order_id': str(order.id),
+            'amount': str(order.total_price),
+        })
 
 class StripeWebhookView(APIView):
     permission_classes = []
@@ -150,39 +139,26 @@ class StripeWebhookView(APIView):
         except stripe.error.SignatureVerificationError as e:
             return Response({'error': 'Invalid signature'}, status=400)
         
-        # Handle the event
-        if event['type'] == 'payment_intent.succeeded':
-            payment_intent = event['data']['object']
-            handle_payment_intent_succeeded(payment_intent)
-        elif event['type'] == 'payment_intent.payment_failed':
-            payment_intent = event['data']['object']
-            handle_payment_intent_failed(payment_intent)
-        
-        return Response({'status': 'success'})
+        # verify, persist, ack: process_webhooks applies it, so a burst of
+        # redeliveries after an outage doesn't tie up the web workers
+        if WebhookInbox.store('stripe', event['id'], event['type'], json.loads(payload)):
+            queue_webhook_processing()
+        return Response({'status': 'received'})
 
-def handle_payment_intent_succeeded(payment_intent):
-    """Handle successful payment from webhook"""
-    order_number = payment_intent['metadata'].get('order_number')
-    
-    if order_number:
-        try:
-            order = Order.objects.get(order_number=order_number)
-            order.payment_status = 'paid'
-            order.transaction_id = payment_intent['id']
-            order.paid_at = timezone.now()
-            order.status = 'confirmed'
-            order.save()
-        except Order.DoesNotExist:
-            pass
-
-def handle_payment_intent_failed(payment_intent):
-    """Handle failed payment from webhook"""
-    order_number = payment_intent['metadata'].get('order_number')
-    
-    if order_number:
-        try:
-            order = Order.objects.get(order_number=order_number)
-            order.payment_status = 'failed'
-            order.save()
-        except Order.DoesNotExist:
-            pass
\ No newline at end of file
+
+class SSLCommerzIPNView(APIView):
+    permission_classes = []
+    authentication_classes = []
+
+    @swagger_auto_schema(
+        operation_description="SSLCommerz IPN (instant payment notification) endpoint",
+        responses={200: 'IPN received', 400: 'Invalid signature'}
+    )
+    def post(self, request):
+        data = {key: value for key, value in request.data.items()}
+        if not SSLCommerzService().verify_ipn(data):
+            return Response({'error': 'Invalid signature'}, status=400)
+        event_id = data.get('val_id') or f"{data.get('tran_id')}:{data.get('status')}"
+        if WebhookInbox.store('sslcommerz', event_id, data.get('status', ''), data):
+            queue_webhook_processing()
+        return Response({'status': 'received'})
@@ -1,6 +1,8 @@
-from django.contrib import admin
-from .models import Product, Category
+from django.contrib import admin, messages
+from django.core.exceptions import ImproperlyConfigured
+from .models import Product, Category, StockReservation
 from django.utils.html import format_html
+from .services.hot_stock_service import HotStockService
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -10,9 +12,24 @@ class CategoryAdmin(admin.ModelAdmin):
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'price', 'stock', 'category', 'thumbnail')
+    list_select_related = ('category',)
     readonly_fields = ('preview',)
     list_filter = ('category',)
     search_fields = ('name',)
+    actions = ('enable_hot_stock', 'disable_hot_stock')
+
+    @admin.action(description="Enable hot-SKU mode (sharded stock)")
+    def enable_hot_stock(self, request, queryset):
+        try:
+            for product in queryset:
+                HotStockService.enable(product)
+        except ImproperlyConfigured as exc:
+            self.message_user(request, str(exc), messages.ERROR)
+
+    @admin.action(description="Disable hot-SKU mode")
+    def disable_hot_stock(self, request, queryset):
+        for product in queryset:
+            HotStockService.disable(product)
 
     def thumbnail(self, obj):
         if obj.image:
@@ -23,4 +40,11 @@ class ProductAdmin(admin.ModelAdmin):
     def preview(self, obj):
         if obj.image:
             return format_html(f'<img src="{obj.image.url}" width="200" />')
-        return "No Image"
\ No newline at end of file
+        return "No Image"
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'order_id', 'product', 'quantity', 'status', 'expires_at')
+    list_select_related = ('product',)
+    list_filter = ('status',)
+    search_fields = ('order_id',)
@@ -0,0 +1,132 @@
+# File: products/cache.py
+# Versioned read-through response cache for the catalog endpoints.
+import hashlib
+import threading
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+class CatalogCache:
+    """
+    Cached ``response.data`` keyed by catalog version, host, path, query
+    string, renderer and the newest ``updated_at``. Any Product/Category
+    save or delete bumps the version (see products.signals), which orphans
+    every cached entry at once; stock changed through queryset ``update()``
+    (checkout, hot-SKU flush) sets ``updated_at`` and so moves the key too.
+    The same inputs give the responses their ETag and Last-Modified.
+    """
+    version_key = 'version'
+    changed_key = 'changed_at'
+    _lock = threading.Lock()
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def backend(cls):
+        return caches[settings.CATALOG_CACHE]
+
+    @classmethod
+    def version(cls):
+        cache = cls.backend()
+        version = cache.get(cls.version_key)
+        if version is None:
+            cache.add(cls.version_key, 1, timeout=None)
+            version = cache.get(cls.version_key, 1)
+        return version
+
+    @classmethod
+    def bump(cls):
+        cache = cls.backend()
+        try:
+            cache.incr(cls.version_key)
+        except ValueError:
+            cache.add(cls.version_key, 1, timeout=None)
+        # deletions leave no updated_at behind; Last-Modified uses this instead
+        cache.set(cls.changed_key, timezone.now(), timeout=None)
+
+    @classmethod
+    def key(cls, request, latest=None):
+        renderer = getattr(request, 'accepted_media_type', '')
+        query = urlencode(sorted(request.GET.lists()), doseq=True)
+        raw = f'{request.get_host()}{request.path}?{query}|{renderer}|{latest}'
+        return f'v{cls.version()}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+    @classmethod
+    def validators(cls, request, model):
+        """
+        ``(cache key, ETag, Last-Modified)`` for a read of ``model``: one
+        indexed ``MAX(updated_at)`` query, no serialization.
+        """
+        latest = model.objects.aggregate(latest=Max('updated_at'))['latest']
+        changed_at = cls.backend().get(cls.changed_key)
+        last_modified = max([dt for dt in (latest, changed_at) if dt is not None], default=None)
+        key = cls.key(request, latest and latest.isoformat())
+        return key, '"{}"'.format(key.replace(':', '-')), last_modified
+
+    @classmethod
+    def _count(cls, hit):
+        with cls._lock:
+            if hit:
+                cls.hits += 1
+            else:
+                cls.misses += 1
+
+    @classmethod
+    def read_through(cls, request, render, key=None):
+        cache = cls.backend()
+        key = key or cls.key(request)
+        data = cache.get(key)
+        if data is not None:
+            cls._count(hit=True)
+            return Response(data)
+        cls._count(hit=False)
+        response = render()
+        if response.status_code == 200:
+            cache.set(key, response.data)
+        return response
+
+    @classmethod
+    def stats(cls):
+        total = cls.hits + cls.misses
+        return {
+            'version': cls.version(),
+            'hits': cls.hits,
+            'misses': cls.misses,
+            'hit_ratio': round(cls.hits / total, 4) if total else None,
+        }
+
+
+class CachedReadMixin:
+    """
+    Serve ``list``/``retrieve`` through CatalogCache, with ETag/Last-Modified
+    validators: a matching If-None-Match/If-Modified-Since gets a 304 before
+    anything is fetched or serialized. ``cache_control`` goes out as
+    Cache-Control on 200s and 304s.
+    """
+    cache_control = {'public': True, 'max_age': settings.CATALOG_HTTP_MAX_AGE}
+
+    def conditional_read(self, request, render):
+        key, etag, last_modified = CatalogCache.validators(request, self.get_queryset().model)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = CatalogCache.read_through(request, render, key)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp:
+                response['Last-Modified'] = http_date(timestamp)
+            patch_cache_control(response, **self.cache_control)
+            patch_vary_headers(response, ('Accept',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_read(request, lambda: super(CachedReadMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_read(request, lambda: super(CachedReadMixin, self).retrieve(request, *args, **kwargs))
@@ -0,0 +1,67 @@
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from products.models import Product, StockReservation
+from products.services.hot_stock_service import HotStockService
+from products.services.inventory_service import InventoryService
+
+
+class Command(BaseCommand):
+    help = (
+        'Load benchmark: concurrent reservations against one product, first on the '
+        'product row, then with hot-SKU sharding. Meaningful on PostgreSQL + Redis.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservations', type=int, default=2000)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--shards', type=int, default=8)
+
+    def handle(self, *args, **options):
+        product = Product.objects.create(name='bench: hot sku', price=1, stock=options['reservations'] * 2)
+        results = {}
+        try:
+            for mode in ('row', 'sharded'):
+                if mode == 'sharded':
+                    try:
+                        HotStockService.enable(product, options['shards'])
+                    except ImproperlyConfigured as exc:
+                        raise CommandError(str(exc))
+                results[mode] = self.run(product.pk, options['reservations'], options['threads'])
+                HotStockService.disable(product)
+        finally:
+            StockReservation.objects.filter(product=product).delete()
+            product.delete()
+        results['speedup'] = round(results['sharded']['per_second'] / max(results['row']['per_second'], 1e-9), 2)
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run(self, pk, reservations, threads):
+        def worker(count):
+            ok = failed = 0
+            try:
+                for _ in range(count):
+                    try:
+                        InventoryService.reserve(uuid.uuid4(), {pk: 1})
+                        ok += 1
+                    except Exception:
+                        failed += 1
+            finally:
+                connection.close()
+            return ok, failed
+
+        per_thread = [reservations // threads + (1 if i < reservations % threads else 0) for i in range(threads)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            outcomes = list(pool.map(worker, per_thread))
+        elapsed = time.perf_counter() - start
+        ok = sum(o for o, _ in outcomes)
+        return {
+            'reservations': ok,
+            'errors': sum(f for _, f in outcomes),
+            'seconds': round(elapsed, 3),
+            'per_second': round(ok / elapsed, 1),
+        }
@@ -0,0 +1,66 @@
+import json
+import time
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from products.models import Category, Product
+from products.serializers import ProductRowSerializer, ProductSerializer
+
+BENCH_CATEGORY = 'bench-serializer'
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark: per-item cost of ProductSerializer vs ProductRowSerializer on list pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000, help='Products serialized per round.')
+        parser.add_argument('--rounds', type=int, default=20)
+
+    def handle(self, *args, **options):
+        category = Category.objects.create(name=BENCH_CATEGORY)
+        Product.objects.bulk_create([
+            Product(name=f'bench product {i}', description='x' * 200, price=f'{i % 500}.99', stock=i,
+                    category=category, image=f'products/{i}.jpg' if i % 2 else '')
+            for i in range(options['items'])
+        ])
+        request = RequestFactory().get('/api/products/')
+        queryset = Product.objects.filter(category=category).select_related('category').order_by('-created_at')
+        try:
+            row_serializer = ProductRowSerializer(request)
+            instances, rows = list(queryset), list(row_serializer.rows(queryset))
+            paths = {
+                'serializer': {
+                    'serialize': lambda: ProductSerializer(instances, many=True, context={'request': request}).data,
+                    'fetch_and_serialize': lambda: ProductSerializer(
+                        list(queryset.all()), many=True, context={'request': request}).data,
+                },
+                'rows': {
+                    'serialize': lambda: ProductRowSerializer(request).many(rows),
+                    'fetch_and_serialize': lambda: ProductRowSerializer(request).many(
+                        list(row_serializer.rows(queryset.all()))),
+                },
+            }
+            results = {'items': options['items']}
+            for path, stages in paths.items():
+                results[path] = {
+                    f'{stage}_us_per_item': self.per_item(run, options['items'], options['rounds'])
+                    for stage, run in stages.items()
+                }
+            results['speedup_serialize'] = round(
+                results['serializer']['serialize_us_per_item'] / results['rows']['serialize_us_per_item'], 1)
+            results['speedup_fetch_and_serialize'] = round(
+                results['serializer']['fetch_and_serialize_us_per_item']
+                / results['rows']['fetch_and_serialize_us_per_item'], 1)
+        finally:
+            Product.objects.filter(category=category).delete()
+            category.delete()
+        self.stdout.write(json.dumps(results, indent=2))
+
+    @staticmethod
+    def per_item(run, items, rounds):
+        run()  # warm up
+        best = float('inf')
+        for _ in range(rounds):
+            started = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - started)
+        return round(best / items * 1e6, 2)
@@ -0,0 +1,85 @@
+import json
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from core.utils import percentiles
+from products.models import Category, Product
+from products.search import ProductSearch
+
+SYLLABLES = [c + v for c in 'bcdfghjklmnprstvwz' for v in 'aeiou']
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))))
+    return sorted(words)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark product search: the old icontains filter vs the full-text index, '
+        'over a synthetic catalog (seeded into the "bench-search" category).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic products afterwards.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = vocabulary(20000, rng)
+        # Zipf-like: a few words are very common, most are rare
+        weights = [1 / (rank + 1) for rank in range(len(words))]
+        category, _ = Category.objects.get_or_create(name='bench-search')
+        self.seed(category, options['products'], options['batch_size'], words, weights, rng)
+
+        terms = [rng.choice(words[:50]) for _ in range(options['queries'] // 3)]
+        terms += [rng.choice(words[1000:]) for _ in range(options['queries'] // 3)]
+        terms += [rng.choice(words)[:4] for _ in range(options['queries'] - len(terms))]  # typing prefixes
+        results = {
+            'products': Product.objects.filter(category=category).count(),
+            'icontains': self.measure(terms, lambda t: Product.objects.filter(Q(name__icontains=t) | Q(description__icontains=t)).order_by('-created_at')),
+            'fulltext': self.measure(terms, lambda t: ProductSearch.search(Product.objects.all(), t)),
+        }
+        results['speedup_p50'] = round(results['icontains']['p50_ms'] / max(results['fulltext']['p50_ms'], 1e-6), 1)
+        if not options['keep']:
+            Product.objects.filter(category=category).delete()
+            category.delete()
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def seed(self, category, target, batch_size, words, weights, rng):
+        existing = Product.objects.filter(category=category).count()
+        for start in range(existing, target, batch_size):
+            batch = []
+            for _ in range(min(batch_size, target - start)):
+                batch.append(Product(
+                    name=' '.join(rng.choices(words, weights, k=3)).title(),
+                    description=' '.join(rng.choices(words, weights, k=30)),
+                    price=rng.randint(100, 100000) / 100,
+                    stock=rng.randint(0, 500),
+                    category=category,
+                ))
+            Product.objects.bulk_create(batch, batch_size=batch_size)
+            self.stderr.write(f'seeded {start + len(batch)}/{target}')
+
+    def measure(self, terms, build):
+        timings = []
+        for term in terms:
+            start = time.perf_counter()
+            queryset = build(term)
+            queryset.count()
+            list(queryset[:12])  # first page, as the list endpoint does
+            timings.append((time.perf_counter() - start) * 1000)
+        pct = percentiles(timings, (50, 95))
+        return {
+            'queries': len(timings),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'p50_ms': round(pct['p50'], 2),
+            'p95_ms': round(pct['p95'], 2),
+        }
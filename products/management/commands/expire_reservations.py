@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from products.services.inventory_service import InventoryService
+
+
+class Command(BaseCommand):
+    help = 'Return stock held by expired reservations (run from cron every minute or so).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expired = InventoryService.expire_stale(batch_size=options['batch_size'])
+        self.stdout.write(f'Expired {expired} reservations')
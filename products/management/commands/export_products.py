@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from products.services.feed_service import ProductFeedService
+
+
+class Command(BaseCommand):
+    help = 'Write the whole catalog as a CSV or JSONL feed that import_products reads back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--output', default='-', help='File to write (default: stdout).')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows fetched per query.')
+
+    def handle(self, *args, **options):
+        chunks = ProductFeedService.export(options['format'], options['chunk_size'])
+        if options['output'] == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', newline='') as out:
+            out.writelines(chunks)
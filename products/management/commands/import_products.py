@@ -0,0 +1,43 @@
+import json
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from products.services.feed_service import FeedError, ImportReport, ProductFeedService, feed_format
+
+
+class Command(BaseCommand):
+    help = (
+        'Create/update products from a CSV or JSONL feed (columns: id, name, description, price, stock, '
+        'category_id or category). Rows are streamed and written in batches; invalid rows are reported '
+        'and skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Feed file, or - for stdin (needs --format).')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Default: from the file extension.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only.')
+        parser.add_argument('--errors', default=None, help='Write every row error to this JSONL file.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path == '-' and not options['format']:
+            raise CommandError('--format is required when reading stdin.')
+        errors = open(options['errors'], 'w') if options['errors'] else None
+        # with an error file every error goes there; otherwise the summary lists the first few
+        report = ImportReport(
+            keep=0 if errors else 20,
+            on_error=(lambda entry: errors.write(json.dumps(entry) + '\n')) if errors else None,
+        )
+        try:
+            fmt = options['format'] or feed_format(path)
+            if path == '-':
+                ProductFeedService.import_feed(sys.stdin, fmt, options['batch_size'], options['dry_run'], report)
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as stream:
+                    ProductFeedService.import_feed(stream, fmt, options['batch_size'], options['dry_run'], report)
+        except (FeedError, OSError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc))
+        finally:
+            if errors:
+                errors.close()
+        self.stdout.write(json.dumps({**report.as_dict(), 'dry_run': options['dry_run']}, indent=2))
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from products.services.hot_stock_service import HotStockService
+
+
+class Command(BaseCommand):
+    help = 'Flush units consumed from hot-SKU stock shards back to Product.stock.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help='Keep running, flushing every N seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = HotStockService.flush()
+            if flushed or not options['interval']:
+                self.stdout.write(f'Flushed {sum(flushed.values())} units for {len(flushed)} products')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
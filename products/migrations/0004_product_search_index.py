@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+#
+# Full-text index for product search (see products/search.py):
+#   - SQLite: FTS5 table kept in sync with products_product by triggers.
+#   - PostgreSQL: GIN index on the same tsvector expression the search uses.
+# Other backends keep the icontains fallback and need no schema.
+
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE products_product_fts USING fts5("
+    " product_id UNINDEXED, name, description, tokenize = 'porter unicode61', prefix = '2 3 4')",
+    # FTS rowids are ours; this maps each product to its FTS row for updates/deletes
+    "CREATE TABLE products_product_fts_map ("
+    " product_id char(32) NOT NULL PRIMARY KEY, docid integer NOT NULL)",
+    "CREATE TRIGGER products_product_fts_ai AFTER INSERT ON products_product BEGIN"
+    " INSERT INTO products_product_fts (product_id, name, description) VALUES (new.id, new.name, new.description);"
+    " INSERT INTO products_product_fts_map (product_id, docid) VALUES (new.id, last_insert_rowid());"
+    " END",
+    "CREATE TRIGGER products_product_fts_au AFTER UPDATE OF name, description ON products_product BEGIN"
+    " UPDATE products_product_fts SET name = new.name, description = new.description"
+    " WHERE rowid = (SELECT docid FROM products_product_fts_map WHERE product_id = old.id);"
+    " END",
+    "CREATE TRIGGER products_product_fts_ad AFTER DELETE ON products_product BEGIN"
+    " DELETE FROM products_product_fts"
+    " WHERE rowid = (SELECT docid FROM products_product_fts_map WHERE product_id = old.id);"
+    " DELETE FROM products_product_fts_map WHERE product_id = old.id;"
+    " END",
+    "INSERT INTO products_product_fts (rowid, product_id, name, description)"
+    " SELECT rowid, id, name, description FROM products_product",
+    "INSERT INTO products_product_fts_map (product_id, docid) SELECT id, rowid FROM products_product",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS products_product_fts_ai",
+    "DROP TRIGGER IF EXISTS products_product_fts_au",
+    "DROP TRIGGER IF EXISTS products_product_fts_ad",
+    "DROP TABLE IF EXISTS products_product_fts_map",
+    "DROP TABLE IF EXISTS products_product_fts",
+]
+
+POSTGRES_INDEX = 'products_product_search_gin'
+
+
+def postgres_index():
+    from django.contrib.postgres.indexes import GinIndex
+    return GinIndex(SearchVector('name', 'description', config='english'), name=POSTGRES_INDEX)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_FORWARD:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('products', 'Product'), postgres_index())
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_BACKWARD:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('products', 'Product'), postgres_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_hot_stock_shards'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# AddField rebuilds products_product on SQLite, which drops the full-text
+# triggers from 0004_product_search_index; put them back.
+SQLITE_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS products_product_fts_ai",
+    "DROP TRIGGER IF EXISTS products_product_fts_au",
+    "DROP TRIGGER IF EXISTS products_product_fts_ad",
+    "CREATE TRIGGER products_product_fts_ai AFTER INSERT ON products_product BEGIN"
+    " INSERT INTO products_product_fts (product_id, name, description) VALUES (new.id, new.name, new.description);"
+    " INSERT INTO products_product_fts_map (product_id, docid) VALUES (new.id, last_insert_rowid());"
+    " END",
+    "CREATE TRIGGER products_product_fts_au AFTER UPDATE OF name, description ON products_product BEGIN"
+    " UPDATE products_product_fts SET name = new.name, description = new.description"
+    " WHERE rowid = (SELECT docid FROM products_product_fts_map WHERE product_id = old.id);"
+    " END",
+    "CREATE TRIGGER products_product_fts_ad AFTER DELETE ON products_product BEGIN"
+    " DELETE FROM products_product_fts"
+    " WHERE rowid = (SELECT docid FROM products_product_fts_map WHERE product_id = old.id);"
+    " DELETE FROM products_product_fts_map WHERE product_id = old.id;"
+    " END",
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_listing_indexes'),
+    ]
+
+    operations = [
+        # reversed last: the RemoveFields below rebuild the table again
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
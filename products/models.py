@@ -6,6 +6,7 @@ from django.conf import settings
 class Category(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=120)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -19,6 +20,44 @@ class Product(models.Model):
     category = models.ForeignKey(Category, related_name='products', on_delete=models.SET_NULL, null=True, blank=True)
     image = models.ImageField(upload_to='products/', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # also set by queryset updates of stock (InventoryService); MAX() of it validates catalog responses
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # >0 while the product is in hot-SKU mode (see HotStockService)
+    hot_stock_shards = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'price', 'id']),
+            # default listing order and its keyset tiebreaker (see KeysetPagination)
+            models.Index(fields=['-created_at', '-id']),
+        ]
 
     def __str__(self):
         return self.name
+
+class StockReservation(models.Model):
+    """Units held back from ``Product.stock`` for an unpaid order."""
+    STATUS_CHOICES = [
+        ('HELD','Held'),
+        ('COMMITTED','Committed'),
+        ('RELEASED','Released'),
+        ('EXPIRED','Expired'),
+    ]
+    id = models.AutoField(primary_key=True)
+    order_id = models.UUIDField(db_index=True)
+    product = models.ForeignKey(Product, related_name='reservations', on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='HELD')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # taken from hot-SKU shards and not yet subtracted from Product.stock (HotStockService.flush)
+    stock_pending = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+            models.Index(fields=['stock_pending'], condition=models.Q(stock_pending=True), name='reservation_stock_pending'),
+        ]
+
+    def __str__(self):
+        return f'{self.quantity} x {self.product_id} ({self.status})'
@@ -0,0 +1,103 @@
+# File: products/search.py
+# Full-text product search. Uses the index created by migration 0004:
+# FTS5 on SQLite, a tsvector GIN index on PostgreSQL, icontains elsewhere.
+# The SQLite index is maintained by triggers on products_product; migrations
+# that rebuild that table on SQLite must recreate them (see 0006).
+import re
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+from rest_framework.filters import BaseFilterBackend
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts5_query(text):
+    """Turn user input into an FTS5 query: AND of quoted terms, last one a prefix."""
+    tokens = TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class ProductSearch:
+
+    @staticmethod
+    def _sqlite(queryset, text, limit):
+        match = fts5_query(text)
+        if match is None:
+            return queryset.none()
+        sql, params = 'products_product_fts MATCH %s', [match]
+        if queryset.query.where:
+            # filters narrow the matches before the LIMIT, or top-ranked rows they drop crowd out the rest
+            pk_sql, pk_params = queryset.order_by().values('pk').query.get_compiler(queryset.db).as_sql()
+            sql, params = f'{sql} AND product_id IN ({pk_sql})', params + list(pk_params)
+        with connections[queryset.db].cursor() as cursor:
+            # bm25 weights: a hit in name counts 10x a hit in description
+            cursor.execute(
+                f'SELECT product_id FROM products_product_fts WHERE {sql}'
+                ' ORDER BY bm25(products_product_fts, 0.0, 10.0, 1.0) LIMIT %s',
+                params + [limit],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return queryset.none()
+        # rows come back as the stored char(32) hex; Case/When positions keep the relevance order
+        pk_field = queryset.model._meta.pk
+        ids = [pk_field.to_python(pk) for pk in ids]
+        rank = Case(*[When(pk=pk, then=Value(i)) for i, pk in enumerate(ids)], output_field=IntegerField())
+        return queryset.filter(pk__in=ids).annotate(search_rank=rank).order_by('search_rank')
+
+    @staticmethod
+    def _postgres(queryset, text, limit):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+        vector = SearchVector('name', 'description', config='english')
+        query = SearchQuery(text, search_type='websearch', config='english')
+        ranked = (
+            queryset.annotate(search_vector=vector)
+            .filter(search_vector=query)
+            .annotate(search_rank=SearchRank(vector, query))
+            .order_by('-search_rank')
+        )
+        # a subquery rather than a slice: pagination and ordering still filter the result
+        return ranked.filter(pk__in=ranked.order_by('-search_rank', 'pk').values('pk')[:limit])
+
+    @staticmethod
+    def search(queryset, text, limit=None):
+        """Filter ``queryset`` to products matching ``text``, most relevant first."""
+        limit = limit or settings.PRODUCT_SEARCH_MAX_RESULTS
+        vendor = connections[queryset.db].vendor
+        if vendor == 'sqlite':
+            return ProductSearch._sqlite(queryset, text, limit)
+        if vendor == 'postgresql':
+            return ProductSearch._postgres(queryset, text, limit)
+        return queryset.filter(Q(name__icontains=text) | Q(description__icontains=text))
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """``?q=`` full-text search ranked by relevance (``?search=`` is accepted as an alias)."""
+    search_params = ('q', 'search')
+
+    def get_search_text(self, request):
+        for param in self.search_params:
+            text = request.query_params.get(param, '').strip()
+            if text:
+                return text
+        return None
+
+    def filter_queryset(self, request, queryset, view):
+        text = self.get_search_text(request)
+        if text is None:
+            return queryset
+        return ProductSearch.search(queryset, text)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': 'q',
+            'required': False,
+            'in': 'query',
+            'description': 'Full-text search over name and description, ranked by relevance.',
+            'schema': {'type': 'string'},
+        }]
@@ -0,0 +1,282 @@
+import csv
+import io
+import json
+import uuid
+from collections import defaultdict
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from products.models import Category, Product
+from products.signals import bump_catalog_cache_version
+
+# model fields a feed row may set; the category comes as category_id or a category name
+FIELDS = ('name', 'description', 'price', 'stock')
+COLUMNS = ('id',) + FIELDS + ('category_id', 'category')
+REQUIRED = ('name', 'price')
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+class FeedError(ValueError):
+    """The feed as a whole can't be read (format, header)."""
+
+
+def feed_format(name):
+    """'csv' or 'jsonl' from a format name or a file name."""
+    extension = name.rsplit('.', 1)[-1].lower()
+    extension = 'jsonl' if extension in ('ndjson', 'json') else extension
+    if extension not in FORMATS:
+        raise FeedError(f'Unsupported feed format {name!r}; use .csv or .jsonl.')
+    return extension
+
+
+def read_csv(stream):
+    reader = csv.DictReader(stream)
+    unknown = set(reader.fieldnames or ()) - set(COLUMNS)
+    if not reader.fieldnames or unknown:
+        raise FeedError(f'CSV columns must be among {", ".join(COLUMNS)}; got {", ".join(reader.fieldnames or ())}.')
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(stream):
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, f'Invalid JSON: {exc}'
+            continue
+        yield number, row if isinstance(row, dict) else 'Each line must be a JSON object.'
+
+
+def read_feed(stream, fmt):
+    """``(line, row)`` pairs read incrementally; ``row`` is an error message for unreadable lines."""
+    return read_csv(stream) if fmt == 'csv' else read_jsonl(stream)
+
+
+class ImportReport:
+    """Counts plus per-row errors; only the first ``keep`` errors are held, ``on_error`` sees all."""
+
+    def __init__(self, keep=None, on_error=None):
+        self.keep = settings.PRODUCT_IMPORT_MAX_ERRORS if keep is None else keep
+        self.on_error = on_error
+        self.rows = self.created = self.updated = self.failed = 0
+        self.errors = []
+
+    def error(self, line, row_id, errors):
+        self.failed += 1
+        entry = {'line': line, 'id': row_id, 'errors': errors}
+        if len(self.errors) < self.keep:
+            self.errors.append(entry)
+        if self.on_error:
+            self.on_error(entry)
+
+    def as_dict(self):
+        return {
+            'rows': self.rows, 'created': self.created, 'updated': self.updated, 'failed': self.failed,
+            'errors': self.errors, 'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+class FeedRow:
+    __slots__ = ('line', 'raw_id', 'pk', 'values', 'category', 'errors')
+
+    def __init__(self, line, row):
+        self.line = line
+        self.raw_id = row.get('id') or None
+        self.pk = None
+        self.values = {}
+        self.category = None  # ('id', 3) / ('name', 'Lamps') / ('none', None)
+        self.errors = {}
+        unknown = set(row) - set(COLUMNS)
+        if unknown:
+            self.errors['non_field_errors'] = [f'Unknown field(s): {", ".join(sorted(unknown))}.']
+        if self.raw_id:
+            self.pk = self.clean('id', self.raw_id)
+        for name in FIELDS:
+            if name in row:
+                value = row[name]
+                if name == 'description' and value is None:
+                    value = ''
+                self.values[name] = self.clean(name, value)
+        if 'category_id' in row or 'category' in row:
+            self.category = self.category_ref(row)
+
+    def clean(self, name, value):
+        try:
+            return Product._meta.get_field(name).clean(value, None)
+        except ValidationError as exc:
+            self.errors[name] = exc.messages
+
+    def category_ref(self, row):
+        if 'category_id' in row:
+            if row['category_id'] in ('', None):
+                return ('none', None)
+            try:
+                return ('id', Category._meta.pk.to_python(row['category_id']))
+            except ValidationError as exc:
+                self.errors['category_id'] = exc.messages
+                return None
+        name = (row['category'] or '').strip()
+        return ('name', name) if name else ('none', None)
+
+    @property
+    def fields(self):
+        """Model fields this row sets (and the ones a bulk write has to touch)."""
+        names = set(self.values)
+        if self.category:
+            names.add('category')
+        return tuple(sorted(names))
+
+
+class ProductFeedService:
+    """
+    Bulk product import/export for catalog feeds (CSV or JSONL, one product
+    per row/line, columns ``COLUMNS``). Imports are read incrementally and
+    written ``PRODUCT_IMPORT_BATCH_SIZE`` rows at a time, one transaction
+    per batch, so memory and lock time stay bounded whatever the feed size.
+    A row with an ``id`` of an existing product updates only the columns it
+    carries; any other row creates a product and needs ``name`` and
+    ``price``. Rows that fail validation are reported and skipped.
+    Rows with ``name`` and ``price`` are written with one upsert per batch;
+    updates without them go through ``bulk_update``.
+    """
+
+    @classmethod
+    def import_feed(cls, stream, fmt, batch_size=None, dry_run=False, report=None):
+        batch_size = batch_size or settings.PRODUCT_IMPORT_BATCH_SIZE
+        report = report or ImportReport()
+        batch = []
+        for line, row in read_feed(stream, fmt):
+            report.rows += 1
+            if isinstance(row, str):
+                report.error(line, None, {'non_field_errors': [row]})
+                continue
+            feed_row = FeedRow(line, row)
+            if feed_row.errors:
+                report.error(line, feed_row.raw_id, feed_row.errors)
+                continue
+            batch.append(feed_row)
+            if len(batch) >= batch_size:
+                cls.write_batch(batch, report, dry_run)
+                batch = []
+        if batch:
+            cls.write_batch(batch, report, dry_run)
+        if not dry_run and (report.created or report.updated):
+            # bulk writes send no post_save
+            bump_catalog_cache_version(Product)
+        return report
+
+    @classmethod
+    def write_batch(cls, batch, report, dry_run):
+        # a later row for the same product wins
+        latest = {}
+        for feed_row in batch:
+            if feed_row.pk is not None:
+                previous = latest.get(feed_row.pk)
+                if previous is not None:
+                    report.error(previous.line, previous.raw_id, {'id': [f'Superseded by line {feed_row.line}.']})
+                latest[feed_row.pk] = feed_row
+        batch = [row for row in batch if row.pk is None or latest[row.pk] is row]
+
+        category_ids, category_names = cls.resolve_categories(batch)
+        existing = dict(
+            Product.objects.filter(pk__in=[row.pk for row in batch if row.pk is not None])
+            .values_list('pk', 'hot_stock_shards')
+        )
+        now = timezone.now()
+        upserts, updates = defaultdict(list), defaultdict(list)
+        created = updated = 0
+        for row in batch:
+            values = dict(row.values)
+            if row.category:
+                kind, value = row.category
+                if kind == 'id' and value not in category_ids:
+                    report.error(row.line, row.raw_id, {'category_id': [f'Invalid pk "{value}" - object does not exist.']})
+                    continue
+                if kind == 'name' and value not in category_names:
+                    report.error(row.line, row.raw_id, {'category': [f'No category named "{value}".']})
+                    continue
+                values['category_id'] = category_names[value] if kind == 'name' else value
+            exists = row.pk in existing
+            if exists and 'stock' in values and existing[row.pk]:
+                report.error(row.line, row.raw_id, {'stock': ['Product is in hot-SKU mode; disable it before changing stock.']})
+                continue
+            complete = all(name in values for name in REQUIRED)
+            if not exists and not complete:
+                report.error(row.line, row.raw_id, {name: ['This field is required.'] for name in REQUIRED if name not in values})
+                continue
+            if complete:
+                # insertable as is: one INSERT .. ON CONFLICT DO UPDATE of the given columns
+                # serves new and existing products alike (and products created meanwhile)
+                upserts[row.fields].append((row, Product(pk=row.pk or uuid.uuid4(), **values)))
+            else:
+                updates[row.fields].append((row, Product(pk=row.pk, updated_at=now, **values)))
+            updated += exists
+            created += not exists
+
+        if not dry_run:
+            try:
+                with transaction.atomic():
+                    for fields, group in upserts.items():
+                        Product.objects.bulk_create(
+                            [product for _, product in group],
+                            update_conflicts=True, unique_fields=['id'], update_fields=[*fields, 'updated_at'],
+                        )
+                    for fields, group in updates.items():
+                        # partial rows can't be INSERTed (NOT NULL name/price); CASE WHEN per column
+                        Product.objects.bulk_update([product for _, product in group], [*fields, 'updated_at'])
+            except DatabaseError as exc:
+                for group in (*upserts.values(), *updates.values()):
+                    for row, _ in group:
+                        report.error(row.line, row.raw_id, {'non_field_errors': [f'Batch failed: {exc}']})
+                return
+        report.created += created
+        report.updated += updated
+
+    @staticmethod
+    def resolve_categories(batch):
+        refs = [row.category for row in batch if row.category]
+        ids = {value for kind, value in refs if kind == 'id'}
+        names = {value for kind, value in refs if kind == 'name'}
+        category_ids = set(Category.objects.filter(pk__in=ids).values_list('pk', flat=True)) if ids else set()
+        category_names = {}
+        if names:
+            # duplicate names: the oldest category wins
+            for pk, name in Category.objects.filter(name__in=names).order_by('-pk').values_list('pk', 'name'):
+                category_names[name] = pk
+        return category_ids, category_names
+
+    @staticmethod
+    def export(fmt, chunk_size=None):
+        """
+        The whole catalog as feed text, yielded ``chunk_size`` rows at a time
+        from a server-side iterator: memory use doesn't grow with the catalog.
+        The output imports back unchanged.
+        """
+        chunk_size = chunk_size or settings.PRODUCT_EXPORT_CHUNK_SIZE
+        rows = (
+            Product.objects.order_by('pk')
+            .values_list('id', 'name', 'description', 'price', 'stock', 'category_id', 'category__name')
+            .iterator(chunk_size=chunk_size)
+        )
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(COLUMNS)
+        for count, (pk, name, description, price, stock, category_id, category) in enumerate(rows, start=1):
+            if writer:
+                writer.writerow((pk, name, description, f'{price:f}', stock, category_id or '', category or ''))
+            else:
+                buffer.write(json.dumps({
+                    'id': str(pk), 'name': name, 'description': description, 'price': f'{price:f}',
+                    'stock': stock, 'category_id': category_id, 'category': category,
+                }) + '\n')
+            if count % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
@@ -0,0 +1,132 @@
+import random
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from core.utils import process_local
+from products.models import Product, StockReservation
+
+
+def _cache():
+    return caches[settings.HOT_STOCK_CACHE]
+
+
+class HotStockService:
+    """
+    Opt-in "hot SKU" mode for flash sales.
+
+    A hot product's available stock is split across N cache counters
+    (``hotstock:<pk>:<i>``) that checkouts decrement instead of the product
+    row, so concurrent reservations don't serialize on one row lock. The
+    reservation rows taken from the shards are marked ``stock_pending`` and
+    ``flush()`` (run by ``reconcile_hot_stock``) subtracts them from
+    ``Product.stock`` in one UPDATE, so consumption survives a cache loss.
+    Whether a product is hot is ``Product.hot_stock_shards``; the shards need
+    a cache shared by every process (HOT_STOCK_CACHE).
+
+    Stock edits made while a product is hot are not seen by the shards:
+    disable, edit, then enable again.
+    """
+    prefix = 'hotstock'
+
+    @classmethod
+    def _shard_key(cls, pk, index):
+        return f'{cls.prefix}:{pk}:{index}'
+
+    @classmethod
+    def enable(cls, product, shards=None):
+        cache = _cache()
+        if process_local(cache):
+            raise ImproperlyConfigured(
+                f'Hot-SKU mode needs a cache shared by all processes; HOT_STOCK_CACHE '
+                f'({settings.HOT_STOCK_CACHE!r}) is {type(cache).__name__}.'
+            )
+        shards = shards or product.hot_stock_shards or settings.HOT_STOCK_DEFAULT_SHARDS
+        cls.disable(product)
+        with transaction.atomic():
+            # row reservations wait for the shards to be filled from the same stock
+            stock = Product.objects.select_for_update().values_list('stock', flat=True).get(pk=product.pk)
+            base, extra = divmod(stock, shards)
+            cache.set_many(
+                {cls._shard_key(product.pk, i): base + (1 if i < extra else 0) for i in range(shards)}, timeout=None,
+            )
+            Product.objects.filter(pk=product.pk).update(hot_stock_shards=shards)
+        product.stock, product.hot_stock_shards = stock, shards
+
+    @classmethod
+    def disable(cls, product):
+        shards = Product.objects.filter(pk=product.pk).values_list('hot_stock_shards', flat=True).first()
+        Product.objects.filter(pk=product.pk).update(hot_stock_shards=0)
+        if shards:
+            cls.flush([product.pk])
+            _cache().delete_many([cls._shard_key(product.pk, i) for i in range(shards)])
+        product.hot_stock_shards = 0
+
+    @staticmethod
+    def shard_counts(pks):
+        """{pk: shard count} for the pks currently in hot mode."""
+        return dict(Product.objects.filter(pk__in=list(pks), hot_stock_shards__gt=0).values_list('pk', 'hot_stock_shards'))
+
+    @classmethod
+    def available(cls, pk, shards):
+        values = _cache().get_many([cls._shard_key(pk, i) for i in range(shards)])
+        return sum(max(value, 0) for value in values.values())
+
+    @classmethod
+    def take(cls, pk, qty, shards):
+        """Take ``qty`` units from the shards (spanning several if needed); False if short."""
+        cache = _cache()
+        start = random.randrange(shards)
+        taken, remaining = [], qty
+        for offset in range(shards):
+            key = cls._shard_key(pk, (start + offset) % shards)
+            try:
+                left = cache.decr(key, remaining)
+            except ValueError:
+                continue  # evicted shard: its units are lost to the sale, never oversold
+            got = remaining
+            if left < 0:
+                overdraw = min(-left, remaining)
+                cache.incr(key, overdraw)
+                got -= overdraw
+            if got:
+                taken.append((key, got))
+                remaining -= got
+            if not remaining:
+                return True
+        for key, got in taken:
+            cache.incr(key, got)
+        return False
+
+    @classmethod
+    def give_back(cls, pk, qty, shards):
+        cache = _cache()
+        key = cls._shard_key(pk, random.randrange(shards))
+        try:
+            cache.incr(key, qty)
+        except ValueError:
+            if not cache.add(key, qty, timeout=None):
+                cache.incr(key, qty)
+
+    @staticmethod
+    def flush(pks=None):
+        """
+        Subtract units taken from the shards (``stock_pending`` reservations)
+        from ``Product.stock``; returns {pk: units flushed}.
+        """
+        from products.services.inventory_service import InventoryService
+        with transaction.atomic():
+            pending = StockReservation.objects.filter(stock_pending=True)
+            if pks is not None:
+                pending = pending.filter(product_id__in=list(pks))
+            if connection.features.has_select_for_update_skip_locked:
+                pending = pending.select_for_update(skip_locked=True)
+            rows = list(pending.values_list('id', 'product_id', 'quantity'))
+            consumed = Counter()
+            for _, product_id, quantity in rows:
+                consumed[product_id] += quantity
+            if rows:
+                InventoryService.restock({pk: -units for pk, units in consumed.items()})
+                StockReservation.objects.filter(id__in=[row[0] for row in rows]).update(stock_pending=False)
+        return dict(consumed)
@@ -1,7 +1,37 @@
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from products.models import Product
+from django.db import connection, transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+from django.utils import timezone
+from products.models import Product, StockReservation
+from products.services.hot_stock_service import HotStockService
+from products.signals import reservations_expired
+
+
+class InsufficientStock(ValidationError):
+    def __init__(self, shortages):
+        # shortages: {product_id: units currently available}
+        self.shortages = shortages
+        super().__init__(f"Insufficient stock for {len(shortages)} product(s)")
+
+
+def _stock_case(deltas):
+    return Case(
+        *[When(pk=pk, then=F('stock') + delta) for pk, delta in deltas.items()],
+        default=F('stock'),
+        output_field=PositiveIntegerField(),
+    )
+
 
 class InventoryService:
+    """
+    ``Product.stock`` is the number of units still available for sale. Checkout
+    moves units from it into HELD StockReservation rows; payment success
+    commits them, failure/cancellation/expiry puts them back.
+    """
 
     @staticmethod
     def check_stock(product: Product, qty: int):
@@ -10,14 +40,180 @@ class InventoryService:
 
     @staticmethod
     def reserve_stock(product: Product, qty: int):
-        InventoryService.check_stock(product, qty)
-        product.stock -= qty
-        product.save()
+        InventoryService.deduct_stock({product.pk: qty})
+        product.refresh_from_db(fields=['stock'])
 
     @staticmethod
     def release_stock(product: Product, qty: int):
-        product.stock += qty
-        product.save()
+        InventoryService.restock({product.pk: qty})
+        product.refresh_from_db(fields=['stock'])
+
+    @staticmethod
+    def deduct_stock(demand):
+        """
+        Decrement stock for ``{product_id: qty}`` in a single conditional
+        UPDATE. Either every product is decremented or none is and
+        InsufficientStock is raised with the currently available units.
+        """
+        if not demand:
+            return
+        condition = Q()
+        for pk, qty in demand.items():
+            condition |= Q(pk=pk, stock__gte=qty)
+        try:
+            with transaction.atomic():
+                updated = Product.objects.filter(condition).update(
+                    stock=_stock_case({pk: -qty for pk, qty in demand.items()}),
+                    updated_at=timezone.now(),
+                )
+                if updated != len(demand):
+                    raise InsufficientStock({})
+        except InsufficientStock:
+            available = dict(Product.objects.filter(pk__in=demand).values_list('pk', 'stock'))
+            raise InsufficientStock({
+                pk: available.get(pk, 0) for pk, qty in demand.items() if available.get(pk, 0) < qty
+            })
+
+    @staticmethod
+    def restock(supply):
+        """Add ``{product_id: qty}`` back to stock in one UPDATE."""
+        if supply:
+            Product.objects.filter(pk__in=supply).update(stock=_stock_case(supply), updated_at=timezone.now())
+
+    @staticmethod
+    def _take_hot(demand, hot):
+        taken, shortages = [], {}
+        for pk, shards in hot.items():
+            if HotStockService.take(pk, demand[pk], shards):
+                taken.append(pk)
+            else:
+                shortages[pk] = HotStockService.available(pk, shards)
+        if shortages:
+            InventoryService._give_back_hot({pk: demand[pk] for pk in taken}, hot)
+            raise InsufficientStock(shortages)
+        return taken
+
+    @staticmethod
+    def _give_back_hot(supply, hot):
+        for pk, qty in supply.items():
+            HotStockService.give_back(pk, qty, hot[pk])
+
+    @staticmethod
+    def reserve(order_id, demand, ttl=None, hot=None):
+        """
+        Take ``{product_id: qty}`` out of stock and hold it for ``order_id``.
+        Products in hot-SKU mode are taken from their cache shards instead of
+        the product row; callers that just loaded the products can pass
+        their ``{product_id: hot_stock_shards}`` as ``hot``.
+        """
+        ttl = ttl or settings.STOCK_RESERVATION_TTL
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+        hot = HotStockService.shard_counts(demand) if hot is None else {pk: n for pk, n in hot.items() if n}
+        InventoryService._take_hot(demand, hot)
+        try:
+            with transaction.atomic():
+                InventoryService.deduct_stock({pk: qty for pk, qty in demand.items() if pk not in hot})
+                StockReservation.objects.bulk_create([
+                    StockReservation(
+                        order_id=order_id, product_id=pk, quantity=qty, expires_at=expires_at, stock_pending=pk in hot,
+                    )
+                    for pk, qty in demand.items()
+                ])
+        except BaseException:
+            InventoryService._give_back_hot({pk: demand[pk] for pk in hot}, hot)
+            raise
+
+    @staticmethod
+    @contextmanager
+    def reserving(order_id, demand, ttl=None, hot=None):
+        """
+        reserve() and the caller's writes (the order itself) in one
+        transaction. Units taken from hot shards are cache writes a rollback
+        doesn't undo, so they are given back if the block or the commit fails.
+        """
+        hot = HotStockService.shard_counts(demand) if hot is None else {pk: n for pk, n in hot.items() if n}
+        reserved = False
+        try:
+            with transaction.atomic():
+                InventoryService.reserve(order_id, demand, ttl, hot)
+                reserved = True
+                yield
+        except BaseException:
+            # a failed reserve() has given its units back already
+            if reserved:
+                InventoryService._give_back_hot({pk: demand[pk] for pk in hot}, hot)
+            raise
+
+    @staticmethod
+    def commit(order_ids):
+        """Payment succeeded: the held units are sold. Returns rows committed."""
+        return StockReservation.objects.filter(order_id__in=order_ids, status='HELD').update(status='COMMITTED')
+
+    @staticmethod
+    def extend(order_ids, expires_at):
+        """Keep the live holds of ``order_ids`` until at least ``expires_at``; False if none is left."""
+        live = StockReservation.objects.filter(order_id__in=order_ids, status='HELD', expires_at__gt=timezone.now())
+        return bool(live.filter(expires_at__lt=expires_at).update(expires_at=expires_at)) or live.exists()
+
+    @staticmethod
+    def _return_held(reservations, status, current=('HELD',)):
+        with transaction.atomic():
+            held = reservations.filter(status__in=current)
+            if connection.features.has_select_for_update_skip_locked:
+                held = held.select_for_update(skip_locked=True, of=('self',))
+            rows = list(held.values_list(
+                'id', 'product_id', 'quantity', 'order_id', 'stock_pending', 'product__hot_stock_shards',
+            ))
+            if not rows:
+                return rows
+            # every returned unit goes back to the shards of a hot product; the product row
+            # only gets back units that were subtracted from it (not the still pending ones)
+            supply, restock, hot = Counter(), Counter(), {}
+            for _, product_id, quantity, _, pending, shards in rows:
+                supply[product_id] += quantity
+                if not pending:
+                    restock[product_id] += quantity
+                if shards:
+                    hot[product_id] = shards
+            hot_supply = {pk: supply[pk] for pk in hot}
+            transaction.on_commit(lambda: InventoryService._give_back_hot(hot_supply, hot))
+            InventoryService.restock(restock)
+            StockReservation.objects.filter(id__in=[row[0] for row in rows]).update(status=status, stock_pending=False)
+        return rows
+
+    @staticmethod
+    def release(order_ids):
+        """Payment failed or order cancelled. Returns rows released."""
+        reservations = StockReservation.objects.filter(order_id__in=order_ids)
+        return len(InventoryService._return_held(reservations, 'RELEASED'))
+
+    @staticmethod
+    def return_order(order_ids):
+        """
+        Orders deleted: their held and sold units go back to stock once.
+        Released or expired units already went back. Returns rows returned.
+        """
+        reservations = StockReservation.objects.filter(order_id__in=order_ids)
+        return len(InventoryService._return_held(reservations, 'RELEASED', ('HELD', 'COMMITTED')))
+
+    @staticmethod
+    def expire_stale(batch_size=1000, now=None):
+        """
+        Return stock held by reservations past ``expires_at``, ``batch_size``
+        rows per transaction. Sends ``reservations_expired`` for each batch.
+        """
+        now = now or timezone.now()
+        expired = 0
+        while True:
+            batch = StockReservation.objects.filter(
+                pk__in=StockReservation.objects.filter(status='HELD', expires_at__lte=now)
+                .order_by('expires_at').values('pk')[:batch_size]
+            )
+            rows = InventoryService._return_held(batch, 'EXPIRED')
+            if not rows:
+                return expired
+            expired += len(rows)
+            reservations_expired.send(sender=InventoryService, order_ids={row[3] for row in rows})
 
     @staticmethod
     def validate_cart_items(cart_items):
@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from .cache import CatalogCache
+from .models import Category, Product
+
+# sent by InventoryService.expire_stale with order_ids=set of UUIDs
+reservations_expired = Signal()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalog_cache_version(sender, **kwargs):
+    CatalogCache.bump()
+    transaction.on_commit(queue_catalog_warming)
+
+
+def queue_catalog_warming():
+    from .tasks import warm_catalog_cache  # products.tasks -> InventoryService imports this module
+    # debounced: a burst of edits re-renders the pages once
+    warm_catalog_cache.enqueue(countdown=2, dedupe_key='products.warm_catalog_cache')
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.test import RequestFactory
+from django.urls import resolve
+from taskqueue.registry import task
+from .services.inventory_service import InventoryService
+
+
+@task
+def expire_reservations(batch_size=1000):
+    """Periodic (TASK_SCHEDULE): give back stock held by unpaid orders past their TTL."""
+    return InventoryService.expire_stale(batch_size=batch_size)
+
+
+@task(max_attempts=1)
+def warm_catalog_cache():
+    """Render CATALOG_WARM_PATHS once so the first visitors after a catalog change hit the cache."""
+    factory = RequestFactory(HTTP_HOST=settings.CATALOG_WARM_HOST, HTTP_ACCEPT='application/json')
+    for path in settings.CATALOG_WARM_PATHS:
+        match = resolve(path)
+        match.func(factory.get(path), *match.args, **match.kwargs).render()
@@ -1,3 +1,561 @@
+import base64
+import csv
+import io
+import json
+import os
+import tempfile
+import uuid
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlencode, urlsplit
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from core.testing import QueryBudgetMixin
+from users.models import User
+from .cache import CatalogCache
+from .models import Category, Product, StockReservation
+from .serializers import ProductRowSerializer, ProductSerializer
+from .services.hot_stock_service import HotStockService
+from .services.inventory_service import InsufficientStock, InventoryService
 
-# Create your tests here.
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        self.a = Product.objects.create(name='A', price='1.00', stock=10)
+        self.b = Product.objects.create(name='B', price='1.00', stock=3)
+
+    def stock(self, product):
+        return Product.objects.get(pk=product.pk).stock
+
+    def test_reserve_holds_stock_until_commit(self):
+        order_id = uuid.uuid4()
+        InventoryService.reserve(order_id, {self.a.pk: 4, self.b.pk: 3})
+        self.assertEqual((self.stock(self.a), self.stock(self.b)), (6, 0))
+        self.assertEqual(InventoryService.commit([order_id]), 2)
+        self.assertEqual(InventoryService.release([order_id]), 0)
+        self.assertEqual(self.stock(self.a), 6)
+
+    def test_reserve_is_all_or_nothing(self):
+        with self.assertRaises(InsufficientStock) as ctx:
+            InventoryService.reserve(uuid.uuid4(), {self.a.pk: 4, self.b.pk: 4})
+        self.assertEqual(ctx.exception.shortages, {self.b.pk: 3})
+        self.assertEqual(self.stock(self.a), 10)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_release_returns_stock_once(self):
+        order_id = uuid.uuid4()
+        InventoryService.reserve(order_id, {self.a.pk: 4})
+        self.assertEqual(InventoryService.release([order_id]), 1)
+        self.assertEqual(InventoryService.release([order_id]), 0)
+        self.assertEqual(self.stock(self.a), 10)
+
+    def test_sweeper_expires_stale_holds_in_batches(self):
+        stale, fresh = uuid.uuid4(), uuid.uuid4()
+        InventoryService.reserve(stale, {self.a.pk: 2, self.b.pk: 1})
+        InventoryService.reserve(fresh, {self.a.pk: 1})
+        StockReservation.objects.filter(order_id=stale).update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command('expire_reservations', batch_size=1, stdout=io.StringIO())
+        self.assertEqual((self.stock(self.a), self.stock(self.b)), (9, 3))
+        self.assertEqual(StockReservation.objects.filter(order_id=stale, status='EXPIRED').count(), 2)
+        self.assertEqual(StockReservation.objects.get(order_id=fresh).status, 'HELD')
+
+
+class HotStockTests(TestCase):
+    def setUp(self):
+        caches[settings.HOT_STOCK_CACHE].clear()
+        # LocMem stands in for Redis: one process
+        patcher = mock.patch('products.services.hot_stock_service.process_local', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.product = Product.objects.create(name='Hot', price='1.00', stock=10)
+        HotStockService.enable(self.product, shards=4)
+
+    def stock(self):
+        return Product.objects.get(pk=self.product.pk).stock
+
+    def test_reservations_use_shards_until_flushed(self):
+        order_id = uuid.uuid4()
+        with self.assertNumQueries(4):  # hot lookup, savepoint pair + reservation INSERT, no product UPDATE
+            InventoryService.reserve(order_id, {self.product.pk: 4})
+        self.assertEqual(self.stock(), 10)
+        with self.assertNumQueries(3):  # checkout passes the shard counts it loaded
+            InventoryService.reserve(uuid.uuid4(), {self.product.pk: 1}, hot={self.product.pk: 4})
+        self.assertEqual(HotStockService.flush(), {self.product.pk: 5})
+        self.assertEqual(self.stock(), 5)
+        self.assertEqual(HotStockService.flush(), {})
+
+    def test_take_spans_shards_and_never_oversells(self):
+        # 10 units over 4 shards = 3/3/2/2; 7 units needs several shards
+        InventoryService.reserve(uuid.uuid4(), {self.product.pk: 7})
+        with self.assertRaises(InsufficientStock) as ctx:
+            InventoryService.reserve(uuid.uuid4(), {self.product.pk: 4})
+        self.assertEqual(ctx.exception.shortages, {self.product.pk: 3})
+        self.assertEqual(HotStockService.available(self.product.pk, 4), 3)
+
+    def test_release_returns_units_to_shards(self):
+        order_id = uuid.uuid4()
+        InventoryService.reserve(order_id, {self.product.pk: 5})
+        with self.captureOnCommitCallbacks(execute=True):
+            InventoryService.release([order_id])
+        self.assertEqual(HotStockService.available(self.product.pk, 4), 10)
+        self.assertEqual(HotStockService.flush(), {})
+        self.assertEqual(self.stock(), 10)
+
+    def test_release_after_flush_restocks_row_and_shards(self):
+        order_id = uuid.uuid4()
+        InventoryService.reserve(order_id, {self.product.pk: 5})
+        HotStockService.flush()
+        with self.captureOnCommitCallbacks(execute=True):
+            InventoryService.release([order_id])
+        self.assertEqual((self.stock(), HotStockService.available(self.product.pk, 4)), (10, 10))
+
+    def test_failed_order_transaction_gives_units_back(self):
+        order_id = uuid.uuid4()
+        with self.assertRaises(RuntimeError):
+            with InventoryService.reserving(order_id, {self.product.pk: 4}):
+                raise RuntimeError('order insert failed')
+        self.assertEqual(HotStockService.available(self.product.pk, 4), 10)
+        self.assertFalse(StockReservation.objects.filter(order_id=order_id).exists())
+        self.assertEqual(HotStockService.flush(), {})
+
+    def test_consumption_survives_losing_the_cache(self):
+        InventoryService.reserve(uuid.uuid4(), {self.product.pk: 3})
+        caches[settings.HOT_STOCK_CACHE].clear()
+        # still hot (the DB says so): no fallback to the row while shards are gone
+        with self.assertRaises(InsufficientStock):
+            InventoryService.reserve(uuid.uuid4(), {self.product.pk: 1})
+        self.assertEqual(HotStockService.flush(), {self.product.pk: 3})
+        self.assertEqual(self.stock(), 7)
+
+    def test_disable_flushes_consumption(self):
+        InventoryService.reserve(uuid.uuid4(), {self.product.pk: 2})
+        HotStockService.disable(self.product)
+        self.assertEqual(self.stock(), 8)
+        self.assertEqual(HotStockService.shard_counts([self.product.pk]), {})
+
+    def test_enable_refuses_a_process_local_cache(self):
+        with mock.patch('products.services.hot_stock_service.process_local', return_value=True):
+            with self.assertRaises(ImproperlyConfigured):
+                HotStockService.enable(Product.objects.create(name='Cold', price='1.00', stock=5))
+
+
+class CatalogQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        categories = [Category.objects.create(name=f'Category {i}') for i in range(4)]
+        cls.products = [
+            Product.objects.create(name=f'Product {i}', price='3.00', stock=5, category=categories[i % 4])
+            for i in range(15)
+        ]
+        cls.admin = User.objects.create_superuser(email='admin@example.com', username='admin', password='pass12345')
+
+    def setUp(self):
+        caches['catalog'].clear()
+        self.client = APIClient()
+
+    def test_product_list(self):
+        with self.assertMaxQueries(3):  # MAX(updated_at) + COUNT + page
+            res = self.client.get('/api/products/')
+        self.assertEqual(len(res.data['results']), 12)
+
+    def test_product_detail(self):
+        with self.assertMaxQueries(2):
+            self.client.get(f'/api/products/{self.products[0].pk}/')
+
+    def test_category_list_and_detail(self):
+        self.client.force_authenticate(self.admin)
+        with self.assertMaxQueries(3):
+            self.client.get('/api/products/categories/')
+        with self.assertMaxQueries(2):
+            self.client.get(f'/api/products/categories/{self.products[0].category_id}/')
+
+
+class CatalogCacheTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['catalog'].clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Books')
+        self.product = Product.objects.create(name='Novel', price='12.00', stock=3, category=self.category)
+
+    def test_repeat_reads_are_served_from_cache(self):
+        first = self.client.get('/api/products/', {'ordering': 'price'})
+        with self.assertNumQueries(1):  # MAX(updated_at) for the validators
+            second = self.client.get('/api/products/', {'ordering': 'price'})
+        self.assertEqual(first.data, second.data)
+        with self.assertMaxQueries(3):  # a different query string is a different entry
+            self.client.get('/api/products/', {'ordering': '-price'})
+
+    def test_detail_is_invalidated_by_save(self):
+        url = f'/api/products/{self.product.pk}/'
+        self.client.get(url)
+        self.product.name = 'Novel (2nd edition)'
+        self.product.save()
+        self.assertEqual(self.client.get(url).data['name'], 'Novel (2nd edition)')
+
+    def test_category_change_invalidates_product_list(self):
+        self.client.get('/api/products/')
+        self.category.name = 'Fiction'
+        self.category.save()
+        res = self.client.get('/api/products/')
+        self.assertEqual(res.data['results'][0]['category']['name'], 'Fiction')
+
+    def test_stock_updates_refresh_cached_responses(self):
+        url = f'/api/products/{self.product.pk}/'
+        self.client.get(url)
+        InventoryService.deduct_stock({self.product.pk: 2})
+        self.assertEqual(self.client.get(url).data['stock'], 1)
+
+    def test_stats_endpoint_reports_hits_and_misses(self):
+        CatalogCache.hits = CatalogCache.misses = 0
+        self.client.get('/api/products/')
+        self.client.get('/api/products/')
+        admin = User.objects.create_superuser(email='stats@example.com', username='stats', password='pass12345')
+        self.client.force_authenticate(admin)
+        stats = self.client.get('/api/products/cache-stats/').data
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+
+class ConditionalGetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.client = APIClient()
+        self.product = Product.objects.create(name='Lamp', price='30.00', stock=4)
+        self.url = f'/api/products/{self.product.pk}/'
+
+    def test_matching_etag_gets_304_without_serializing(self):
+        res = self.client.get(self.url)
+        self.assertEqual(res['Cache-Control'], 'public, max-age=60')
+        with self.assertNumQueries(1):
+            again = self.client.get(self.url, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], res['ETag'])
+        self.assertEqual(again.content, b'')
+
+    def test_list_etag_changes_with_stock_and_deletes(self):
+        etag = self.client.get('/api/products/')['ETag']
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        InventoryService.restock({self.product.pk: 1})
+        res = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['results'][0]['stock'], 5)
+        etag = res['ETag']
+        Product.objects.create(name='Other', price='1.00').delete()
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE='Mon, 01 Jan 2001 00:00:00 GMT').status_code, 200)
+
+    def test_admin_categories_are_private(self):
+        admin = User.objects.create_superuser(email='etag@example.com', username='etag', password='pass12345')
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get('/api/products/categories/')['Cache-Control'], 'private, no-cache')
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.client = APIClient()
+        self.mug = Product.objects.create(name='Coffee mug', description='Ceramic, 300ml', price='5.00')
+        self.beans = Product.objects.create(name='Espresso beans', description='Dark roast for coffee lovers', price='9.00')
+        Product.objects.create(name='Tea pot', description='Glass', price='20.00')
+
+    def names(self, **params):
+        return [p['name'] for p in self.client.get('/api/products/', params).data['results']]
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.names(q='coffee'), ['Coffee mug', 'Espresso beans'])
+
+    def test_prefix_and_stemming(self):
+        self.assertEqual(self.names(q='espre'), ['Espresso beans'])
+        self.assertEqual(self.names(q='roasting'), ['Espresso beans'])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.mug.name = 'Travel tumbler'
+        self.mug.save()
+        self.assertEqual(self.names(q='tumbler'), ['Travel tumbler'])
+        self.beans.delete()
+        self.assertEqual(self.names(q='coffee'), [])
+
+    def test_legacy_search_param_and_ordering(self):
+        self.assertEqual(self.names(search='coffee', ordering='-price'), ['Espresso beans', 'Coffee mug'])
+
+    def test_filters_apply_before_the_result_limit(self):
+        kitchen = Category.objects.create(name='Kitchen')
+        # ranks last for "coffee" (description-only hit): the limit alone would cut it
+        Product.objects.create(name='Burr grinder', description='For coffee', price='30.00', category=kitchen)
+        with self.settings(PRODUCT_SEARCH_MAX_RESULTS=1):
+            self.assertEqual(self.names(q='coffee', category=kitchen.pk), ['Burr grinder'])
+            self.assertEqual(self.names(q='coffee'), ['Coffee mug'])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.names(q='"mug'), ['Coffee mug'])
+        self.assertEqual(self.names(q='mug OR NEAR('), [])
+
+
+class KeysetPaginationTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = [Product.objects.create(name=f'Item {i}', price=f'{i % 3}.00') for i in range(11)]
+        # half the catalog shares one timestamp: the pk tiebreaker must keep pages disjoint
+        Product.objects.filter(pk__in=[p.pk for p in cls.products[:6]]).update(created_at=timezone.now())
+
+    def setUp(self):
+        caches['catalog'].clear()
+        self.client = APIClient()
+
+    def walk(self, **params):
+        pages, res = [], self.client.get('/api/products/', {'page_size': 4, **params})
+        while True:
+            pages.append([p['id'] for p in res.data['results']])
+            if not res.data['next']:
+                return pages, res
+            res = self.client.get(res.data['next'])
+
+    def test_pages_cover_every_product_once(self):
+        pages, _ = self.walk()
+        ids = [pk for page in pages for pk in page]
+        expected = Product.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)
+        self.assertEqual([len(page) for page in pages], [4, 4, 3])
+        self.assertEqual(ids, [str(pk) for pk in expected])
+
+    def test_ordering_param_is_respected(self):
+        pages, _ = self.walk(ordering='price')
+        prices = [Product.objects.get(pk=pk).price for page in pages for pk in page]
+        self.assertEqual(prices, sorted(prices))
+        self.assertEqual(len(set(pk for page in pages for pk in page)), 11)
+
+    def test_search_results_page_in_relevance_order(self):
+        pages, _ = self.walk(q='item')
+        self.assertEqual(len(set(pk for page in pages for pk in page)), 11)
+
+    def test_previous_link_returns_the_same_page(self):
+        first = self.client.get('/api/products/', {'page_size': 4})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(back.data['previous'])
+
+    def test_count_can_be_skipped(self):
+        with self.assertMaxQueries(2):  # MAX(updated_at) + page
+            res = self.client.get('/api/products/', {'count': 'false'})
+        self.assertNotIn('count', res.data)
+        self.assertEqual(self.client.get('/api/products/').data['count'], 11)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/products/', {'cursor': 'bm9wZQ=='}).status_code, 404)
+
+    def cursor(self, position):
+        return base64.b64encode(urlencode({'p': json.dumps(position)}).encode()).decode()
+
+    def test_cursor_from_another_ordering_is_rejected(self):
+        next_url = self.client.get('/api/products/', {'page_size': 4, 'ordering': 'price'}).data['next']
+        cursor = parse_qs(urlsplit(next_url).query)['cursor'][0]
+        self.assertEqual(self.client.get('/api/products/', {'cursor': cursor}).status_code, 404)
+        self.assertEqual(self.client.get('/api/products/', {'cursor': cursor, 'ordering': 'price'}).status_code, 200)
+
+    def test_cursor_with_bad_values_is_rejected(self):
+        ordering = ['-created_at', '-pk']
+        for values in (['x', 'y'], [None, str(self.products[0].pk)], [timezone.now().isoformat(), 'y'], [[], {}]):
+            cursor = self.cursor({'ordering': ordering, 'values': values})
+            self.assertEqual(self.client.get('/api/products/', {'cursor': cursor}).status_code, 404, values)
+        self.assertEqual(self.client.get('/api/products/', {'cursor': self.cursor(['x', 'y'])}).status_code, 404)
+
+
+class ProductRowSerializerTests(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        category = Category.objects.create(name='Kitchen')
+        Product.objects.create(name='Kettle', description='Steel', price='19.90', stock=3, category=category,
+                               image='products/kettle photo.jpg')
+        Product.objects.create(name='Loose', price='7', stock=0)
+
+    def test_output_is_byte_identical_to_product_serializer(self):
+        request = APIRequestFactory().get('/api/products/')
+        queryset = Product.objects.select_related('category').order_by('name')
+        expected = ProductSerializer(queryset, many=True, context={'request': request}).data
+        fast = ProductRowSerializer(request).many(ProductRowSerializer(request).rows(queryset))
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(expected))
+
+    def test_list_and_detail_responses_match(self):
+        client = APIClient()
+        for product in Product.objects.select_related('category'):
+            res = client.get(f'/api/products/{product.pk}/')
+            expected = ProductSerializer(product, context={'request': res.wsgi_request}).data
+            self.assertEqual(res.content, JSONRenderer().render(expected))
+        listed = client.get('/api/products/').json()['results']
+        self.assertEqual([p['name'] for p in listed], ['Loose', 'Kettle'])
+        self.assertEqual(client.get(f'/api/products/{uuid.uuid4()}/').status_code, 404)
+
+
+class SparseFieldsetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Kitchen')
+        self.product = Product.objects.create(name='Kettle', description='Steel', price='19.90', category=self.category)
+
+    def test_fields_narrow_payload_and_sql(self):
+        with self.assertMaxQueries(3) as ctx:
+            res = self.client.get('/api/products/', {'fields': 'id,name,price,image'})
+        self.assertEqual(list(res.data['results'][0]), ['id', 'name', 'price', 'image'])
+        page_sql = ctx.captured_queries[-1]['sql']
+        self.assertNotIn('description', page_sql)
+        self.assertNotIn('products_category', page_sql)
+
+    def test_relations_collapse_to_pk_unless_expanded(self):
+        row = self.client.get(f'/api/products/{self.product.pk}/', {'fields': 'id,category'}).data
+        self.assertEqual(row, {'id': str(self.product.pk), 'category': self.category.pk})
+        row = self.client.get(f'/api/products/{self.product.pk}/', {'fields': 'category', 'expand': 'category'}).data
+        self.assertEqual(row, {'category': {'id': self.category.pk, 'name': 'Kitchen'}})
+
+    def test_row_serializer_matches_product_serializer(self):
+        for params in ({'fields': 'id,category,created_at'}, {'expand': 'category'}, {'fields': 'stock'}):
+            request = Request(APIRequestFactory().get('/api/products/', params))
+            expected = ProductSerializer(Product.objects.all(), many=True, context={'request': request}).data
+            rows = ProductRowSerializer(request)
+            self.assertEqual(JSONRenderer().render(rows.many(rows.rows(Product.objects.all()))), JSONRenderer().render(expected))
+
+
+class AsyncProductViewTests(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Garden')
+        self.products = [
+            Product.objects.create(name=f'Hose {i}', price=f'{i % 3}.50', category=category if i % 2 else None)
+            for i in range(7)
+        ]
+        self.category = category
+
+    def test_list_matches_sync_endpoint(self):
+        for params in ({}, {'ordering': '-price', 'page_size': 3}, {'category': self.category.pk, 'fields': 'id,name'}):
+            sync = self.client.get('/api/products/', params).json()
+            res = self.client.get('/api/async/products/', params)
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.json()['results'], sync['results'])
+            self.assertEqual(res.json()['count'], sync['count'])
+
+    def test_follows_cursor(self):
+        first = self.client.get('/api/async/products/', {'page_size': 4, 'count': 'false'}).json()
+        second = self.client.get(first['next']).json()
+        ids = [p['id'] for p in first['results'] + second['results']]
+        self.assertEqual(sorted(ids), sorted(str(p.pk) for p in self.products))
+        self.assertIsNone(second['next'])
+
+    def test_detail_and_errors(self):
+        product = self.products[1]
+        res = self.client.get(f'/api/async/products/{product.pk}/')
+        self.assertEqual(res.content, self.client.get(f'/api/products/{product.pk}/').content)
+        self.assertEqual(self.client.get(f'/api/async/products/{uuid.uuid4()}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/async/products/', {'category': 'x'}).status_code, 400)
+
+
+class ProductFeedTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lamps = Category.objects.create(name='Lamps')
+        cls.product = Product.objects.create(name='Desk lamp', price='20.00', stock=4, category=cls.lamps)
+        cls.hot = Product.objects.create(name='Flash sale lamp', price='9.00', stock=50, hot_stock_shards=4)
+        cls.admin = User.objects.create_superuser(email='feeds@example.com', username='feeds', password='pass12345')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, name, text, **data):
+        return self.client.post(
+            '/api/products/import/', {'file': SimpleUploadedFile(name, text.encode()), **data}, format='multipart',
+        )
+
+    def test_csv_import_upserts_and_reports_bad_rows(self):
+        version = CatalogCache.version()
+        feed = (
+            'id,name,price,stock,category\n'
+            f'{self.product.pk},Desk lamp v2,22.50,7,\n'
+            ',Floor lamp,80.00,3,Lamps\n'
+            ',Wall lamp,abc,1,Lamps\n'
+            ',Ceiling lamp,30.00,1,Chairs\n'
+            ',,10.00,1,\n'
+            f'{self.hot.pk},Flash sale lamp,9.00,40,\n'
+        )
+        res = self.upload('feed.csv', feed)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual((res.data['rows'], res.data['created'], res.data['updated'], res.data['failed']), (6, 1, 1, 4))
+        self.assertEqual(
+            [(error['line'], sorted(error['errors'])) for error in res.data['errors']],
+            [(4, ['price']), (6, ['name']), (5, ['category']), (7, ['stock'])],
+        )
+        created_at = self.product.created_at
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.name, str(self.product.price), self.product.stock, self.product.category), ('Desk lamp v2', '22.50', 7, None))
+        self.assertEqual(self.product.created_at, created_at)  # upserted, not replaced
+        self.assertEqual(Product.objects.get(name='Floor lamp').category, self.lamps)
+        self.assertEqual(Product.objects.get(pk=self.hot.pk).stock, 50)
+        self.assertNotEqual(CatalogCache.version(), version)
+
+    def test_import_is_admin_only_and_checks_the_feed(self):
+        self.assertEqual(self.upload('feed.csv', 'id,prcie\n').status_code, 400)
+        self.assertEqual(self.upload('feed.xml', '<products/>').status_code, 400)
+        self.client.force_authenticate(User.objects.create_user(email='u@example.com', username='u', password='pass12345'))
+        self.assertEqual(self.upload('feed.csv', 'name,price\nLamp,1.00\n').status_code, 403)
+
+    def test_jsonl_command_batches_and_dry_run(self):
+        lines = [json.dumps({'name': f'Bulb {i}', 'price': '1.50', 'category_id': self.lamps.pk}) for i in range(7)]
+        lines += [
+            json.dumps({'id': str(self.product.pk), 'description': 'Brass'}),  # only the columns given change
+            '{not json',
+            json.dumps({'name': 'Bulb', 'price': '1.00', 'colour': 'red'}),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'feed.jsonl')
+            with open(path, 'w') as feed:
+                feed.write('\n'.join(lines) + '\n')
+            out = io.StringIO()
+            call_command('import_products', path, dry_run=True, stdout=out)
+            self.assertEqual(json.loads(out.getvalue())['created'], 7)
+            self.assertFalse(Product.objects.filter(name__startswith='Bulb').exists())
+
+            errors = os.path.join(directory, 'errors.jsonl')
+            out = io.StringIO()
+            with self.assertMaxQueries(20):  # 3 batches: 3 lookups + 1-2 writes each, plus savepoints
+                call_command('import_products', path, batch_size=3, errors=errors, stdout=out)
+            report = json.loads(out.getvalue())
+            with open(errors) as error_file:
+                logged = [json.loads(line) for line in error_file]
+        self.assertEqual((report['created'], report['updated'], report['failed']), (7, 1, 2))
+        self.assertEqual([entry['line'] for entry in logged], [9, 10])
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.description, self.product.name, self.product.stock), ('Brass', 'Desk lamp', 4))
+        self.assertEqual(Product.objects.filter(name__startswith='Bulb', category=self.lamps).count(), 7)
+
+    def test_export_streams_a_feed_that_imports_back(self):
+        with self.settings(PRODUCT_EXPORT_CHUNK_SIZE=1):
+            res = self.client.get('/api/products/export/', {'feed_format': 'csv'})
+            self.assertTrue(res.streaming)
+            chunks = list(res.streaming_content)
+        self.assertEqual(len(chunks), 2)  # header + row 1, row 2
+        body = b''.join(chunks).decode()
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual({row['name'] for row in rows}, {'Desk lamp', 'Flash sale lamp'})
+        self.assertEqual(res['Content-Disposition'], 'attachment; filename="products.csv"')
+
+        # stock of the hot-SKU product can't be re-imported; everything else round-trips
+        res = self.upload('products.csv', body)
+        self.assertEqual((res.data['updated'], res.data['failed']), (1, 1))
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.name, str(self.product.price), self.product.category), ('Desk lamp', '20.00', self.lamps))
+
+        out = io.StringIO()
+        call_command('export_products', format='jsonl', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
@@ -1,11 +1,18 @@
 from rest_framework.routers import DefaultRouter
-from .views import ProductViewSet, CategoryViewSet
+from .views import AsyncProductDetailView, AsyncProductListView, ProductViewSet, CategoryViewSet
 from django.urls import path, include
 
 router = DefaultRouter()
-router.register(r'', ProductViewSet, basename='product')
+# categories first: the product detail route would otherwise match "categories/"
 router.register(r'categories', CategoryViewSet, basename='category')
+router.register(r'', ProductViewSet, basename='product')
 
 urlpatterns = [
     path('', include(router.urls))
 ]
+
+# mounted under /api/async/products/
+async_urlpatterns = [
+    path('', AsyncProductListView.as_view(), name='async-product-list'),
+    path('<uuid:pk>/', AsyncProductDetailView.as_view(), name='async-product-detail'),
+]
@@ -1,20 +1,133 @@
+import io
 from django.shortcuts import render
+from django.http import StreamingHttpResponse
+from decimal import Decimal, InvalidOperation
 from rest_framework import viewsets, permissions, filters
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from core.async_views import AsyncAPIView
+from core.pagination import KeysetPagination
+from .cache import CachedReadMixin, CatalogCache
 from .models import Product, Category
-from .serializers import ProductSerializer, CategorySerializer
+from .search import ProductSearchFilter
+from .serializers import ProductRowSerializer, ProductSerializer, CategorySerializer
+from .services.feed_service import FORMATS, FeedError, ProductFeedService, feed_format
 from django_filters.rest_framework import DjangoFilterBackend
 # Create your views here.
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all().order_by('-created_at')
+class ProductRowsMixin:
+    """Reads go through ProductRowSerializer (``.values()`` rows); writes keep ProductSerializer."""
+
+    def list(self, request, *args, **kwargs):
+        serializer = ProductRowSerializer(request)
+        queryset = serializer.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.many(page))
+        return Response(serializer.many(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = ProductRowSerializer(request)
+        queryset = serializer.rows(self.filter_queryset(self.get_queryset()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(queryset, **{self.lookup_field: kwargs[lookup_url_kwarg]})
+        return Response(serializer.one(row))
+
+class ProductViewSet(CachedReadMixin, ProductRowsMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.select_related('category').order_by('-created_at')
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'price']
-    search_fields = ['name','description']
     ordering_fields = ['price','created_at']
 
-class CategoryViewSet(viewsets.ModelViewSet):
+    @action(detail=False, url_path='cache-stats', permission_classes=[permissions.IsAdminUser])
+    def cache_stats(self, request):
+        return Response(CatalogCache.stats())
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[permissions.IsAdminUser],
+            parser_classes=[MultiPartParser])
+    def import_feed(self, request):
+        """Upsert products from an uploaded CSV/JSONL ``file``; ``dry_run=true`` only validates."""
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': ['Upload a CSV or JSONL feed.']})
+        try:
+            fmt = feed_format(request.data.get('feed_format') or upload.name)
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            dry_run = request.data.get('dry_run', '').lower() in ('1', 'true', 'yes')
+            report = ProductFeedService.import_feed(stream, fmt, dry_run=dry_run)
+        except (FeedError, UnicodeDecodeError) as exc:
+            raise ValidationError({'file': [str(exc)]})
+        return Response(report.as_dict())
+
+    @action(detail=False, url_path='export', permission_classes=[permissions.IsAdminUser])
+    def export_feed(self, request):
+        """The whole catalog as a streamed feed (``?feed_format=csv|jsonl``)."""
+        try:
+            fmt = feed_format(request.query_params.get('feed_format', 'csv'))
+        except FeedError as exc:
+            raise ValidationError({'feed_format': [str(exc)]})
+        response = StreamingHttpResponse(ProductFeedService.export(fmt), content_type=FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="products.{fmt}"'
+        return response
+
+class CategoryViewSet(CachedReadMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAdminUser]
+    # admin-only: revalidate every time, never in shared caches
+    cache_control = {'private': True, 'no_cache': True}
+
+class AsyncProductListView(AsyncAPIView):
+    """
+    ProductViewSet.list for ASGI workers: category/price filters, ordering,
+    keyset pages and sparse fields over the async ORM. ``?q=`` search and
+    the response cache stay on the sync endpoint.
+    """
+    authentication_required = False
+
+    @staticmethod
+    def filter_param(params, name, cast):
+        value = params.get(name)
+        if not value:
+            return None
+        try:
+            return cast(value)
+        except (ValueError, InvalidOperation):
+            raise ValidationError({name: [f'Enter a valid {name}.']})
+
+    async def get(self, request):
+        params = request.query_params
+        queryset = Product.objects.order_by('-created_at')
+        category = self.filter_param(params, 'category', int)
+        if category is not None:
+            queryset = queryset.filter(category_id=category)
+        price = self.filter_param(params, 'price', Decimal)
+        if price is not None:
+            queryset = queryset.filter(price=price)
+        ordering = [
+            field.strip() for field in params.get('ordering', '').split(',')
+            if field.strip().lstrip('-') in ProductViewSet.ordering_fields
+        ]
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        serializer = ProductRowSerializer(request.drf)
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(serializer.rows(queryset), request.drf)
+        return paginator.get_paginated_data(serializer.many(page))
+
+class AsyncProductDetailView(AsyncAPIView):
+    authentication_required = False
+
+    async def get(self, request, pk):
+        serializer = ProductRowSerializer(request.drf)
+        try:
+            row = await serializer.rows(Product.objects.filter(pk=pk)).aget()
+        except Product.DoesNotExist:
+            raise NotFound('No Product matches the given query.')
+        return serializer.one(row)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from taskqueue.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run background tasks from the tasks table (no broker needed). Stop with SIGTERM/Ctrl+C.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help='Worker threads (default TASK_WORKER_CONCURRENCY).')
+        parser.add_argument('--queues', help='Comma-separated queues to take tasks from (default: all).')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--burst', action='store_true', help='Exit once no task is due.')
+
+    def handle(self, *args, **options):
+        queues = [queue for queue in (options['queues'] or '').split(',') if queue] or None
+        worker = Worker(
+            concurrency=options['concurrency'], queues=queues, poll_interval=options['poll_interval'],
+            burst=options['burst'], log=self.stdout.write,
+        )
+        self.stdout.write(f'Worker started: {worker.concurrency} threads, queues {queues or "all"}')
+        stats = worker.run()
+        self.stdout.write(f'Worker stopped: {stats}')
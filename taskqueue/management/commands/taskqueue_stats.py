@@ -0,0 +1,13 @@
+import json
+from django.core.management.base import BaseCommand
+from taskqueue.services.queue_service import TaskQueue
+
+
+class Command(BaseCommand):
+    help = 'Queue depth per status, lag of the oldest due task and recent throughput.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, default=60, help='Seconds of completions to average over.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(TaskQueue.stats(window=options['window']), indent=2))
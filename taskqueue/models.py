@@ -0,0 +1,31 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """A queued call of a registered @task function; see taskqueue.registry and runworker."""
+    STATUS_CHOICES = [('queued','queued'),('running','running'),('done','done'),('failed','failed')]
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=200)
+    queue = models.CharField(max_length=50, default='default')
+    args = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    # at most one *queued* task per key (cleared when a worker claims it)
+    dedupe_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    claim = models.CharField(max_length=32, blank=True, db_index=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        # workers poll WHERE status = 'queued' AND queue IN (...) AND run_at <= now ORDER BY run_at
+        indexes = [models.Index(fields=['status', 'queue', 'run_at'])]
+
+    def __str__(self):
+        return f'{self.name} #{self.id} ({self.status})'
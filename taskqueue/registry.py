@@ -0,0 +1,50 @@
+# File: taskqueue/registry.py
+# @task: register a function the worker can run and give it .delay()/.enqueue().
+from functools import update_wrapper
+from taskqueue.services.queue_service import TaskQueue
+
+registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, name, queue, max_attempts):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+        update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Queue ``func(*args, **kwargs)`` to run as soon as a worker is free."""
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, **options):
+        """Queue with TaskQueue.enqueue options: ``countdown``, ``run_at``, ``dedupe_key``."""
+        options.setdefault('queue', self.queue)
+        options.setdefault('max_attempts', self.max_attempts)
+        return TaskQueue.enqueue(self.name, args, kwargs, **options)
+
+    def build(self, args=(), kwargs=None, **options):
+        """An unsaved Task for TaskQueue.enqueue_many()."""
+        options.setdefault('queue', self.queue)
+        options.setdefault('max_attempts', self.max_attempts)
+        return TaskQueue.build(self.name, args, kwargs, **options)
+
+
+def task(func=None, *, name=None, queue='default', max_attempts=None):
+    """
+    Register ``func`` as a background task (arguments must be JSON-serializable)::
+
+        @task
+        def send_order_confirmation_email(order_id): ...
+
+        send_order_confirmation_email.delay(order.id)
+    """
+    def register(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        registry[task_name] = TaskFunction(func, task_name, queue, max_attempts)
+        return registry[task_name]
+    return register(func) if func is not None else register
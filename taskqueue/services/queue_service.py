@@ -0,0 +1,149 @@
+import random
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from taskqueue.models import Task
+
+
+class TaskQueue:
+    """
+    The tasks table as a queue. Enqueueing inside a transaction makes the
+    task part of it (it only becomes visible on commit, and is gone on
+    rollback). Workers claim due tasks with ``SELECT ... FOR UPDATE SKIP
+    LOCKED`` where the database has it, so several workers never wait on
+    or double-claim each other's rows.
+    """
+
+    @staticmethod
+    def build(name, args=(), kwargs=None, queue='default', run_at=None, countdown=None,
+              max_attempts=None, dedupe_key=None):
+        if run_at is None:
+            run_at = timezone.now() + timedelta(seconds=countdown or 0)
+        return Task(
+            name=name, queue=queue, args=list(args), kwargs=kwargs or {}, run_at=run_at,
+            max_attempts=max_attempts or settings.TASK_MAX_ATTEMPTS, dedupe_key=dedupe_key,
+        )
+
+    @staticmethod
+    def enqueue(name, args=(), kwargs=None, **options):
+        """
+        Queue one call. With ``dedupe_key`` nothing is added while a task with
+        that key is still queued (returns None then).
+        """
+        task = TaskQueue.build(name, args, kwargs, **options)
+        if task.dedupe_key is None:
+            task.save()
+            return task
+        try:
+            with transaction.atomic():
+                task.save()
+        except IntegrityError:
+            return None
+        return task
+
+    @staticmethod
+    def enqueue_many(tasks):
+        """Insert Task objects from ``build()`` in one statement."""
+        return Task.objects.bulk_create(tasks, ignore_conflicts=any(task.dedupe_key for task in tasks))
+
+    @staticmethod
+    def claim(limit, queues=None, now=None):
+        """Mark up to ``limit`` due tasks running for this caller and return them."""
+        now = now or timezone.now()
+        token = uuid.uuid4().hex
+        due = Task.objects.filter(status='queued', run_at__lte=now)
+        if queues:
+            due = due.filter(queue__in=queues)
+        due = due.order_by('run_at', 'id')
+        claimed = {
+            'status': 'running', 'claim': token, 'locked_at': now,
+            'attempts': F('attempts') + 1, 'dedupe_key': None,
+        }
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+                if not ids:
+                    return []
+                Task.objects.filter(id__in=ids).update(**claimed)
+        else:
+            # SQLite: a single UPDATE ... WHERE id IN (SELECT ... LIMIT n); writers are serialized
+            # by the database lock, and the status check keeps a concurrent claim from re-taking rows
+            if not Task.objects.filter(id__in=due.values('id')[:limit], status='queued').update(**claimed):
+                return []
+        return list(Task.objects.filter(claim=token, status='running').order_by('run_at', 'id'))
+
+    @staticmethod
+    def complete(task):
+        Task.objects.filter(pk=task.pk, claim=task.claim).update(
+            status='done', finished_at=timezone.now(), last_error='',
+        )
+
+    @staticmethod
+    def retry_delay(attempts):
+        """Exponential backoff with jitter: base * 2^(attempt-1), capped, then scaled by 0.5-1."""
+        delay = min(settings.TASK_RETRY_BACKOFF_MAX, settings.TASK_RETRY_BACKOFF * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1)
+
+    @staticmethod
+    def fail(task, error, retry=True):
+        """Requeue with backoff while attempts remain, else mark failed. Returns True if requeued."""
+        now = timezone.now()
+        tasks = Task.objects.filter(pk=task.pk, claim=task.claim)
+        if retry and task.attempts < task.max_attempts:
+            run_at = now + timedelta(seconds=TaskQueue.retry_delay(task.attempts))
+            tasks.update(status='queued', run_at=run_at, claim='', last_error=error)
+            return True
+        tasks.update(status='failed', finished_at=now, last_error=error)
+        return False
+
+    @staticmethod
+    def requeue_stale(timeout=None, now=None):
+        """Tasks running longer than ``timeout`` seconds belong to a dead worker: run them again or fail them."""
+        now = now or timezone.now()
+        cutoff = now - timedelta(seconds=timeout or settings.TASK_LOCK_TIMEOUT)
+        stale = Task.objects.filter(status='running', locked_at__lt=cutoff)
+        failed = stale.filter(attempts__gte=F('max_attempts')).update(
+            status='failed', finished_at=now, last_error='worker lost',
+        )
+        requeued = stale.update(status='queued', claim='', last_error='worker lost')
+        return requeued, failed
+
+    @staticmethod
+    def schedule_periodic(schedule, now=None):
+        """
+        ``schedule`` is ``[(task function, every seconds)]``. Queues each one
+        for its next multiple of ``every`` unless it is already queued, so any
+        number of workers can call this; periodic tasks should be idempotent.
+        """
+        now = now or timezone.now()
+        return TaskQueue.enqueue_many([
+            TaskQueue.build(
+                func.name, queue=func.queue, max_attempts=func.max_attempts,
+                run_at=now + timedelta(seconds=every - now.timestamp() % every),
+                dedupe_key=f'periodic:{func.name}',
+            )
+            for func, every in schedule
+        ])
+
+    @staticmethod
+    def purge(older_than=None, now=None):
+        """Delete done tasks finished more than ``older_than`` seconds ago (failed ones are kept)."""
+        now = now or timezone.now()
+        cutoff = now - timedelta(seconds=older_than or settings.TASK_RESULT_TTL)
+        return Task.objects.filter(status='done', finished_at__lt=cutoff).delete()[0]
+
+    @staticmethod
+    def stats(window=60, now=None):
+        """Depth per status, how late the oldest due task is, and completions/s over the last ``window`` s."""
+        now = now or timezone.now()
+        counts = dict(Task.objects.values_list('status').annotate(n=Count('id')).order_by())
+        oldest = Task.objects.filter(status='queued', run_at__lte=now).aggregate(oldest=Min('run_at'))['oldest']
+        recent = Task.objects.filter(status='done', finished_at__gte=now - timedelta(seconds=window)).count()
+        return {
+            **{status: counts.get(status, 0) for status, _ in Task.STATUS_CHOICES},
+            'lag_s': round((now - oldest).total_seconds(), 3) if oldest else 0,
+            'done_per_s': round(recent / window, 2),
+        }
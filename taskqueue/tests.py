@@ -0,0 +1,103 @@
+from datetime import timedelta
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from .models import Task
+from .registry import registry, task
+from .services.queue_service import TaskQueue
+from .worker import Worker
+
+calls = []
+
+
+@task(name='taskqueue.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='taskqueue.tests.flaky', max_attempts=2)
+def flaky(value):
+    if not any(call == ('flaky', value) for call in calls):
+        calls.append(('flaky', value))
+        raise RuntimeError('first attempt fails')
+    calls.append(value)
+
+
+class TaskQueueTests(TestCase):
+    def test_claim_takes_due_tasks_once(self):
+        first = record.delay(1)
+        record.enqueue([2], countdown=60)
+        record.enqueue([3], queue='other')
+        claimed = TaskQueue.claim(10, queues=['default'])
+        self.assertEqual([t.pk for t in claimed], [first.pk])
+        self.assertEqual((claimed[0].status, claimed[0].attempts), ('running', 1))
+        self.assertEqual(TaskQueue.claim(10, queues=['default']), [])
+
+        TaskQueue.complete(claimed[0])
+        self.assertEqual(Task.objects.get(pk=first.pk).status, 'done')
+
+    def test_dedupe_key_allows_one_queued_task(self):
+        self.assertIsNotNone(record.enqueue([1], dedupe_key='k'))
+        self.assertIsNone(record.enqueue([2], dedupe_key='k'))
+        TaskQueue.claim(10)
+        self.assertIsNotNone(record.enqueue([3], dedupe_key='k'))
+
+    @override_settings(TASK_RETRY_BACKOFF=10, TASK_RETRY_BACKOFF_MAX=10)
+    def test_fail_retries_with_backoff_then_gives_up(self):
+        record.enqueue([1], max_attempts=2)
+        (claimed,) = TaskQueue.claim(1)
+        self.assertTrue(TaskQueue.fail(claimed, 'boom'))
+        requeued = Task.objects.get(pk=claimed.pk)
+        self.assertEqual(requeued.status, 'queued')
+        self.assertGreaterEqual(requeued.run_at, timezone.now() + timedelta(seconds=4))
+
+        (claimed,) = TaskQueue.claim(1, now=requeued.run_at)
+        self.assertFalse(TaskQueue.fail(claimed, 'boom again'))
+        self.assertEqual(Task.objects.get(pk=claimed.pk).status, 'failed')
+
+    def test_requeue_stale(self):
+        record.delay(1)
+        record.enqueue([2], max_attempts=1)
+        TaskQueue.claim(10)
+        later = timezone.now() + timedelta(hours=1)
+        self.assertEqual(TaskQueue.requeue_stale(timeout=60, now=later), (1, 1))
+        self.assertEqual(sorted(Task.objects.values_list('status', flat=True)), ['failed', 'queued'])
+
+    def test_schedule_periodic_queues_next_boundary_once(self):
+        now = timezone.now()
+        for _ in range(2):
+            TaskQueue.schedule_periodic([(record, 60)], now=now)
+        scheduled = Task.objects.get()
+        self.assertEqual(scheduled.run_at.timestamp() % 60, 0)
+        self.assertTrue(now < scheduled.run_at <= now + timedelta(seconds=60))
+
+    def test_purge_and_stats(self):
+        record.delay(1)
+        record.delay(2)
+        done = TaskQueue.claim(1)[0]
+        TaskQueue.complete(done)
+        stats = TaskQueue.stats()
+        self.assertEqual((stats['queued'], stats['done']), (1, 1))
+        self.assertEqual(TaskQueue.purge(older_than=60, now=timezone.now() + timedelta(minutes=2)), 1)
+
+
+@override_settings(TASK_RETRY_BACKOFF=0, TASK_SCHEDULE={})
+class WorkerTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_burst_worker_runs_and_retries(self):
+        TaskQueue.enqueue_many([record.build([i]) for i in range(20)] + [flaky.build(['x'])])
+        Task.objects.create(name='taskqueue.tests.missing')
+        stats = Worker(concurrency=4, burst=True, poll_interval=0.01).run()
+
+        self.assertEqual(sorted(call for call in calls if isinstance(call, int)), list(range(20)))
+        self.assertIn('x', calls)
+        self.assertEqual((stats['done'], stats['retried'], stats['failed']), (21, 1, 1))
+        self.assertEqual(Task.objects.filter(status='done').count(), 21)
+        self.assertEqual(Task.objects.get(name='taskqueue.tests.missing').status, 'failed')
+
+    def test_registered_app_tasks(self):
+        for name in ('orders.tasks.send_order_confirmation_email', 'payments.tasks.process_webhooks',
+                     'products.tasks.expire_reservations', 'products.tasks.warm_catalog_cache',
+                     'users.tasks.purge_expired_tokens'):
+            self.assertIn(name, registry)
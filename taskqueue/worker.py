@@ -0,0 +1,148 @@
+# File: taskqueue/worker.py
+# The loop behind `manage.py runworker`.
+import signal
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, close_old_connections
+from core.utils import percentiles
+from taskqueue.registry import registry
+from taskqueue.services.queue_service import TaskQueue
+
+
+class WorkerStats:
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.counts = dict.fromkeys(('done', 'retried', 'failed'), 0)
+        self.durations = deque(maxlen=window)
+
+    def record(self, outcome, seconds):
+        with self.lock:
+            self.counts[outcome] += 1
+            self.durations.append(seconds * 1000)
+
+    def snapshot(self):
+        with self.lock:
+            counts, durations = dict(self.counts), list(self.durations)
+        elapsed = time.monotonic() - self.started
+        return {
+            **counts,
+            'per_second': round(sum(counts.values()) / elapsed, 1) if elapsed else 0,
+            **{f'{key}_ms': value and round(value, 2) for key, value in percentiles(durations).items()},
+        }
+
+
+class Worker:
+    """
+    Claims due tasks in batches and runs them on a pool of ``concurrency``
+    threads, claiming more only as threads free up. Each pass also queues
+    the TASK_SCHEDULE periodic tasks, requeues tasks orphaned by dead
+    workers and purges old results (every ``maintenance_interval`` s).
+    SIGINT/SIGTERM stop claiming and let running tasks finish. ``burst``
+    exits once nothing is due.
+    """
+
+    def __init__(self, concurrency=None, queues=None, poll_interval=1.0, burst=False,
+                 maintenance_interval=30, log=None, stats_interval=60):
+        self.concurrency = concurrency or settings.TASK_WORKER_CONCURRENCY
+        self.queues = queues
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.maintenance_interval = maintenance_interval
+        self.stats_interval = stats_interval
+        self.log = log or (lambda message: None)
+        self.stats = WorkerStats()
+        self.stopping = threading.Event()
+        self.last_maintenance = self.last_stats = float('-inf')
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def schedule(self):
+        entries = []
+        for name, every in settings.TASK_SCHEDULE.items():
+            if name not in registry:
+                self.log(f'TASK_SCHEDULE: unknown task {name}')
+                continue
+            entries.append((registry[name], every))
+        return entries
+
+    def maintain(self):
+        now = time.monotonic()
+        if now - self.last_maintenance >= self.maintenance_interval:
+            self.last_maintenance = now
+            TaskQueue.schedule_periodic(self.schedule())
+            requeued, failed = TaskQueue.requeue_stale()
+            if requeued or failed:
+                self.log(f'Requeued {requeued} and failed {failed} tasks from lost workers')
+            TaskQueue.purge()
+        if now - self.last_stats >= self.stats_interval:
+            self.last_stats = now
+            self.log(f'stats {self.stats.snapshot()}')
+
+    @staticmethod
+    def save_result(method, *args, attempts=5):
+        # SQLite reports a busy table as OperationalError; retry briefly rather than
+        # leave the task running until requeue_stale picks it up
+        for attempt in range(attempts):
+            try:
+                return method(*args)
+            except OperationalError:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.01 * 2 ** attempt)
+
+    def execute(self, task):
+        started = time.perf_counter()
+        try:
+            func = registry.get(task.name)
+            if func is None:
+                self.save_result(TaskQueue.fail, task, f'unknown task {task.name}', False)
+                outcome = 'failed'
+            else:
+                try:
+                    func.func(*task.args, **task.kwargs)
+                except Exception:
+                    requeued = self.save_result(TaskQueue.fail, task, traceback.format_exc())
+                    outcome = 'retried' if requeued else 'failed'
+                else:
+                    self.save_result(TaskQueue.complete, task)
+                    outcome = 'done'
+            self.stats.record(outcome, time.perf_counter() - started)
+        except DatabaseError as exc:
+            self.log(f'Could not record the result of task {task.pk}: {exc}')
+        finally:
+            close_old_connections()
+
+    def run(self):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
+        inflight = set()
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix='taskqueue') as pool:
+            while not self.stopping.is_set():
+                try:
+                    self.maintain()
+                    free = self.concurrency - len(inflight)
+                    claimed = TaskQueue.claim(free, self.queues) if free else []
+                except DatabaseError as exc:
+                    self.log(f'Claim failed: {exc}')
+                    close_old_connections()
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                inflight.update(pool.submit(self.execute, task) for task in claimed)
+                if claimed and len(inflight) < self.concurrency:
+                    continue
+                if not inflight:
+                    if self.burst:
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                _, inflight = wait(inflight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+            wait(inflight)
+        close_old_connections()
+        return self.stats.snapshot()
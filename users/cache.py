@@ -0,0 +1,85 @@
+# File: users/cache.py
+# Per-request auth lookups (token user, refresh-token blacklist) served from the auth cache.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from core.utils import process_local
+
+
+def backend():
+    return caches[settings.AUTH_CACHE]
+
+
+class UserCache:
+    """
+    User rows by token user id for AUTH_USER_CACHE_TTL seconds. Saving or
+    deleting a user drops the entry (users.signals); changes made with
+    queryset ``update()`` show up once the TTL runs out. The drop only
+    reaches other workers through a shared cache: with per-process LocMem
+    they keep their copy (a deactivated user included) until the TTL.
+    """
+
+    @staticmethod
+    def key(user_id):
+        return f'user:{user_id}'
+
+    @classmethod
+    def get(cls, user_id):
+        """The user, or raises DoesNotExist."""
+        key = cls.key(user_id)
+        user = backend().get(key)
+        if user is None:
+            user = get_user_model().objects.get(**{jwt_settings.USER_ID_FIELD: user_id})
+            backend().set(key, user, settings.AUTH_USER_CACHE_TTL)
+        return user
+
+    @classmethod
+    async def aget(cls, user_id):
+        key = cls.key(user_id)
+        user = await backend().aget(key)
+        if user is None:
+            user = await get_user_model().objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+            await backend().aset(key, user, settings.AUTH_USER_CACHE_TTL)
+        return user
+
+    @classmethod
+    def invalidate(cls, user_id):
+        backend().delete(cls.key(user_id))
+
+
+class BlacklistFilter:
+    """
+    Blacklisted refresh-token jtis as cache keys that expire with the token.
+    Only a hit is trusted: a miss can be an eviction, or a token blacklisted
+    by another worker with its own LocMem cache, so it is confirmed with one
+    indexed query. Clean answers are cached for AUTH_BLACKLIST_MISS_TTL
+    seconds on shared caches only, where a later ``add()`` overwrites them.
+    """
+
+    @staticmethod
+    def key(jti):
+        return f'blacklist:{jti}'
+
+    @staticmethod
+    def ttl(expires_at, now=None):
+        return max(1, int((expires_at - (now or timezone.now())).total_seconds()) + 1)
+
+    @classmethod
+    def add(cls, jti, expires_at):
+        backend().set(cls.key(jti), True, cls.ttl(expires_at))
+
+    @classmethod
+    def contains(cls, jti, expires_at):
+        cached = backend().get(cls.key(jti))
+        if cached is not None:
+            return cached
+        found = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        if found:
+            cls.add(jti, expires_at)
+        elif settings.AUTH_BLACKLIST_MISS_TTL and not process_local(backend()):
+            # add(), not set(): a blacklisting that landed since the query wins
+            backend().add(cls.key(jti), False, settings.AUTH_BLACKLIST_MISS_TTL)
+        return found
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from users.services.token_service import TokenService
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted refresh tokens in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        purged = TokenService.purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(f'Purged {purged} expired tokens')
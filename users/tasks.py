@@ -0,0 +1,8 @@
+from taskqueue.registry import task
+from .services.token_service import TokenService
+
+
+@task
+def purge_expired_tokens(batch_size=1000):
+    """Periodic (TASK_SCHEDULE): drop expired outstanding/blacklisted refresh tokens."""
+    return TokenService.purge_expired(batch_size=batch_size)
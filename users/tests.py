@@ -1,3 +1,114 @@
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from core.testing import QueryBudgetMixin
+from .cache import BlacklistFilter
+from .models import User
 
-# Create your tests here.
+
+class UserQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        caches[settings.AUTH_CACHE].clear()
+        self.user = User.objects.create_user(email='me@example.com', username='me', password='pass12345')
+        self.client = APIClient()
+
+    def test_me(self):
+        self.client.force_authenticate(self.user)
+        with self.assertMaxQueries(0):
+            res = self.client.get('/api/auth/me/')
+        self.assertEqual(res.data['email'], 'me@example.com')
+
+    def test_me_with_jwt(self):
+        token = self.client.post('/api/auth/token/', {'email': 'me@example.com', 'password': 'pass12345'}).data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.assertMaxQueries(1):  # user lookup for the token
+            self.client.get('/api/auth/me/')
+        with self.assertMaxQueries(0):  # then served from the auth cache
+            res = self.client.get('/api/auth/me/')
+        self.assertEqual(res.data['email'], 'me@example.com')
+
+    def test_async_me(self):
+        token = self.client.post('/api/auth/token/', {'email': 'me@example.com', 'password': 'pass12345'}).data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.assertMaxQueries(1):
+            res = self.client.get('/api/async/auth/me/')
+        with self.assertMaxQueries(0):
+            self.client.get('/api/async/auth/me/')
+        self.assertEqual(res.content, self.client.get('/api/auth/me/').content)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer nope')
+        self.assertEqual(self.client.get('/api/async/auth/me/').status_code, 401)
+
+
+class TokenTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        caches[settings.AUTH_CACHE].clear()
+        self.user = User.objects.create_user(email='me@example.com', username='me', password='pass12345')
+        self.client = APIClient()
+        self.tokens = self.client.post('/api/auth/token/', {'email': 'me@example.com', 'password': 'pass12345'}).data
+
+    def get_me(self):
+        return self.client.get('/api/auth/me/', HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': token})
+
+    def test_saving_user_drops_cached_copy(self):
+        self.assertEqual(self.get_me().data['first_name'], '')
+        self.user.first_name = 'Ada'
+        self.user.save()
+        self.assertEqual(self.get_me().data['first_name'], 'Ada')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_me().status_code, 401)
+
+    def test_rotation_blacklists_old_refresh_token(self):
+        self.get_me()
+        # blacklist check, old token's outstanding row + blacklist get_or_create,
+        # the new outstanding row; no user lookups
+        with self.assertMaxQueries(7) as ctx:
+            res = self.refresh(self.tokens['refresh'])
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(any('users_user' in query['sql'] for query in ctx.captured_queries))
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+        self.assertEqual(self.refresh(res.data['refresh']).status_code, 200)
+
+    def test_blacklist_reloads_after_cache_flush(self):
+        self.refresh(self.tokens['refresh'])
+        caches[settings.AUTH_CACHE].clear()
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+
+    def test_blacklist_miss_is_confirmed_in_database(self):
+        # another worker's LocMem cache, or an eviction: the entry is gone, the row is not
+        self.refresh(self.tokens['refresh'])
+        jti = OutstandingToken.objects.get(token=self.tokens['refresh']).jti
+        caches[settings.AUTH_CACHE].delete(BlacklistFilter.key(jti))
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+        self.assertIs(caches[settings.AUTH_CACHE].get(BlacklistFilter.key(jti)), True)
+
+    def test_clean_answers_cached_only_on_shared_cache(self):
+        expires_at = timezone.now() + timedelta(days=1)
+        cache = caches[settings.AUTH_CACHE]
+        self.assertFalse(BlacklistFilter.contains('fresh', expires_at))
+        self.assertIsNone(cache.get(BlacklistFilter.key('fresh')))  # LocMem: never trusted
+        with mock.patch('users.cache.process_local', return_value=False):
+            self.assertFalse(BlacklistFilter.contains('fresh', expires_at))
+            with self.assertMaxQueries(0):
+                self.assertFalse(BlacklistFilter.contains('fresh', expires_at))
+            BlacklistFilter.add('fresh', expires_at)
+            self.assertTrue(BlacklistFilter.contains('fresh', expires_at))
+
+    def test_purge_expired_tokens(self):
+        past = timezone.now() - timedelta(days=1)
+        for i in range(5):
+            token = OutstandingToken.objects.create(jti=f'old-{i}', token='t', user=self.user, expires_at=past)
+            if i % 2:
+                BlacklistedToken.objects.create(token=token)
+        call_command('purge_expired_tokens', '--batch-size', '2', stdout=open('/dev/null', 'w'))
+        self.assertEqual(OutstandingToken.objects.count(), 1)  # the live login token
+        self.assertFalse(BlacklistedToken.objects.exists())
@@ -0,0 +1,44 @@
+# File: users/tokens.py
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from .cache import BlacklistFilter, UserCache
+
+
+class RefreshToken(BaseRefreshToken):
+    """
+    simplejwt's refresh token with the blacklist check answered by
+    BlacklistFilter and the token owner taken from UserCache, so a rotation
+    is the blacklist check, the two blacklist/outstanding INSERTs and a
+    lookup of the old row.
+    """
+
+    def owner(self):
+        try:
+            return UserCache.get(self.payload.get(api_settings.USER_ID_CLAIM))
+        except get_user_model().DoesNotExist:
+            return None
+
+    def check_blacklist(self):
+        if BlacklistFilter.contains(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload['exp'])):
+            raise TokenError('Token is blacklisted')
+
+    def blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        expires_at = datetime_from_epoch(self.payload['exp'])
+        token, _ = OutstandingToken.objects.get_or_create(jti=jti, defaults={
+            'user': self.owner(), 'created_at': self.current_time, 'token': str(self), 'expires_at': expires_at,
+        })
+        result = BlacklistedToken.objects.get_or_create(token=token)
+        BlacklistFilter.add(jti, expires_at)
+        return result
+
+    def outstand(self):
+        # called right after set_jti(): the jti is new, so no get_or_create
+        return OutstandingToken.objects.create(
+            jti=self.payload[api_settings.JTI_CLAIM], user=self.owner(), created_at=self.current_time,
+            token=str(self), expires_at=datetime_from_epoch(self.payload['exp']),
+        ), True
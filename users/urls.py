@@ -1,6 +1,6 @@
 # File: users/urls.py
 from django.urls import path
-from .views import RegisterView, MeView
+from .views import AsyncMeView, RegisterView, MeView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 urlpatterns = [
@@ -9,3 +9,8 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('me/', MeView.as_view(), name='me'),
 ]
+
+# mounted under /api/async/auth/
+async_urlpatterns = [
+    path('me/', AsyncMeView.as_view(), name='async-me'),
+]
@@ -1,5 +1,6 @@
 from django.shortcuts import render
 from rest_framework import generics, permissions
+from core.async_views import AsyncAPIView
 from .serializers import RegisterSerializer, UserSerializer
 from .models import User
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
@@ -15,3 +16,7 @@ class MeView(generics.RetrieveAPIView):
 
     def get_object(self):
         return self.request.user
+
+class AsyncMeView(AsyncAPIView):
+    async def get(self, request):
+        return UserSerializer(request.user).data